@@ -0,0 +1,243 @@
+"""
+오래된 경기/출석 기록을 압축 스냅샷으로 옮기는 보관 도구 (시즌이 끝난 뒤 등 가끔 실행)
+
+기준 달(--before, 기본은 최근 ARCHIVE_KEEP_MONTHS개월 이전)보다 오래된 기록을
+달마다 다음처럼 옮긴다.
+
+    matches, attendance의 그 달 기록  →  _archive/{YYYY-MM}
+                                          = {"encoding", "data", "matches", "attendance", "archived_at"}
+                                       +  _rollups/players/{YYYY-MM}/{회원 id}
+                                          = {"matches", "wins", "losses", "draws", "points",
+                                             "games_won", "games_lost", "attendance"}
+
+스냅샷 본문은 JSON을 zlib으로 압축해 base64 문자열로 저장한다.
+옮긴 기록은 삭제 기록과 함께 지우므로 다른 기기도 다음 동기화 때 메모리/로컬 저장소에서 뺀다.
+(월 파티션 레이아웃이면 옮긴 경기만 지우고 매니페스트의 그 달 경기 수를 그만큼 줄임 -
+ 읽은 뒤 다른 기기가 그 달에 추가한 경기는 남는다)
+한 달 분량(스냅샷, 요약, 삭제)을 다중 경로 쓰기 한 번으로 바로 보내므로(아웃박스를 쓰지 않음)
+중간에 실패해도 기록이 사라지거나 두 곳에 남지 않는다.
+로컬 캐시는 임시 폴더에 두므로 앱이 data/에 남긴 아웃박스를 읽거나 재전송하지 않는다.
+이미 보관한 달에 기록이 다시 생기면 기존 스냅샷에 합치고 요약을 다시 만든다.
+
+전체 기간 통계는 요약 합계(load_player_rollups)와 앱 메모리의 최근 기록으로 계산하고
+스냅샷은 읽지 않는다.
+
+사용법:
+    python archive_history.py --dry-run             # 옮길 달과 건수만 출력
+    python archive_history.py                       # 최근 12개월(이번 달 포함)만 남기고 보관
+    python archive_history.py --keep-months 6
+    python archive_history.py --before 2025-03      # 2025-02까지 보관
+"""
+
+import argparse
+import base64
+import json
+import os
+import sys
+import tempfile
+import zlib
+from datetime import datetime
+
+import rtdb_tree
+from club_repository import month_of
+from firebase_config import (
+    SERVER_TIMESTAMP, TOMBSTONE_ROOT, fb_batch, fb_cache_dir, fb_get_if_changed,
+    is_firebase_configured, server_increment,
+)
+from seocho_tennis_club import (
+    ARCHIVE_PATH, ATTENDANCE_FILE, MATCH_MANIFEST_PATH, MATCHES_FILE, PLAYER_ROLLUP_PATH,
+    _FB_PATH_MAP, _MONTH_KEY, _RECORD_ORDER, record_key, score_matches,
+)
+
+ARCHIVE_KEEP_MONTHS = int(os.environ.get("ARCHIVE_KEEP_MONTHS", "12"))
+ARCHIVE_ENCODING = "zlib+json"
+ARCHIVE_COMPRESS_LEVEL = 9
+
+_EMPTY_ROLLUP = {"matches": 0, "wins": 0, "losses": 0, "draws": 0, "points": 0,
+                 "games_won": 0, "games_lost": 0, "attendance": 0}
+
+
+class ArchiveError(Exception):
+    """서버에서 읽지 못했거나 보관할 수 없는 레이아웃"""
+
+
+def encode_snapshot(snapshot):
+    """{"matches": [...], "attendance": [...]} → 압축 문자열"""
+    raw = json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(raw, ARCHIVE_COMPRESS_LEVEL)).decode("ascii")
+
+
+def decode_snapshot(entry):
+    """_archive/{YYYY-MM} 항목 → {"matches": [...], "attendance": [...]}"""
+    if not isinstance(entry, dict):
+        return {"matches": [], "attendance": []}
+    if entry.get("encoding") != ARCHIVE_ENCODING:
+        raise ArchiveError(f"알 수 없는 스냅샷 형식: {entry.get('encoding')}")
+    return json.loads(zlib.decompress(base64.b64decode(entry["data"])).decode("utf-8"))
+
+
+def cutoff_month(today, keep_months):
+    """이번 달을 포함해 keep_months개월을 남길 때 남는 첫 달 (YYYY-MM)"""
+    index = today.year * 12 + today.month - 1 - (max(keep_months, 1) - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def build_rollups(matches, attendance):
+    """한 달 기록 → 회원별 요약 {회원 id: {"matches", "wins", ..., "attendance"}}"""
+    rollups = {}
+    for player_id, score in score_matches(matches).items():
+        rollups[player_id] = dict(_EMPTY_ROLLUP, matches=score["wins"] + score["losses"] + score["draws"], **score)
+    for record in attendance:
+        for member_id in record.get("member_ids", []):
+            rollups.setdefault(member_id, dict(_EMPTY_ROLLUP))["attendance"] += 1
+    return rollups
+
+
+def _read(path):
+    """서버에서 새로 읽은 값 (로컬 캐시로 폴백했으면 ArchiveError - 지울 기록을 정해야 하므로)"""
+    raw, etag = fb_get_if_changed(path, max_staleness=0)
+    if etag is None:
+        raise ArchiveError(f"{path}: 서버에서 읽지 못했습니다.")
+    return raw
+
+
+def _by_month(records, before):
+    months = {}
+    for record in records:
+        month = month_of(record.get("date", ""))
+        if month < before:
+            months.setdefault(month, []).append(record)
+    return months
+
+
+def _read_matches(before):
+    """보관할 경기 → ({월: [경기]}, 월 파티션 여부)"""
+    name = _FB_PATH_MAP[MATCHES_FILE]
+    manifest = _read(MATCH_MANIFEST_PATH)
+    if isinstance(manifest, dict) and manifest:
+        months = {}
+        for month in sorted(m for m in manifest if m < before):
+            records = rtdb_tree.children(_read(f"{name}/{month}"))
+            if records:
+                months[month] = records
+        return months, True
+    raw = _read(name)
+    if isinstance(raw, dict) and name in raw:
+        raise ArchiveError(f"{name}: 배열 레이아웃입니다. migrate_keyed_layout.py를 먼저 실행하세요.")
+    if isinstance(raw, dict) and raw and all(map(_MONTH_KEY.match, raw)):
+        # 매니페스트 없이 월 파티션만 있는 경우
+        months = {month: rtdb_tree.children(records) for month, records in raw.items() if month < before}
+        return {month: records for month, records in months.items() if records}, True
+    return _by_month(rtdb_tree.children(raw), before), False
+
+
+def _read_attendance(before):
+    name = _FB_PATH_MAP[ATTENDANCE_FILE]
+    raw = _read(name)
+    if isinstance(raw, dict) and name in raw:
+        raise ArchiveError(f"{name}: 배열 레이아웃입니다. migrate_keyed_layout.py를 먼저 실행하세요.")
+    return _by_month(rtdb_tree.children(raw), before)
+
+
+def _merge(file_path, archived, records):
+    """기존 스냅샷 기록 + 새로 옮길 기록 (같은 키는 새 기록으로)"""
+    merged = {record_key(file_path, record): record for record in archived}
+    merged.update((record_key(file_path, record), record) for record in records)
+    return sorted(merged.values(), key=_RECORD_ORDER[file_path])
+
+
+def _archive_month(batch, month, matches, attendance, partitioned):
+    """한 달 보관을 batch에 추가 → 스냅샷 (기존 스냅샷과 합친 결과)"""
+    archived = decode_snapshot(_read(f"{ARCHIVE_PATH}/{month}"))
+    snapshot = {
+        "matches": _merge(MATCHES_FILE, archived.get("matches", []), matches),
+        "attendance": _merge(ATTENDANCE_FILE, archived.get("attendance", []), attendance),
+    }
+    batch.put(f"{ARCHIVE_PATH}/{month}", {
+        "encoding": ARCHIVE_ENCODING,
+        "data": encode_snapshot(snapshot),
+        "matches": len(snapshot["matches"]),
+        "attendance": len(snapshot["attendance"]),
+        "archived_at": SERVER_TIMESTAMP,
+    })
+    batch.put(f"{PLAYER_ROLLUP_PATH}/{month}",
+              build_rollups(snapshot["matches"], snapshot["attendance"]) or None)
+
+    matches_name = _FB_PATH_MAP[MATCHES_FILE]
+    # 읽은 경기만 키마다 지움 (달을 통째로 지우면 그 사이 추가된 경기까지 사라짐)
+    prefix = f"{matches_name}/{month}" if partitioned else matches_name
+    for record in matches:
+        key = record_key(MATCHES_FILE, record)
+        batch.delete(f"{prefix}/{key}")
+        batch.put(f"{TOMBSTONE_ROOT}/{prefix}/{key}", SERVER_TIMESTAMP)
+    if partitioned and matches:
+        # 불러온 기기는 매니페스트 버전이 바뀌었으므로 그 달을 다시 받음
+        batch.put(f"{MATCH_MANIFEST_PATH}/{month}/count", server_increment(-len(matches)))
+        batch.put(f"{MATCH_MANIFEST_PATH}/{month}/updated_at", SERVER_TIMESTAMP)
+    attendance_name = _FB_PATH_MAP[ATTENDANCE_FILE]
+    for record in attendance:
+        key = record_key(ATTENDANCE_FILE, record)
+        batch.delete(f"{attendance_name}/{key}")
+        batch.put(f"{TOMBSTONE_ROOT}/{attendance_name}/{key}", SERVER_TIMESTAMP)
+    return snapshot
+
+
+def archive(before, dry_run=False):
+    if not is_firebase_configured():
+        print("Firebase URL이 설정되지 않았습니다.")
+        return 1
+    # 앱의 로컬 캐시/아웃박스와 섞이지 않게 임시 폴더를 씀 (앱이 남긴 쓰기를 재전송하지 않음)
+    with tempfile.TemporaryDirectory(prefix="archive_history_") as cache_dir, fb_cache_dir(cache_dir):
+        return _archive(before, dry_run)
+
+
+def _archive(before, dry_run):
+    try:
+        matches, partitioned = _read_matches(before)
+        attendance = _read_attendance(before)
+    except ArchiveError as e:
+        print(f"{e} 중단합니다.")
+        return 1
+
+    months = sorted(set(matches) | set(attendance))
+    if not months:
+        print(f"{before} 이전에 보관할 기록이 없습니다.")
+        return 0
+    print(f"{before} 이전 {len(months)}개 달을 보관합니다.")
+
+    for month in months:
+        batch = fb_batch()
+        try:
+            snapshot = _archive_month(batch, month, matches.get(month, []),
+                                      attendance.get(month, []), partitioned)
+        except ArchiveError as e:
+            print(f"{month}: {e} 중단합니다.")
+            return 1
+        print(f"  {month}: 경기 {len(matches.get(month, []))}건, 출석 {len(attendance.get(month, []))}건 "
+              f"(스냅샷 경기 {len(snapshot['matches'])}건, 출석 {len(snapshot['attendance'])}건)")
+        if dry_run:
+            continue
+        # 아웃박스를 거치지 않고 바로 보냄 - 실패한 달이 나중에 앱에서 재전송되지 않게
+        if not batch.commit_direct():
+            # 이전 달까지는 보관 완료. 다시 실행하면 아직 남아 있는 달부터 이어서 보관하고,
+            # 이 달이 이미 반영되었더라도 스냅샷은 키 기준으로 합쳐 중복되지 않는다.
+            print(f"  {month}: 저장 실패 - 연결을 확인하고 다시 실행하세요.")
+            return 1
+
+    if dry_run:
+        print("--dry-run: 저장하지 않았습니다.")
+        return 0
+    print("완료")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="오래된 경기/출석 기록 보관")
+    parser.add_argument("--keep-months", type=int, default=ARCHIVE_KEEP_MONTHS,
+                        help=f"이번 달을 포함해 남길 개월 수 (기본 {ARCHIVE_KEEP_MONTHS})")
+    parser.add_argument("--before", help="이 달(YYYY-MM) 이전을 보관 (--keep-months 대신)")
+    parser.add_argument("--dry-run", action="store_true", help="옮길 달과 건수만 출력")
+    args = parser.parse_args()
+    if args.before and not _MONTH_KEY.match(args.before):
+        parser.error("--before는 YYYY-MM 형식이어야 합니다.")
+    sys.exit(archive(args.before or cutoff_month(datetime.now(), args.keep_months), dry_run=args.dry_run))
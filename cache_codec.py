@@ -0,0 +1,97 @@
+"""
+로컬 캐시 파일 형식 (바이너리)
+- marshal 직렬화 + 선택적 zlib 압축 (JSON 파싱보다 수 배 빠름)
+- 헤더: 매직 / 형식 버전 / 플래그 / marshal 버전 / CRC32 / 본문 길이
+- 임시 파일에 쓰고 fsync 후 os.replace로 교체하므로
+  쓰는 도중 프로세스가 멈춰도 찢어진 파일이 남지 않는다
+"""
+
+import gc
+import marshal
+import os
+import struct
+import tempfile
+import zlib
+
+MAGIC = b"FBC\x00"
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x01
+
+# 매직(4) 형식 버전(1) 플래그(1) marshal 버전(1) 예약(1) CRC32(4) 본문 길이(8)
+_HEADER = struct.Struct("<4sBBBxIQ")
+
+
+class CacheFormatError(ValueError):
+    """캐시 파일이 손상되었거나 읽을 수 없는 형식"""
+
+
+def dumps(value, compress_level=0, compress_min_bytes=64 * 1024):
+    """JSON 호환 값 → 캐시 파일 바이트
+
+    직렬화 결과가 compress_min_bytes 이상이면 zlib으로 압축한다
+    (compress_level=0이면 압축하지 않음).
+    """
+    payload = marshal.dumps(value, marshal.version)
+    flags = 0
+    if compress_level and len(payload) >= compress_min_bytes:
+        payload = zlib.compress(payload, compress_level)
+        flags |= FLAG_ZLIB
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, flags, marshal.version,
+                          zlib.crc32(payload), len(payload))
+    return header + payload
+
+
+def loads(blob):
+    """캐시 파일 바이트 → 값 (형식이 다르거나 손상되었으면 CacheFormatError)"""
+    if len(blob) < _HEADER.size:
+        raise CacheFormatError("header truncated")
+    magic, version, flags, marshal_version, crc, length = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise CacheFormatError("bad magic")
+    if version != FORMAT_VERSION:
+        raise CacheFormatError(f"unsupported format version {version}")
+    if marshal_version > marshal.version:
+        # 더 새로운 파이썬이 쓴 파일
+        raise CacheFormatError(f"unsupported marshal version {marshal_version}")
+    payload = blob[_HEADER.size:]
+    if len(payload) != length or zlib.crc32(payload) != crc:
+        raise CacheFormatError("checksum mismatch")
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    # 수만 개의 dict/list를 한꺼번에 만들 때 순환 GC가 반복 실행되지 않도록 잠시 끔
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return marshal.loads(payload)
+    except (EOFError, ValueError, TypeError) as e:
+        raise CacheFormatError(str(e))
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def write_atomic(file_path, blob):
+    """같은 디렉터리의 임시 파일에 쓰고 fsync 후 file_path로 교체"""
+    directory = os.path.dirname(file_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_file(file_path):
+    with open(file_path, "rb") as f:
+        return loads(f.read())
+
+
+def write_file(file_path, value, compress_level=0, compress_min_bytes=64 * 1024):
+    write_atomic(file_path, dumps(value, compress_level, compress_min_bytes))
@@ -0,0 +1,393 @@
+"""
+계층형 로컬 캐시 저장소
+- Firebase 경로를 디렉터리 트리로 저장 (data/cache/matches/2026-10/value.bin)
+- 노드 디렉터리는 셋 중 하나 (앞의 것이 우선)
+  · 잎(leaf): value.bin 하나에 그 아래 서브트리 전체 (cache_codec 형식)
+  · 샤드(sharded): shards.mark + shard-{세대}-{번호}.bin 파일들 - 자식을 키 해시로
+    shard_count개 파일에 나눠 담음 (자식이 많은 큰 컬렉션: matches/{id} 수만 건)
+  · 내부(complete): full.mark 표시 + 자식 노드들이 서브트리 전체 (자식이 적은 노드)
+  셋 다 아닌 디렉터리는 아래 노드로 가는 길일 뿐이다 (그 경로의 값은 모름)
+- 값은 RTDB 응답 형태(배열 포함)로 저장하므로 읽을 때 변환 없이 디코드한 값을 그대로 돌려준다
+- 같은 데이터가 두 곳에 저장되지 않으므로 부모/자식 캐시가 어긋나지 않는다
+- 읽기: 가장 가까운 상위 잎/샤드에서 꺼내거나 자식 노드를 모아 만든다
+- 쓰기: split_min_bytes 이상이고 자식이 shard_count보다 많은 값은 처음부터 샤드로 쓰고,
+  잎 아래 경로에 쓰면 작은 잎은 통째로 다시 쓰고 큰 잎은 한 번만 쪼갠다
+  (자식이 많으면 샤드, 적으면 자식 노드들). 이후 자식 쓰기는 샤드 파일 하나나
+  자기 노드 파일만 다시 쓴다 - 파일 수는 컬렉션 크기와 상관없이 shard_count개 이하
+- 모든 교체는 우선하는 표시(value.bin, 샤드 세대를 가리키는 shards.mark)를 원자적으로
+  쓴 뒤 나머지를 정리하므로 중간에 꺼져도 옛 값과 새 값이 섞이지 않는다
+
+키 인코딩: 소문자/숫자/-/_ 외 문자는 %XX (대소문자를 구분 못 하는 파일 시스템 대비).
+RTDB 키에는 '.'이 들어갈 수 없으므로 '.'이 있는 이름은 모두 저장소 파일이다.
+"""
+
+import os
+import shutil
+import threading
+import uuid
+import zlib
+
+import cache_codec
+import rtdb_tree
+
+VALUE_FILE = "value.bin"
+COMPLETE_FILE = "full.mark"
+SHARDS_FILE = "shards.mark"
+ETAG_FILE = "etag.txt"
+FORMAT_FILE = "format.txt"
+FORMAT = "2"            # 1: 내부 트리 형태로 저장, 2: 응답 형태 + 샤드
+SHARD_COUNT = 32
+
+_SAFE = frozenset("abcdefghijklmnopqrstuvwxyz0123456789-_")
+_WINDOWS_RESERVED = {"con", "prn", "aux", "nul"} | {f"{p}{i}" for p in ("com", "lpt") for i in range(1, 10)}
+
+
+def encode_key(key):
+    """RTDB 키 → 디렉터리 이름"""
+    name = "".join(
+        ch if ch in _SAFE else "".join(f"%{b:02X}" for b in ch.encode("utf-8"))
+        for ch in key
+    )
+    if name in _WINDOWS_RESERVED:
+        name = f"%{ord(name[0]):02X}{name[1:]}"
+    return name
+
+
+def decode_key(name):
+    """디렉터리 이름 → RTDB 키"""
+    if "%" not in name:
+        return name
+    out = bytearray()
+    i = 0
+    while i < len(name):
+        if name[i] == "%":
+            out.append(int(name[i + 1:i + 3], 16))
+            i += 3
+        else:
+            out += name[i].encode("ascii")
+            i += 1
+    return out.decode("utf-8")
+
+
+def _children(value):
+    """응답 형태 값의 자식 {키: 값} (배열이면 인덱스 키, null 제외) - 객체/배열이 아니면 None"""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, list):
+        return {str(i): child for i, child in enumerate(value) if child is not None}
+    return None
+
+
+class CacheStore:
+    """경로별 캐시를 디렉터리 트리에 저장 (스레드 안전)"""
+
+    def __init__(self, root, compress_level=0, compress_min_bytes=64 * 1024,
+                 split_min_bytes=16 * 1024, shard_count=SHARD_COUNT):
+        self.root = root
+        self.compress_level = compress_level
+        self.compress_min_bytes = compress_min_bytes
+        self.split_min_bytes = split_min_bytes
+        self.shard_count = shard_count
+        self._lock = threading.RLock()
+        self._check_format()
+
+    def _check_format(self):
+        """형식이 다른 이전 버전 캐시는 지움 (캐시이므로 서버에서 다시 받으면 됨)"""
+        format_file = os.path.join(self.root, FORMAT_FILE)
+        try:
+            with open(format_file, "r", encoding="utf-8") as f:
+                if f.read().strip() == FORMAT:
+                    return
+        except OSError:
+            pass
+        try:
+            self._remove_tree(self.root)
+            os.makedirs(self.root, exist_ok=True)
+            cache_codec.write_atomic(format_file, FORMAT.encode("ascii"))
+        except OSError:
+            pass
+
+    # ---------------- 조회 ----------------
+    def contains(self, path):
+        """path 값을 알고 있는지 (값이 null인 것을 아는 경우 포함)"""
+        return self._read(rtdb_tree.split_path(path))[0]
+
+    def lookup(self, path):
+        """→ (알고 있는지, 값) - 값은 RTDB 응답 형태로, 읽을 때마다 새로 디코드한 객체"""
+        return self._read(rtdb_tree.split_path(path))
+
+    def read(self, path, default=None):
+        """path 값 (모르거나 null이면 default)"""
+        value = self.lookup(path)[1]
+        return default if value is None else value
+
+    def _read(self, segments):
+        """→ (알고 있는지, 값)"""
+        with self._lock:
+            directory = self.root
+            for depth in range(len(segments) + 1):
+                kind = self._kind(directory)
+                rest = segments[depth:]
+                try:
+                    if kind == "leaf":
+                        return True, rtdb_tree.child_at(self._load(directory), "/".join(rest))
+                    if kind == "sharded":
+                        if not rest:
+                            return True, self._load_shards(directory)
+                        shard = self._load_shard(directory, rest[0])
+                        return True, rtdb_tree.child_at(shard.get(rest[0]), "/".join(rest[1:]))
+                    if not rest:
+                        if kind != "complete":
+                            return False, None
+                        return True, self._assemble(directory)
+                except Exception:
+                    return False, None
+                child = os.path.join(directory, encode_key(rest[0]))
+                if not os.path.isdir(child):
+                    # 완전한 내부 노드에 없는 자식은 null
+                    return kind == "complete", None
+                directory = child
+            return False, None
+
+    def _assemble(self, directory):
+        items = {}
+        for name in os.listdir(directory):
+            if "." in name:
+                continue
+            child = os.path.join(directory, name)
+            kind = self._kind(child)
+            if kind == "leaf":
+                value = self._load(child)
+            elif kind == "sharded":
+                value = self._load_shards(child)
+            elif kind == "complete":
+                value = self._assemble(child)
+            else:
+                continue
+            if value is not None:
+                items[decode_key(name)] = value
+        return rtdb_tree.array_or_object(items) or None
+
+    def top_level(self):
+        """최상위 경로 목록"""
+        with self._lock:
+            if not os.path.isdir(self.root):
+                return []
+            return sorted(decode_key(name) for name in os.listdir(self.root) if "." not in name)
+
+    # ---------------- 쓰기 ----------------
+    def write(self, path, value):
+        """path 값을 value로 덮어씀 (None이면 null로 기록, RTDB PUT과 같은 의미)
+
+        상위 노드의 ETag는 더 이상 맞지 않으므로 지운다.
+        """
+        segments = rtdb_tree.split_path(path)
+        value = rtdb_tree.export(rtdb_tree.normalize(value))
+        with self._lock:
+            directory = self.root
+            parent_kind = None
+            for depth in range(len(segments)):
+                kind = self._kind(directory)
+                self._remove_file(directory, ETAG_FILE)
+                rest = segments[depth:]
+                if kind == "leaf":
+                    try:
+                        tree = self._load(directory)
+                    except Exception:
+                        kind = None     # 손상된 잎은 모르는 값으로 취급
+                        self._remove_file(directory, VALUE_FILE)
+                    else:
+                        if (_children(tree) is None
+                                or os.path.getsize(os.path.join(directory, VALUE_FILE)) < self.split_min_bytes):
+                            self._write_leaf(directory, self._set(tree, rest, value))
+                            return
+                        kind = self._split(directory, tree)
+                if kind == "sharded":
+                    self._write_shard_child(directory, rest, value)
+                    return
+                parent_kind = kind
+                directory = os.path.join(directory, encode_key(rest[0]))
+            self._replace(directory, value, parent_complete=parent_kind == "complete")
+
+    @staticmethod
+    def _set(tree, rest, value):
+        """응답 형태 tree의 rest 경로에 value를 쓴 새 값 (작은 잎/샤드 한 조각에만 사용)"""
+        if not rest:
+            return value
+        return rtdb_tree.export(rtdb_tree.set_at(rtdb_tree.normalize(tree), "/".join(rest), value))
+
+    def _replace(self, directory, value, parent_complete):
+        """노드를 value로 교체"""
+        if value is None and parent_complete:
+            self._remove_tree(directory)
+            return
+        self._write_value(directory, value)
+        self._remove_file(directory, ETAG_FILE)
+
+    def _write_value(self, directory, value):
+        """노드를 value로 씀 - 크고 자식이 많으면 샤드, 아니면 잎"""
+        blob = cache_codec.dumps(value, self.compress_level, self.compress_min_bytes)
+        children = _children(value)
+        if children and len(children) > self.shard_count and len(blob) >= self.split_min_bytes:
+            self._write_shards(directory, children)
+            return
+        os.makedirs(directory, exist_ok=True)
+        cache_codec.write_atomic(os.path.join(directory, VALUE_FILE), blob)
+        self._clear_except(directory, VALUE_FILE)
+
+    def _split(self, directory, tree):
+        """큰 잎을 샤드(자식이 많을 때)나 자식 노드들 + 완전한 내부 노드로 쪼갬 → 새 종류"""
+        children = _children(tree)
+        if len(children) > self.shard_count:
+            self._write_shards(directory, children)
+            return "sharded"
+        for name in os.listdir(directory):
+            if "." not in name:
+                # 이전에 쪼개다 꺼져 남은 자식
+                self._remove_tree(os.path.join(directory, name))
+        for key, child in children.items():
+            self._write_value(os.path.join(directory, encode_key(key)), child)
+        with open(os.path.join(directory, COMPLETE_FILE), "wb"):
+            pass
+        self._remove_file(directory, VALUE_FILE)
+        return "complete"
+
+    def clear(self):
+        with self._lock:
+            self._remove_tree(self.root)
+            self._check_format()
+
+    # ---------------- 샤드 ----------------
+    def _shard_info(self, directory):
+        """→ (샤드 수, 세대)"""
+        with open(os.path.join(directory, SHARDS_FILE), "r", encoding="utf-8") as f:
+            count, generation = f.read().split()
+        return int(count), generation
+
+    @staticmethod
+    def _shard_file(directory, generation, index):
+        return os.path.join(directory, f"shard-{generation}-{index:03d}.bin")
+
+    @staticmethod
+    def _shard_index(key, count):
+        return zlib.crc32(key.encode("utf-8")) % count
+
+    def _load_shard(self, directory, key):
+        count, generation = self._shard_info(directory)
+        return cache_codec.read_file(self._shard_file(directory, generation, self._shard_index(key, count)))
+
+    def _load_shards(self, directory):
+        count, generation = self._shard_info(directory)
+        items = {}
+        for index in range(count):
+            items.update(cache_codec.read_file(self._shard_file(directory, generation, index)))
+        return rtdb_tree.array_or_object(items) or None
+
+    def _write_shards(self, directory, children):
+        """자식들을 새 세대 샤드 파일에 나눠 쓰고 shards.mark를 바꿔 한 번에 전환"""
+        os.makedirs(directory, exist_ok=True)
+        count, generation = self.shard_count, uuid.uuid4().hex[:8]
+        buckets = [{} for _ in range(count)]
+        for key, child in children.items():
+            buckets[self._shard_index(key, count)][key] = child
+        for index, bucket in enumerate(buckets):
+            cache_codec.write_file(self._shard_file(directory, generation, index), bucket,
+                                   self.compress_level, self.compress_min_bytes)
+        cache_codec.write_atomic(os.path.join(directory, SHARDS_FILE),
+                                 f"{count} {generation}".encode("ascii"))
+        self._remove_file(directory, VALUE_FILE)
+        self._clear_except(directory, SHARDS_FILE, f"shard-{generation}-")
+
+    def _write_shard_child(self, directory, rest, value):
+        """샤드 노드 아래 경로 쓰기 - 그 키가 든 샤드 파일 하나만 다시 씀"""
+        key = rest[0]
+        try:
+            count, generation = self._shard_info(directory)
+            shard_file = self._shard_file(directory, generation, self._shard_index(key, count))
+            shard = cache_codec.read_file(shard_file)
+        except Exception:
+            # 손상된 샤드 노드는 모르는 값으로 취급
+            self._remove_file(directory, SHARDS_FILE)
+            return
+        child = self._set(shard.get(key), rest[1:], value)
+        if child is None:
+            shard.pop(key, None)
+        else:
+            shard[key] = child
+        cache_codec.write_file(shard_file, shard, self.compress_level, self.compress_min_bytes)
+
+    # ---------------- ETag ----------------
+    def get_etag(self, path):
+        """path 노드와 함께 저장된 서버 ETag (없으면 None)"""
+        directory = self._dir(path)
+        with self._lock:
+            if self._kind(directory) is None:
+                return None
+            try:
+                with open(os.path.join(directory, ETAG_FILE), "r", encoding="utf-8") as f:
+                    return f.read().strip() or None
+            except OSError:
+                return None
+
+    def set_etag(self, path, etag):
+        directory = self._dir(path)
+        with self._lock:
+            if self._kind(directory) is None:
+                return
+            try:
+                with open(os.path.join(directory, ETAG_FILE), "w", encoding="utf-8") as f:
+                    f.write(etag)
+            except OSError:
+                pass
+
+    # ---------------- 내부 ----------------
+    def _dir(self, path):
+        return os.path.join(self.root, *(encode_key(seg) for seg in rtdb_tree.split_path(path)))
+
+    @staticmethod
+    def _kind(directory):
+        if os.path.exists(os.path.join(directory, VALUE_FILE)):
+            return "leaf"
+        if os.path.exists(os.path.join(directory, SHARDS_FILE)):
+            return "sharded"
+        if os.path.exists(os.path.join(directory, COMPLETE_FILE)):
+            return "complete"
+        return None
+
+    @staticmethod
+    def _load(directory):
+        return cache_codec.read_file(os.path.join(directory, VALUE_FILE))
+
+    def _write_leaf(self, directory, value):
+        os.makedirs(directory, exist_ok=True)
+        cache_codec.write_file(os.path.join(directory, VALUE_FILE), value,
+                               self.compress_level, self.compress_min_bytes)
+
+    def _clear_except(self, directory, keep, keep_prefix=None):
+        """노드의 다른 표현(표시 파일, 샤드, 자식 노드)을 지움 - ETag 파일은 남김"""
+        for name in os.listdir(directory):
+            if name in (keep, ETAG_FILE) or (keep_prefix and name.startswith(keep_prefix)):
+                continue
+            if "." not in name:
+                self._remove_tree(os.path.join(directory, name))
+            elif name in (VALUE_FILE, COMPLETE_FILE, SHARDS_FILE) or name.startswith("shard-"):
+                self._remove_file(directory, name)
+
+    @staticmethod
+    def _remove_file(directory, name):
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove_tree(directory):
+        """이름을 먼저 바꿔(원자적) 트리에서 뺀 뒤 지움 - 지우다 꺼져도 반쯤 남지 않음"""
+        if not os.path.isdir(directory):
+            return
+        trash = f"{directory}.del-{uuid.uuid4().hex[:8]}"
+        try:
+            os.rename(directory, trash)
+        except OSError:
+            trash = directory
+        shutil.rmtree(trash, ignore_errors=True)
@@ -0,0 +1,432 @@
+"""
+클럽 데이터 저장소 (메모리)
+- 회원/출석/경기 세 컬렉션을 앱 형식({"members": [...]}) 그대로 보관
+- 조회용 해시 인덱스를 함께 유지해 화면의 조회가 전체 목록을 훑지 않음
+  · 회원: id → 레코드
+  · 출석: 날짜 → 레코드
+  · 경기: id → 레코드, 날짜 → [경기], 선수 id → [경기]
+- 추가/삭제 때마다 인덱스를 그 레코드만큼만 고침 (컬렉션을 통째로 받으면 다시 만듦)
+- 기간 조회는 정렬된 날짜 목록을 이분 탐색하므로 O(log n + 결과 수)
+- 변경 기록: 마지막 저장(take_changes) 이후 추가/수정/삭제된 키를 모아 두어
+  저장할 때 바뀐 레코드만 보낼 수 있게 함 (같은 키의 변경은 하나로 합침)
+- 경기 월 파티션(partition_matches): 경기를 전부 들고 있지 않고 조회한 달만 불러옴
+  · 처음 조회할 때 loader(month, refresh)로 불러오고 최근 사용 순으로 MAX_LOADED_MONTHS개까지 유지
+  · 저장하지 않은 변경이 있는 달은 내보내지 않음
+  · 매니페스트({월: {count, updated_at}})의 버전이 바뀐 달은 다시 불러옴
+
+컬렉션 dict는 save_json_batch 등 저장 함수에 그대로 넘길 수 있다.
+레코드를 제자리에서 고쳤으면 mark_updated()로 알린다. 인덱스 키(id, date, team1/team2)는 바꾸지 않는다.
+"""
+
+import bisect
+import threading
+from collections import OrderedDict
+
+UNKNOWN_NAME = "알 수 없음"
+
+# 컬렉션별 레코드 키 필드
+KEY_FIELDS = {"members": "id", "attendance": "date", "matches": "id"}
+
+# 경기 월 파티션을 메모리에 유지할 최대 개수 (저장 대기 중인 달은 넘어도 유지)
+MAX_LOADED_MONTHS = 6
+
+
+def month_of(date):
+    """'2026-10-17' → '2026-10'"""
+    return str(date)[:7]
+
+
+def months_between(start, end):
+    """start~end 날짜가 걸친 월 목록 ['2026-09', '2026-10', ...]"""
+    year, month = int(start[:4]), int(start[5:7])
+    last = month_of(end)
+    months = []
+    while f"{year:04d}-{month:02d}" <= last:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class _DateIndex:
+    """날짜 → [레코드] + 정렬된 날짜 목록 (기간 조회용)"""
+
+    def __init__(self, records=()):
+        self._by_date = {}
+        for record in records:
+            self._by_date.setdefault(record["date"], []).append(record)
+        self._dates = sorted(self._by_date)
+
+    def add(self, record):
+        date = record["date"]
+        bucket = self._by_date.get(date)
+        if bucket is None:
+            bucket = self._by_date[date] = []
+            bisect.insort(self._dates, date)
+        bucket.append(record)
+
+    def remove(self, record):
+        date = record["date"]
+        bucket = self._by_date.get(date, [])
+        bucket[:] = [r for r in bucket if r is not record]
+        if not bucket and date in self._by_date:
+            del self._by_date[date]
+            self._dates.pop(bisect.bisect_left(self._dates, date))
+
+    def on(self, date):
+        return list(self._by_date.get(date, []))
+
+    def between(self, start, end):
+        """start~end(양 끝 포함, YYYY-MM-DD 문자열 비교) 레코드를 날짜순으로"""
+        lo = bisect.bisect_left(self._dates, start)
+        hi = bisect.bisect_right(self._dates, end)
+        return [record for date in self._dates[lo:hi] for record in self._by_date[date]]
+
+
+class ClubRepository:
+    """세 컬렉션과 인덱스를 함께 관리"""
+
+    def __init__(self):
+        self._changes = {}      # 컬렉션 -> {키: ("insert" | "update" | "delete", 레코드)}
+        self._changes_lock = threading.Lock()
+        self._match_loader = None           # 월 파티션 모드면 loader(month, refresh) → 그 달 경기 목록
+        self._manifest = {}                 # 월 -> {"count", "updated_at"}
+        self._loaded_months = OrderedDict() # 불러온 월 -> 불러올 때의 매니페스트 버전 (최근 사용이 끝)
+        self._partition_lock = threading.RLock()
+        self.replace("members", {"members": []})
+        self.replace("attendance", {"attendance": []})
+        self.replace("matches", {"matches": []})
+
+    # ---------------- 컬렉션 교체 ----------------
+    def replace(self, name, data):
+        """컬렉션 하나를 통째로 교체하고 인덱스를 다시 만듦 (불러오기/서버 재조회)
+
+        인덱스를 다 만든 뒤 한꺼번에 바꿔 끼우므로 다른 스레드(스트림)가
+        교체하는 중에 화면이 읽어도 반쯤 만든 인덱스를 보지 않는다.
+        아직 저장하지 않은 변경은 새 데이터 위에 다시 적용한다 (저장 전 재조회로 잃지 않게).
+        """
+        if name not in KEY_FIELDS:
+            raise KeyError(name)
+        records = data.setdefault(name, [])
+        with self._changes_lock:
+            pending = dict(self._changes.get(name, {}))
+        if pending:
+            records = data[name] = self._merge_pending(name, records, pending)
+        if name == "members":
+            self.members, self._member_by_id = data, {m["id"]: m for m in records}
+        elif name == "attendance":
+            self.attendance, self._attendance_by_date = data, _DateIndex(records)
+        elif name == "matches":
+            by_player = {}
+            for match in records:
+                for player_id in self._players(match):
+                    by_player.setdefault(player_id, []).append(match)
+            with self._partition_lock:
+                self.matches, self._match_by_id, self._matches_by_date, self._matches_by_player = (
+                    data, {m["id"]: m for m in records}, _DateIndex(records), by_player)
+                if self._match_loader is not None:
+                    # 통째로 받은 경기(불러오기 등)는 그 달들을 불러온 것으로 봄
+                    self._loaded_months = OrderedDict(
+                        (month, self._version(month))
+                        for month in sorted({month_of(m.get("date", "")) for m in records}))
+                    self._evict(keep=())
+
+    def _merge_pending(self, name, records, pending):
+        merged, seen = [], set()
+        for record in records:
+            key = self._key(name, record)
+            if key not in pending:
+                merged.append(record)
+                continue
+            seen.add(key)
+            op, changed = pending[key]
+            if op != "delete":
+                merged.append(changed)
+        merged += [changed for key, (op, changed) in pending.items() if op != "delete" and key not in seen]
+        return merged
+
+    # ---------------- 변경 기록 ----------------
+    def mark_updated(self, name, record):
+        """제자리에서 고친 레코드를 변경 기록에 올림"""
+        self._log(name, "update", record)
+
+    def has_changes(self):
+        with self._changes_lock:
+            return any(self._changes.values())
+
+    def take_changes(self):
+        """마지막 호출 이후 변경을 꺼내고 기록을 비움
+
+        → {컬렉션: (추가/수정된 레코드 목록, 삭제된 레코드 목록, 새로 추가된 키 집합)}
+        (변경 없는 컬렉션은 빠짐, 새로 추가된 키는 개수를 늘려 세는 데 씀)
+        """
+        with self._changes_lock:
+            changes, self._changes = self._changes, {}
+        result = {}
+        for name, log in changes.items():
+            upserts = [record for op, record in log.values() if op != "delete"]
+            deletes = [record for op, record in log.values() if op == "delete"]
+            inserted = {key for key, (op, _) in log.items() if op == "insert"}
+            if upserts or deletes:
+                result[name] = (upserts, deletes, inserted)
+        return result
+
+    def restore_changes(self, changes):
+        """take_changes로 꺼냈지만 저장하지 못한 변경을 기록에 되돌림
+
+        그 사이 다시 바뀐 키는 되돌린 변경 뒤에 일어난 것으로 합친다.
+        """
+        with self._changes_lock:
+            for name, (upserts, deletes, inserted) in changes.items():
+                log = self._changes.setdefault(name, {})
+                restored = [("delete", record) for record in deletes]
+                for record in upserts:
+                    restored.append(("insert" if self._key(name, record) in inserted else "update", record))
+                for op, record in restored:
+                    key = self._key(name, record)
+                    if key not in log:
+                        log[key] = (op, record)
+                        continue
+                    newer, newer_record = log[key]
+                    merged = self._merge_op(op, newer)
+                    if merged is None:
+                        del log[key]
+                    else:
+                        log[key] = (merged, newer_record)
+
+    def _log(self, name, op, record):
+        key = self._key(name, record)
+        with self._changes_lock:
+            log = self._changes.setdefault(name, {})
+            op = self._merge_op(log.get(key, (None,))[0], op)
+            if op is None:
+                del log[key]
+            else:
+                log[key] = (op, record)
+
+    @staticmethod
+    def _merge_op(previous, op):
+        """같은 키의 이전 변경과 새 변경을 하나로 → 합친 변경 (보낼 것이 없으면 None)"""
+        if previous == "insert" and op == "delete":
+            # 저장하기 전에 지웠으면 보낼 것이 없음
+            return None
+        if previous == "insert":
+            return "insert"
+        if previous == "delete" and op == "insert":
+            return "update"
+        return op
+
+    @staticmethod
+    def _key(name, record):
+        return str(record.get(KEY_FIELDS[name], ""))
+
+    # ---------------- 회원 ----------------
+    def member_list(self):
+        return self.members["members"]
+
+    def member(self, member_id):
+        return self._member_by_id.get(member_id)
+
+    def member_name(self, member_id):
+        member = self._member_by_id.get(member_id)
+        return member["name"] if member else UNKNOWN_NAME
+
+    def member_names(self, member_ids, separator=" & "):
+        names = [self._member_by_id[mid]["name"] for mid in member_ids if mid in self._member_by_id]
+        return separator.join(names) if names else UNKNOWN_NAME
+
+    def members_by_ids(self, member_ids):
+        """id 순서대로 회원 레코드 (없는 id는 건너뜀)"""
+        return [self._member_by_id[mid] for mid in member_ids if mid in self._member_by_id]
+
+    def add_member(self, member):
+        self.members["members"].append(member)
+        self._member_by_id[member["id"]] = member
+        self._log("members", "insert", member)
+        return member
+
+    def remove_member(self, member_id):
+        """회원 삭제 → 삭제한 레코드 (없으면 None)"""
+        member = self._member_by_id.pop(member_id, None)
+        if member is not None:
+            self.members["members"] = [m for m in self.members["members"] if m is not member]
+            self._log("members", "delete", member)
+        return member
+
+    # ---------------- 출석 ----------------
+    def attendance_on(self, date):
+        records = self._attendance_by_date.on(date)
+        return records[0] if records else None
+
+    def attendee_ids(self, date):
+        record = self.attendance_on(date)
+        return record.get("member_ids", []) if record else []
+
+    def attendance_between(self, start, end):
+        return self._attendance_by_date.between(start, end)
+
+    def set_attendance(self, date, member_ids):
+        """날짜의 출석 명단을 저장 (없으면 새 레코드) → 레코드"""
+        record = self.attendance_on(date)
+        if record is None:
+            record = {"date": date, "member_ids": member_ids}
+            self.attendance["attendance"].append(record)
+            self._attendance_by_date.add(record)
+            self._log("attendance", "insert", record)
+        else:
+            record["member_ids"] = member_ids
+            self._log("attendance", "update", record)
+        return record
+
+    # ---------------- 경기 ----------------
+    def match(self, match_id):
+        """id로 경기 찾기 (월 파티션 모드면 불러온 달 안에서만)"""
+        return self._match_by_id.get(match_id)
+
+    def matches_on(self, date):
+        self._ensure_months([month_of(date)])
+        return self._matches_by_date.on(date)
+
+    def matches_between(self, start, end=None):
+        end = end or start
+        self._ensure_months(months_between(start, end))
+        return self._matches_by_date.between(start, end)
+
+    def matches_for_player(self, player_id):
+        """선수의 경기 (월 파티션 모드면 불러온 달 안에서만)"""
+        return list(self._matches_by_player.get(player_id, []))
+
+    def month_matches(self, month):
+        """그 달의 경기 (불러오지 않았으면 불러옴)"""
+        return self.matches_between(f"{month}-01", f"{month}-31")
+
+    def all_matches(self):
+        """모든 경기 (내보내기용) - 불러오지 않은 달은 읽기만 하고 메모리에 올리지 않음"""
+        with self._partition_lock:
+            if self._match_loader is None:
+                return list(self.matches["matches"])
+            result = []
+            for month in sorted(set(self._manifest) | set(self._loaded_months)):
+                if month in self._loaded_months:
+                    result += self._matches_by_date.between(f"{month}-01", f"{month}-31")
+                else:
+                    result += self._match_loader(month, False)
+            return result
+
+    def add_matches(self, matches):
+        # 추가할 달을 먼저 불러와 둠 (저장 때 그 달의 로컬 파일을 통째로 다시 쓸 수 있게)
+        self._ensure_months(sorted({month_of(match["date"]) for match in matches}))
+        for match in matches:
+            self.matches["matches"].append(match)
+            self._index_match(match)
+            self._log("matches", "insert", match)
+        return matches
+
+    def add_match(self, match):
+        return self.add_matches([match])[0]
+
+    def remove_match(self, match_id):
+        """경기 삭제 → 삭제한 레코드 (없으면 None)"""
+        match = self._match_by_id.pop(match_id, None)
+        if match is None:
+            return None
+        self.matches["matches"] = [m for m in self.matches["matches"] if m is not match]
+        self._unindex_match(match)
+        self._log("matches", "delete", match)
+        return match
+
+    def _index_match(self, match):
+        self._match_by_id[match["id"]] = match
+        self._matches_by_date.add(match)
+        for player_id in self._players(match):
+            self._matches_by_player.setdefault(player_id, []).append(match)
+
+    def _unindex_match(self, match):
+        if self._match_by_id.get(match["id"]) is match:
+            del self._match_by_id[match["id"]]
+        self._matches_by_date.remove(match)
+        for player_id in self._players(match):
+            bucket = self._matches_by_player.get(player_id, [])
+            bucket[:] = [m for m in bucket if m is not match]
+            if not bucket:
+                self._matches_by_player.pop(player_id, None)
+
+    # ---------------- 경기 월 파티션 ----------------
+    @property
+    def partitioned(self):
+        return self._match_loader is not None
+
+    def partition_matches(self, loader, manifest):
+        """경기를 월 파티션 단위로 필요할 때 불러오도록 전환하거나 매니페스트를 갱신
+
+        loader(month, refresh) → 그 달 경기 목록 (refresh면 캐시 대신 서버에서 확인)
+        manifest: {month: {"count", "updated_at"}}
+        이미 불러온 달 중 매니페스트 버전이 바뀐 달은 바로 다시 불러온다.
+        """
+        with self._partition_lock:
+            if self._match_loader is None:
+                self._match_loader = loader
+                self.replace("matches", {"matches": []})
+                self._loaded_months.clear()
+            self._manifest = dict(manifest or {})
+            for month, version in list(self._loaded_months.items()):
+                if self._version(month) != version:
+                    self._load_month(month, refresh=True)
+
+    def loaded_months(self):
+        with self._partition_lock:
+            return list(self._loaded_months)
+
+    def _version(self, month):
+        entry = self._manifest.get(month)
+        return entry.get("updated_at") if isinstance(entry, dict) else None
+
+    def _ensure_months(self, months):
+        if self._match_loader is None:
+            return
+        with self._partition_lock:
+            for month in months:
+                if month in self._loaded_months:
+                    self._loaded_months.move_to_end(month)
+                elif month in self._manifest or not self._manifest:
+                    self._load_month(month)
+                else:
+                    # 매니페스트에 없는 달은 서버에 경기가 없음
+                    self._loaded_months[month] = None
+            self._evict(keep=months)
+
+    def _load_month(self, month, refresh=False):
+        records = list(self._match_loader(month, refresh))
+        with self._changes_lock:
+            pending = {key: change for key, change in self._changes.get("matches", {}).items()
+                       if month_of(change[1].get("date", "")) == month}
+        if pending:
+            records = self._merge_pending("matches", records, pending)
+        self._unload_month(month)
+        for match in records:
+            self.matches["matches"].append(match)
+            self._index_match(match)
+        self._loaded_months[month] = self._version(month)
+        self._loaded_months.move_to_end(month)
+
+    def _unload_month(self, month):
+        stale = self._matches_by_date.between(f"{month}-01", f"{month}-31")
+        if stale:
+            stale_ids = {id(match) for match in stale}
+            self.matches["matches"] = [m for m in self.matches["matches"] if id(m) not in stale_ids]
+            for match in stale:
+                self._unindex_match(match)
+        self._loaded_months.pop(month, None)
+
+    def _evict(self, keep):
+        """MAX_LOADED_MONTHS를 넘으면 오래 안 쓴 달부터 내보냄 (keep과 저장 대기 중인 달은 제외)"""
+        with self._changes_lock:
+            pinned = {month_of(record.get("date", "")) for _, record in self._changes.get("matches", {}).values()}
+        for month in list(self._loaded_months):
+            if len(self._loaded_months) <= MAX_LOADED_MONTHS:
+                break
+            if month not in keep and month not in pinned:
+                self._unload_month(month)
+
+    @staticmethod
+    def _players(match):
+        return set(match.get("team1", [])) | set(match.get("team2", []))
@@ -1,151 +1,1786 @@
 """
 Firebase Realtime Database REST API 모듈
 - SDK 없이 requests만으로 CRUD 구현
-- 오프라인 시 로컬 JSON 폴백
+- 공유 HTTP 세션 (커넥션 풀 + keep-alive + 재시도)
+- 프로세스 전역 조회 캐시 (TTL + 크기 상한 LRU)
+- SSE 스트림 구독으로 유지되는 인메모리 미러
+- 오프라인 시 로컬 JSON 폴백 (회로 차단기로 대기 없이 전환)
+- 백그라운드 쓰기 큐 + 아웃박스 저널 (오프라인 변경 보존 및 재전송)
+- 호출/HTTP 요청별 지연·바이트 계측 (firebase_metrics)
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import contextlib
+import contextvars
+import copy
 import json
 import os
+import random
+import socket
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import cache_codec
+import cache_store
+import firebase_metrics
+import rtdb_tree
+from firebase_metrics import metered, note_source
 
 # ============================================================
 # Firebase 프로젝트 설정 (사용자가 직접 입력)
 # ============================================================
 # Firebase Console > Realtime Database > URL 복사
-FIREBASE_URL = "https://seocho-5e9ea-default-rtdb.asia-southeast1.firebasedatabase.app"
+# 환경 변수 FIREBASE_URL로 바꿀 수 있음 (예: 로컬 대역 서버 firebase_emulator.py)
+FIREBASE_URL = os.environ.get(
+    "FIREBASE_URL", "https://seocho-5e9ea-default-rtdb.asia-southeast1.firebasedatabase.app"
+).rstrip("/")
 
 # 연결 타임아웃 (초)
 TIMEOUT = 5
 
+# HTTP 커넥션 풀 설정
+POOL_SIZE = 10          # 호스트당 유지할 keep-alive 연결 수
+MAX_RETRIES = 2         # 5xx/429 응답 시 재시도 횟수
+RETRY_BACKOFF = 0.3     # 재시도 간격 계수 (0.3s, 0.6s, ...)
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# shallow 개수 조회 캐시 유지 시간 (초)
+COUNT_TTL = 10
+
 # 로컬 캐시 디렉토리
 CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+CACHE_COMPRESS_LEVEL = 0                # zlib 압축 레벨 1~9 (0이면 압축 안 함 - 읽기가 가장 빠름)
+CACHE_COMPRESS_MIN_BYTES = 64 * 1024    # 이보다 작은 캐시는 압축하지 않음
+CACHE_SPLIT_MIN_BYTES = 16 * 1024       # 이보다 큰 캐시 노드는 자식에 쓸 때 자식 노드들로 쪼갬
 
 
 def is_firebase_configured():
     """Firebase URL이 설정되었는지 확인"""
-    return bool(FIREBASE_URL and FIREBASE_URL.startswith("https://"))
+    return bool(FIREBASE_URL and FIREBASE_URL.startswith(("https://", "http://")))
+
+
+# ============================================================
+# 공유 HTTP 세션
+# ============================================================
+_session = None
+_session_lock = threading.Lock()
+_executor = None
+
+
+def _build_session(pool_size, max_retries):
+    """커넥션 풀과 재시도 정책이 적용된 requests 세션 생성"""
+    retry = Retry(
+        total=max_retries,
+        # 연결 실패/응답 지연은 재시도하지 않고 바로 회로 차단기에 알림 - 서버가 응답하지 않을 때
+        # 호출마다 (재시도 수 + 1) × TIMEOUT을 기다리지 않고, 차단도 BREAKER_THRESHOLD번의
+        # TIMEOUT 만에 열리게 (읽기 재시도는 차단기가 실패를 한 번으로만 셈)
+        connect=0,
+        read=0,
+        status=max_retries,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        # POST(push)는 멱등이 아니므로 재시도하지 않음
+        allowed_methods=frozenset(["GET", "PUT", "PATCH", "DELETE"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def get_session():
+    """프로세스 전역 HTTP 세션 반환 (모든 Flet 세션이 공유)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(POOL_SIZE, MAX_RETRIES)
+    return _session
+
+
+def configure_http(pool_size=None, max_retries=None):
+    """커넥션 풀 크기/재시도 횟수 변경 후 세션 재생성"""
+    global _session, POOL_SIZE, MAX_RETRIES
+    with _session_lock:
+        if pool_size is not None:
+            POOL_SIZE = pool_size
+        if max_retries is not None:
+            MAX_RETRIES = max_retries
+        old, _session = _session, _build_session(POOL_SIZE, MAX_RETRIES)
+    if old is not None:
+        old.close()
+
+
+def close_session():
+    """공유 세션의 연결을 모두 닫기"""
+    global _session
+    with _session_lock:
+        old, _session = _session, None
+    if old is not None:
+        old.close()
+
+
+def _get_executor():
+    """병렬 조회용 공유 스레드 풀 (커넥션 풀 크기만큼)"""
+    global _executor
+    if _executor is None:
+        with _session_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="fb")
+    return _executor
+
+
+def fb_warm_up(connections=3):
+    """DNS 조회와 keep-alive 연결(TCP+TLS)을 미리 맺어 둠 → {"dns": 초, "connect": 초}
+
+    연결마다 루트를 shallow로 조회(키 목록만)해서 풀에 connections개의 연결을 채운다.
+    첫 사용자가 연결 비용을 치르지 않도록 프로세스 시작 직후에 호출한다. 실패는 무시.
+    """
+    timings = {}
+    if not is_firebase_configured():
+        return timings
+    start = time.perf_counter()
+    try:
+        host = urlsplit(FIREBASE_URL)
+        socket.getaddrinfo(host.hostname, host.port or (443 if host.scheme == "https" else 80))
+    except Exception:
+        pass
+    timings["dns"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    connections = max(1, min(connections, POOL_SIZE))
+    futures = [
+        _get_executor().submit(contextvars.copy_context().run, _request, "GET", "",
+                               params={"shallow": "true"})
+        for _ in range(connections)
+    ]
+    wait(futures, timeout=TIMEOUT * 2)
+    timings["connect"] = time.perf_counter() - start
+    return timings
+
+
+def _request(method, path, **kwargs):
+    """공유 세션으로 Firebase REST 요청 (실패 시 예외)
+
+    회로 차단기가 열려 있으면 네트워크를 기다리지 않고 바로 CircuitOpenError.
+    """
+    breaker = _get_breaker()
+    try:
+        breaker.before_request()
+    except CircuitOpenError as e:
+        firebase_metrics.record_error("http", path, e)
+        raise
+    url = f"{FIREBASE_URL}/{path}.json"
+    kwargs.setdefault("timeout", TIMEOUT)
+    start = time.perf_counter()
+    try:
+        resp = get_session().request(method, url, **kwargs)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        breaker.record_failure()
+        firebase_metrics.record_http(method, path, "error", time.perf_counter() - start, error=e)
+        raise
+    if resp.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    body = resp.request.body
+    firebase_metrics.record_http(method, path, resp.status_code, time.perf_counter() - start,
+                                 len(body) if body else 0, len(resp.content))
+    resp.raise_for_status()
+    return resp
+
+
+def _is_rejection(error):
+    """서버가 쓰기를 거절한 오류인지 (400/401/403/412 등 4xx)
+
+    5xx와 429는 재시도가 끝나도 남은 일시적 장애라 연결 실패와 같게 취급한다
+    (회로 차단기도 5xx를 장애로 센다). 이런 쓰기를 버리면 서버에 닿지 않은 채 사라진다.
+    """
+    if not isinstance(error, requests.HTTPError) or error.response is None:
+        return False
+    status = error.response.status_code
+    return 400 <= status < 500 and status != 429
+
+
+# ============================================================
+# 회로 차단기 (circuit breaker)
+# ============================================================
+BREAKER_THRESHOLD = 3       # 연속 실패가 이만큼이면 차단 (오프라인 전환)
+BREAKER_PROBE_MIN = 1       # 첫 연결 확인까지 대기 (초)
+BREAKER_PROBE_MAX = 60      # 연결 확인 간격 최대 (초)
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """차단 중이라 요청을 보내지 않음 (연결 실패와 같게 취급)"""
+
+
+class _CircuitBreaker:
+    """호스트별 회로 차단기
+
+    closed: 정상 요청. 연결 실패/5xx가 BREAKER_THRESHOLD번 연속되면 open.
+    open: 모든 요청을 즉시 실패시켜 호출 측이 바로 캐시로 폴백한다.
+          백그라운드 스레드가 지터를 준 지수 백오프 간격으로 연결을 확인하고
+    half_open: 확인 요청을 보내는 중. 응답을 받으면 closed로 돌아간다.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.state = "closed"
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._probe_thread = None
+
+    def before_request(self):
+        if self.state != "closed":
+            raise CircuitOpenError(f"circuit open: {self.host}")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            changed = self.state != "closed"
+            self.state = "closed"
+        if changed:
+            _notify_connection(True)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state != "closed" or self.failures < BREAKER_THRESHOLD:
+                return
+            self.state = "open"
+            self._probe_thread = threading.Thread(target=self._probe_loop,
+                                                  name="fb-breaker-probe", daemon=True)
+            self._probe_thread.start()
+        _notify_connection(False)
 
+    def _probe_loop(self):
+        backoff = BREAKER_PROBE_MIN
+        while self.state != "closed":
+            time.sleep(backoff * random.uniform(0.5, 1.0))
+            self.state = "half_open"
+            if self._probe():
+                self.record_success()
+                return
+            self.state = "open"
+            backoff = min(backoff * 2, BREAKER_PROBE_MAX)
 
+    def _probe(self):
+        """이 차단기 호스트의 루트 shallow 조회로 서버 응답 여부 확인 (응답 코드가 5xx가 아니면 연결됨)
+
+        FIREBASE_URL이 그 사이 다른 호스트로 바뀌었어도 자기 호스트만 확인한다.
+        """
+        url = urlsplit(FIREBASE_URL)._replace(netloc=self.host, path="/.json", query="").geturl()
+        try:
+            resp = get_session().get(url, params={"shallow": "true"}, timeout=TIMEOUT)
+            return resp.status_code < 500
+        except Exception:
+            return False
+
+
+_breakers = {}
+_connection_listeners = []
+
+
+def _get_breaker():
+    host = urlsplit(FIREBASE_URL).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _session_lock:
+            breaker = _breakers.setdefault(host, _CircuitBreaker(host))
+    return breaker
+
+
+def _notify_connection(online):
+    for callback in list(_connection_listeners):
+        try:
+            callback(online)
+        except Exception:
+            pass
+
+
+def fb_is_online():
+    """Firebase에 연결된 상태인지 (설정 안 됨 또는 차단 중이면 False)"""
+    return is_firebase_configured() and _get_breaker().state == "closed"
+
+
+def fb_connection_state():
+    """연결 상태: "unconfigured" / "closed"(연결됨) / "open"(오프라인) / "half_open"(확인 중)"""
+    if not is_firebase_configured():
+        return "unconfigured"
+    return _get_breaker().state
+
+
+def fb_add_connection_listener(callback):
+    """연결/끊김이 바뀔 때 callback(online) 호출 (임의 스레드) → 해제 함수 반환"""
+    _connection_listeners.append(callback)
+
+    def remove():
+        if callback in _connection_listeners:
+            _connection_listeners.remove(callback)
+    return remove
+
+
+# ============================================================
+# 로컬 캐시
+# ============================================================
 def _ensure_cache_dir():
     if not os.path.exists(CACHE_DIR):
         os.makedirs(CACHE_DIR)
 
 
-def _cache_path(path):
-    """Firebase path를 로컬 캐시 파일 경로로 변환"""
+_stores = {}    # CACHE_DIR -> CacheStore
+
+
+def _cache_store():
+    """CACHE_DIR/cache 아래 계층형 캐시 저장소 (CACHE_DIR을 바꾸면 새 저장소)"""
+    store = _stores.get(CACHE_DIR)
+    if store is None:
+        store = _stores.setdefault(CACHE_DIR, cache_store.CacheStore(
+            os.path.join(CACHE_DIR, "cache"), CACHE_COMPRESS_LEVEL, CACHE_COMPRESS_MIN_BYTES,
+            CACHE_SPLIT_MIN_BYTES))
+    return store
+
+
+@contextlib.contextmanager
+def fb_cache_dir(path):
+    """이 블록 동안 로컬 캐시/동기화 상태/아웃박스를 path 아래에 둠 (CLI 도구용)
+
+    도구가 앱의 data/ 폴더를 쓰면 첫 쓰기 큐 사용 때 앱이 남긴 아웃박스를 읽어
+    도구 프로세스가 재전송하게 되므로, 도구는 자기 폴더로 바꿔 실행한다.
+    """
+    global CACHE_DIR, _sync_state, _write_queue, _read_cache
+    saved = CACHE_DIR, _sync_state, _write_queue, _read_cache
+    CACHE_DIR, _sync_state, _write_queue, _read_cache = path, None, _WriteQueue(), _ReadCache()
+    try:
+        yield path
+    finally:
+        CACHE_DIR, _sync_state, _write_queue, _read_cache = saved
+        _stores.pop(path, None)
+
+
+def _legacy_cache_files(path):
+    """이전 버전의 경로별 평면 캐시 파일 (data/matches_cache.bin|json|etag)"""
     safe_name = path.replace("/", "_").strip("_") or "root"
-    return os.path.join(CACHE_DIR, f"{safe_name}_cache.json")
+    base = os.path.join(CACHE_DIR, f"{safe_name}_cache")
+    return base + ".bin", base + ".json", base + ".etag"
+
+
+def _import_legacy_cache(path):
+    """path나 그 상위 경로의 이전 형식 캐시가 있으면 계층형 저장소로 옮기고 지움 → 옮겼는지"""
+    segments = rtdb_tree.split_path(path)
+    imported = False
+    for depth in range(len(segments) + 1):
+        prefix = "/".join(segments[:depth])
+        bin_file, json_file, etag_file = _legacy_cache_files(prefix)
+        try:
+            data = cache_codec.read_file(bin_file)
+        except Exception:
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception:
+                continue
+        try:
+            _cache_store().write(prefix, data)
+            for old_file in (bin_file, json_file, etag_file):
+                if os.path.exists(old_file):
+                    os.remove(old_file)
+            imported = True
+        except Exception:
+            pass
+    return imported
+
+
+def _cache_exists(path):
+    """path 값이 로컬 캐시에 있는지 (상위 경로 캐시에 포함된 경우 포함)"""
+    try:
+        return _cache_store().contains(path) or _import_legacy_cache(path)
+    except Exception:
+        return False
+
+
+def _load_etag(path):
+    """캐시와 함께 저장된 ETag 조회 (없으면 None)"""
+    try:
+        return _cache_store().get_etag(path)
+    except Exception:
+        return None
+
+
+def _save_etag(path, etag):
+    try:
+        _cache_store().set_etag(path, etag)
+    except Exception:
+        pass
 
 
 def _save_cache(path, data):
-    """로컬 캐시에 저장"""
-    _ensure_cache_dir()
+    """로컬 캐시에 저장 - path 노드만 다시 쓰고 상위 경로의 ETag는 지움"""
     try:
-        with open(_cache_path(path), 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        _cache_store().write(path, data)
     except Exception:
         pass
 
 
 def _load_cache(path, default=None):
-    """로컬 캐시에서 로드"""
-    cache_file = _cache_path(path)
-    if os.path.exists(cache_file):
+    """로컬 캐시에서 로드 - path 또는 가장 가까운 상위 경로 캐시에서 꺼냄
+    (손상된 파일은 없는 것으로 취급)"""
+    try:
+        found, data = _cache_store().lookup(path)
+        if not found and _import_legacy_cache(path):
+            found, data = _cache_store().lookup(path)
+    except Exception:
+        return default
+    return default if data is None else data
+
+
+def fb_export_cache(out_dir=None):
+    """로컬 캐시를 사람이 읽을 수 있는 JSON(들여쓰기)으로 내보냄 → 만든 파일 목록
+
+    최상위 경로마다 파일 하나. out_dir 기본값: data/cache_export/
+    """
+    out_dir = out_dir or os.path.join(CACHE_DIR, "cache_export")
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name in _cache_store().top_level():
+        data = _load_cache(name)
+        if data is None:
+            continue
+        out_file = os.path.join(out_dir, name.replace("/", "_") + ".json")
+        with open(out_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        written.append(out_file)
+    return written
+
+
+# ============================================================
+# 프로세스 전역 조회 캐시 (모든 Flet 세션이 공유)
+# ============================================================
+READ_CACHE_TTL = 5                      # 서버 응답을 재사용하는 시간 (초)
+READ_CACHE_MAX_BYTES = 8 * 1024 * 1024  # 캐시 전체 크기 상한 (JSON 바이트)
+
+
+class _ReadCache:
+    """path → 서버 응답 JSON 문자열 TTL/LRU 캐시
+
+    같은 프로세스의 여러 브라우저 세션이 같은 경로를 읽을 때 한 번만 내려받는다.
+    값을 JSON 문자열로 보관하므로 꺼낼 때마다 새 객체가 만들어져
+    한 세션이 결과를 수정해도 다른 세션에 영향이 없다.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()   # key -> (받은 시각, JSON 문자열, etag)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, max_age=None):
+        """→ (data, etag) 또는 None (없거나 max_age초(기본 READ_CACHE_TTL)보다 오래됨)
+
+        만료된 항목도 바로 지우지 않으므로 max_age를 TTL보다 크게 주면
+        LRU로 밀려나기 전까지는 더 오래된 응답도 받을 수 있다.
+        """
+        key = rtdb_tree.join_path(path)
+        max_age = READ_CACHE_TTL if max_age is None else max_age
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > max_age:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(entry[1]), entry[2]
+
+    def put(self, path, data, etag=None):
+        if READ_CACHE_TTL <= 0:
+            return
+        key = rtdb_tree.join_path(path)
+        text = json.dumps(data, ensure_ascii=False)
+        size = len(text.encode("utf-8"))
+        if size > READ_CACHE_MAX_BYTES:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic(), text, etag)
+            self._bytes += size
+            while self._bytes > READ_CACHE_MAX_BYTES:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1].encode("utf-8"))
+
+    def invalidate(self, path):
+        """path와 겹치는(상위/하위) 모든 항목 삭제"""
+        with self._lock:
+            for key in list(self._entries):
+                if _paths_overlap(key, path):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "coalesced": _single_flight.shared,
+            }
+
+
+_read_cache = _ReadCache()
+
+
+def configure_read_cache(ttl=None, max_bytes=None):
+    """조회 캐시 TTL/크기 상한 변경 (ttl=0이면 캐시 끔) 후 비움"""
+    global READ_CACHE_TTL, READ_CACHE_MAX_BYTES
+    if ttl is not None:
+        READ_CACHE_TTL = ttl
+    if max_bytes is not None:
+        READ_CACHE_MAX_BYTES = max_bytes
+    _read_cache.clear()
+
+
+def fb_read_cache_stats():
+    """조회 캐시 통계 {"entries", "bytes", "hits", "misses", "hit_rate", "evictions",
+    "coalesced"(동시 요청을 합쳐 HTTP 요청을 아낀 횟수)}"""
+    return _read_cache.stats()
+
+
+def fb_get(path, default=None, max_staleness=None):
+    """Firebase에서 데이터 조회 (GET)
+
+    max_staleness: 조회 캐시에서 허용할 응답 나이 (초, 기본 READ_CACHE_TTL, 0이면 새로 받음)
+    """
+    data, _ = fb_get_if_changed(path, default=default, max_staleness=max_staleness)
+    return data
+
+
+@metered("get")
+def fb_get_if_changed(path, known_etag=None, default=None, max_staleness=None):
+    """ETag 기반 조건부 조회 (GET)
+
+    X-Firebase-ETag로 받은 ETag를 캐시 파일 옆에 기억해 두고,
+    - 서버 ETag가 호출 측이 가진 known_etag와 같으면 data=None (변경 없음)
+    - 캐시의 ETag와 같으면(304 포함) 본문 대신 로컬 캐시를 사용
+    오프라인/실패 시 known_etag가 있으면 변경 없음으로, 없으면 캐시로 폴백한다.
+    스트림 미러가 path를 덮고 있으면 네트워크 없이 미러에서 응답하고,
+    max_staleness초(기본 READ_CACHE_TTL) 안에 다른 세션이 받아 둔 응답이
+    있으면 그것을 재사용한다. 같은 path를 동시에 요청하면 HTTP 요청은 한 번만 나간다.
+    반환값: (data, etag)
+    """
+    mirrored = _mirror_read(path)
+    if mirrored is not None:
+        note_source("mirror")
+        data, version = mirrored
+        if version == known_etag:
+            return None, version
+        return (default if data is None else data), version
+
+    hit = _read_cache.get(path, max_staleness)
+    if hit is not None:
+        note_source("read_cache")
+    else:
         try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
-            pass
-    return default
+            hit = _single_flight.do(("get", rtdb_tree.join_path(path)), _fetch, path)
+        except Exception as e:
+            note_source("fallback", e)
+            if known_etag:
+                return None, known_etag
+            data = _load_cache(path)
+            return (default if data is None else data), None
+
+    data, etag = hit
+    if etag and etag == known_etag:
+        return None, etag
+    return (default if data is None else data), etag
 
 
-def fb_get(path, default=None):
-    """Firebase에서 데이터 조회 (GET)"""
+def _fetch(path):
+    """서버에서 path를 받아 로컬 캐시/조회 캐시에 저장 → (data, etag) (실패 시 예외)"""
     if not is_firebase_configured():
-        return _load_cache(path, default)
+        raise ConnectionError("Firebase not configured")
+    cached_etag = _load_etag(path)
+    headers = {"X-Firebase-ETag": "true"}
+    if cached_etag:
+        headers["If-None-Match"] = cached_etag
+    resp = _request("GET", path, headers=headers)
+    etag = cached_etag if resp.status_code == 304 else resp.headers.get("ETag")
+    if etag and etag == cached_etag:
+        note_source("etag_match")
+        data = _load_cache(path)
+        _read_cache.put(path, data, etag)
+        return data, etag
 
-    try:
-        url = f"{FIREBASE_URL}/{path}.json"
-        resp = requests.get(url, timeout=TIMEOUT)
-        resp.raise_for_status()
-        data = resp.json()
-        if data is None:
-            data = default
-        _save_cache(path, data)
-        return data
-    except Exception:
-        return _load_cache(path, default)
+    data = resp.json()
+    pending = _write_queue.has_pending(path)
+    if pending:
+        # 아직 보내지 못한 로컬 쓰기가 서버 값에 덮여 사라지지 않도록 다시 얹음
+        data = _write_queue.overlay(path, data)
+    else:
+        _read_cache.put(path, data, etag)
+    _save_cache(path, data)
+    if etag and not pending:
+        _save_etag(path, etag)
+    return data, etag
+
+
+class _SingleFlight:
+    """같은 키의 동시 호출을 하나로 합침
+
+    먼저 온 호출만 실제로 실행하고, 그 사이 들어온 호출은 같은 Future를
+    기다렸다가 결과(또는 예외)의 사본을 나눠 받는다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}        # key -> Future
+        self.shared = 0         # 다른 호출의 결과를 나눠 받은 횟수
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            note_source("coalesced")
+            return copy.deepcopy(future.result())
+
+        try:
+            result = func(*args)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_single_flight = _SingleFlight()
+
+
+def _gather(calls, fallback, deadline):
+    """{key: (func, args)} 를 공유 스레드 풀에서 동시에 실행
+
+    deadline 초 안에 끝나지 않거나 실패한 항목은 fallback(key) 결과를 쓴다.
+    """
+    if deadline is None:
+        deadline = TIMEOUT
+    # 화면(scope) 라벨 등 호출 측 컨텍스트를 작업 스레드로 넘김
+    futures = {
+        key: _get_executor().submit(contextvars.copy_context().run, func, *args)
+        for key, (func, args) in calls.items()
+    }
+    wait(futures.values(), timeout=deadline)
+
+    results = {}
+    for key, future in futures.items():
+        if future.done() and future.exception() is None:
+            results[key] = future.result()
+        else:
+            results[key] = fallback(key)
+    return results
+
+
+def fb_get_many(paths, defaults=None, deadline=None):
+    """여러 경로를 동시에 조회 (GET)
+
+    모든 조회가 끝나거나 공유 마감시간(deadline 초)이 지나면 반환하며,
+    마감까지 끝나지 않은 경로는 로컬 캐시로 폴백한다.
+    반환값: {path: data}
+    """
+    defaults = defaults or {}
+    calls = {path: (fb_get, (path, defaults.get(path))) for path in paths}
+    return _gather(calls, lambda path: _load_cache(path, defaults.get(path)), deadline)
+
+
+def fb_get_many_if_changed(known_etags, defaults=None, deadline=None):
+    """여러 경로를 동시에 조건부 조회 (GET + ETag)
+
+    known_etags: {path: etag 또는 None}
+    반환값: {path: (data, etag)} - 호출 측 버전과 같은 경로는 빠진다
+    """
+    defaults = defaults or {}
+    calls = {
+        path: (fb_get_if_changed, (path, etag, defaults.get(path)))
+        for path, etag in known_etags.items()
+    }
 
+    def fallback(path):
+        if known_etags[path]:
+            return None, known_etags[path]
+        return _load_cache(path, defaults.get(path)), None
 
+    results = _gather(calls, fallback, deadline)
+    return {
+        path: result for path, result in results.items()
+        if not (known_etags[path] and result[1] == known_etags[path])
+    }
+
+
+_count_cache = {}           # path -> (만료 시각, 개수)
+_count_lock = threading.Lock()
+
+
+@metered("count")
+def fb_count(path, ttl=None):
+    """path 아래 자식 개수만 조회 (GET ?shallow=true)
+
+    레코드 본문 없이 키 목록만 내려받으며, 결과는 ttl초(기본 COUNT_TTL)
+    동안 프로세스 전역으로 캐시한다. 로컬 쓰기가 있으면 바로 무효화된다.
+    서버/미러/캐시 어디에서도 셀 수 없으면 None.
+    """
+    ttl = COUNT_TTL if ttl is None else ttl
+    now = time.monotonic()
+    with _count_lock:
+        cached = _count_cache.get(path)
+    if cached and cached[0] > now:
+        note_source("read_cache")
+        return cached[1]
+
+    mirrored = _mirror_read(path)
+    if mirrored is not None:
+        note_source("mirror")
+        count = len(rtdb_tree.children(mirrored[0]))
+    else:
+        try:
+            count = _single_flight.do(("count", rtdb_tree.join_path(path)), _fetch_count, path)
+        except Exception as e:
+            note_source("fallback", e)
+            cached = _load_cache(path)
+            # 오프라인 값은 캐시하지 않음 (연결되면 바로 서버 값 사용)
+            return None if cached is None else len(rtdb_tree.children(cached))
+
+    with _count_lock:
+        _count_cache[path] = (now + ttl, count)
+    return count
+
+
+def _fetch_count(path):
+    if not is_firebase_configured():
+        raise ConnectionError("Firebase not configured")
+    resp = _request("GET", path, params={"shallow": "true"})
+    return len(rtdb_tree.children(resp.json()))
+
+
+def fb_count_many(paths, deadline=None):
+    """여러 경로의 자식 개수를 동시에 조회 → {path: 개수 또는 None}"""
+    calls = {path: (fb_count, (path,)) for path in paths}
+    return _gather(calls, lambda path: None, deadline)
+
+
+def _invalidate_counts(path):
+    """path와 겹치는(상위/하위) 개수 캐시 삭제"""
+    with _count_lock:
+        for cached_path in list(_count_cache):
+            if (rtdb_tree.relative_path(cached_path, path) is not None
+                    or rtdb_tree.relative_path(path, cached_path) is not None):
+                del _count_cache[cached_path]
+
+
+@metered("put")
 def fb_put(path, data):
-    """Firebase에 데이터 전체 덮어쓰기 (PUT)"""
-    _save_cache(path, data)
+    """Firebase에 데이터 전체 덮어쓰기 (PUT)
+
+    반환값: 서버 반영 여부. 연결 실패로 False가 되어도 변경은 아웃박스에
+    남아 재연결 시 재전송되므로 사라지지 않는다.
+    """
+    return _send("PUT", path, data) == "synced"
+
+
+@metered("patch")
+def fb_patch(path, data):
+    """Firebase 데이터 부분 업데이트 (PATCH)"""
+    return _send("PATCH", path, data) == "synced"
 
+
+@metered("delete")
+def fb_delete(path):
+    """Firebase 데이터 삭제 (DELETE)"""
+    return _send("DELETE", path, None) == "synced"
+
+
+@metered("push")
+def fb_push(path, data):
+    """Firebase에 새 항목 추가 (POST) → 새 키 (서버가 거절하면 None)
+
+    POST와 같은 형식의 푸시 키를 클라이언트에서 만들어 PUT 하므로
+    같은 요청을 다시 보내도 항목이 하나만 생겨 아웃박스 재전송에도 안전하고,
+    응답을 기다리지 않아도 로컬 캐시에 같은 키로 바로 반영된다.
+    """
+    key = rtdb_tree.push_id()
+    if _send("PUT", rtdb_tree.join_path(path, key), data) == "rejected":
+        return None
+    return key
+
+
+def _send(method, path, data):
+    """쓰기 한 건을 서버와 로컬 캐시에 반영 → "synced" / "queued" / "rejected"
+
+    - 서버가 받아들이면 응답 본문(서버 값이 채워진 실제 기록 값)을 로컬에 반영
+    - 서버가 거절하면(4xx) 로컬도 건드리지 않음
+    - 연결 실패/5xx/429 시 로컬에 먼저 반영하고 아웃박스에 넣어 재연결 시 재전송
+    같은 경로에 아직 보내지 못한 쓰기가 있으면 순서가 뒤바뀌지 않도록
+    바로 보내지 않고 큐 뒤에 세운다. Firebase 설정이 없으면 로컬에만 반영한다.
+    """
     if not is_firebase_configured():
+        note_source("local")
+        _apply_local(rtdb_tree.write_updates(method, path, data))
+        return "synced"
+    if _write_queue.has_pending(path):
+        note_source("queued")
+        _apply_local(rtdb_tree.write_updates(method, path, data))
+        _write_queue.enqueue(method, path, data)
+        return "queued"
+    try:
+        resp = _request(method, path, json=data)
+    except Exception as e:
+        if _is_rejection(e):
+            note_source("rejected", e)
+            return "rejected"
+        note_source("queued", e)
+        _apply_local(rtdb_tree.write_updates(method, path, data))
+        _write_queue.enqueue(method, path, data)
+        return "queued"
+    try:
+        written = resp.json() if method != "DELETE" else None
+    except ValueError:
+        written = data
+    _apply_local(rtdb_tree.write_updates(method, path, written))
+    if method == "PUT":
+        # 방금 쓴 값이 곧 서버 값이므로 바로 다시 읽어도 요청이 나가지 않게
+        _read_cache.put(path, rtdb_tree.export(rtdb_tree.normalize(written)))
+    return "synced"
+
+
+def _merge_update(updates, path, data):
+    """다중 경로 변경 {경로: 값}에 path=data를 합침
+
+    RTDB는 한 요청 안에서 상위/하위 경로가 겹치는 것을 거절하므로
+    이미 상위 경로가 있으면 그 값 안에 반영하고, 하위 경로는 지운다.
+    같은 경로의 증가 자리표시자끼리는 덮어쓰지 않고 더한다 (큐에서 합쳐져도 잃지 않게).
+    """
+    path = rtdb_tree.join_path(path)
+    previous, delta = rtdb_tree.increment_of(updates.get(path)), rtdb_tree.increment_of(data)
+    if previous is not None and delta is not None:
+        updates[path] = server_increment(previous + delta)
+        return updates
+    for pending in list(updates):
+        rel = rtdb_tree.relative_path(pending, path)
+        if rel is not None and pending != path:
+            tree = rtdb_tree.set_at(rtdb_tree.normalize(updates[pending]), rel, data)
+            updates[pending] = rtdb_tree.export(tree)
+            return updates
+        if rtdb_tree.relative_path(path, pending) is not None:
+            del updates[pending]
+    updates[path] = data
+    return updates
+
+
+def _apply_local(updates):
+    """{경로: 값} 변경을 로컬 캐시/미러/개수 캐시에 한꺼번에 반영
+
+    계층형 캐시라 각 경로의 노드만 다시 쓰고, 상위 경로 조회는 자식 노드를 모아 만든다.
+    서버 타임스탬프는 로컬 시각으로, 증가는 캐시 값에 더해 채워 둔다 (서버 값이 오면 교체됨).
+    """
+    now_ms = int(time.time() * 1000)
+    for path, value in updates.items():
+        current = _load_cache(path) if rtdb_tree.has_increment(value) else None
+        value = rtdb_tree.resolve_server_values(value, now_ms, current)
+        top = (rtdb_tree.split_path(path) or [""])[0]
+        _generations[top] = _generations.get(top, 0) + 1
+        _save_cache(path, value)
+        _mirror_write("PUT", path, value)
+        _invalidate_counts(path)
+        _read_cache.invalidate(path)
+
+
+class WriteBatch:
+    """여러 경로의 변경을 모아 루트에 대한 다중 경로 PATCH 한 번으로 전송
+
+    RTDB 다중 경로 업데이트는 전부 적용되거나 전부 거절되므로
+    일괄 저장이 중간에 일부만 반영되는 일이 없다.
+    같은 배치 안에서 상위/하위 경로가 겹치면 상위 값에 합쳐진다.
+
+        batch = WriteBatch()
+        batch.put("matches/matches/12", match)
+        batch.delete("members/members/3")
+        batch.commit()
+    """
+
+    def __init__(self):
+        self._updates = {}
+
+    def __len__(self):
+        return len(self._updates)
+
+    def put(self, path, data):
+        """path 값을 data로 덮어쓰기 (None이면 삭제)"""
+        _merge_update(self._updates, path, data)
+        return self
+
+    def update(self, path, changes):
+        """path 아래 여러 자식을 갱신 (PATCH와 같은 의미)"""
+        for key, value in changes.items():
+            self.put(rtdb_tree.join_path(path, str(key)), value)
+        return self
+
+    def delete(self, path):
+        return self.put(path, None)
+
+    def commit(self):
+        """배치 전송 → 성공 여부
+
+        서버가 거절하면(4xx) 로컬 캐시도 건드리지 않고 False.
+        연결 실패/5xx 시에는 로컬 캐시에 반영하고 아웃박스에 넣어 재연결 시 재전송한다.
+        """
+        if not self._updates:
+            return True
+        updates, self._updates = self._updates, {}
+        return _send("PATCH", "", updates) == "synced"
+
+    def commit_direct(self):
+        """서버에 바로 보내고 결과만 반환 - 아웃박스에 넣지 않음 (CLI 도구용)
+
+        commit()은 연결 실패 시 쓰기를 아웃박스에 남겨 다음 앱 실행 때 재전송하므로
+        실패를 보고한 뒤에도 언젠가 반영된다. 1회성 도구는 이 메서드를 써서
+        False면 아무것도 남지 않게 한다 (연결이 끊긴 경우 서버 반영 여부는 알 수 없으니
+        다시 실행해도 안전하게 만들어야 한다).
+        """
+        if not self._updates:
+            return True
+        updates, self._updates = self._updates, {}
+        if not is_firebase_configured():
+            return False
+        try:
+            resp = _request("PATCH", "", json=updates)
+        except Exception as e:
+            firebase_metrics.record_error("batch", "", e)
+            return False
+        try:
+            written = resp.json()
+        except ValueError:
+            written = updates
+        _apply_local(written if isinstance(written, dict) else updates)
         return True
 
+    def commit_async(self):
+        """로컬에 바로 반영하고 전송은 쓰기 큐에 맡김 (즉시 반환)"""
+        if not self._updates:
+            return
+        updates, self._updates = self._updates, {}
+        _apply_local(updates)
+        if is_firebase_configured():
+            _write_queue.enqueue("PATCH", "", updates)
+
+
+def fb_batch():
+    """새 WriteBatch 생성"""
+    return WriteBatch()
+
+
+def server_increment(delta):
+    """서버가 그 자리의 현재 값에 delta를 더하게 하는 자리표시자
+
+    여러 기기가 같은 개수를 동시에 고쳐도 서로의 변경을 덮어쓰지 않는다.
+    """
+    return {".sv": {"increment": delta}}
+
+
+# ============================================================
+# 델타 동기화 (updated_at 기준 변경분만 받기)
+# ============================================================
+SERVER_TIMESTAMP = {".sv": "timestamp"}     # 서버가 쓰는 순간의 시각(ms)으로 바뀜
+TOMBSTONE_ROOT = "_tombstones"              # 삭제 기록: _tombstones/{컬렉션}/{키} = 삭제 시각
+TOMBSTONE_RESET = "~reset"                  # 컬렉션 전체를 덮어쓴 시각 (받으면 전체 다시 받기)
+TOMBSTONE_RETENTION = 30 * 24 * 3600        # 삭제 기록 보관 기간 (초) - 이보다 오래 동기화 안 했으면 전체 받기
+FULL_SYNC_INTERVAL = 24 * 3600              # 이 간격마다 한 번은 전체를 받아 어긋남을 바로잡음 (초)
+SYNC_OVERLAP_MS = 1000                      # 커서보다 조금 앞에서부터 다시 받음 (같은 ms 쓰기 대비)
+
+_sync_state = None          # path -> {"cursor", "full_at", "synced_at", "reset"}
+_generations = {}           # 최상위 경로 -> 로컬 쓰기 횟수 (동기화 버전에 포함)
+_sync_lock = threading.Lock()
+
+
+def _sync_state_path():
+    return os.path.join(CACHE_DIR, "sync_state.json")
+
+
+def _get_sync_state(path):
+    global _sync_state
+    with _sync_lock:
+        if _sync_state is None:
+            try:
+                with open(_sync_state_path(), 'r', encoding='utf-8') as f:
+                    _sync_state = json.load(f)
+            except Exception:
+                _sync_state = {}
+        state = _sync_state.get(rtdb_tree.join_path(path))
+        return dict(state) if state else None
+
+
+def _set_sync_state(path, state):
+    with _sync_lock:
+        _sync_state[rtdb_tree.join_path(path)] = state
+        text = json.dumps(_sync_state, ensure_ascii=False)
     try:
-        url = f"{FIREBASE_URL}/{path}.json"
-        resp = requests.put(url, json=data, timeout=TIMEOUT)
-        resp.raise_for_status()
-        return True
+        _ensure_cache_dir()
+        cache_codec.write_atomic(_sync_state_path(), text.encode("utf-8"))
     except Exception:
-        return False
+        pass
 
 
-def fb_patch(path, data):
-    """Firebase 데이터 부분 업데이트 (PATCH)"""
+def _sync_version(path, state):
+    """커서 + 로컬 쓰기 세대 - 같은 프로세스의 다른 세션이 쓴 것도 변경으로 보이게"""
+    top = (rtdb_tree.split_path(path) or [""])[0]
+    return f"sync:{state['cursor']}:{state['full_at']}:{_generations.get(top, 0)}"
+
+
+def _max_updated_at(records, cursor=0):
+    for record in rtdb_tree.children(records):
+        stamp = record.get("updated_at") if isinstance(record, dict) else None
+        if isinstance(stamp, (int, float)) and stamp > cursor:
+            cursor = stamp
+    return cursor
+
+
+@metered("sync")
+def fb_sync(path, known_version=None, default=None, max_staleness=None):
+    """path 아래 레코드 중 마지막 동기화 이후 바뀐 것만 받아 로컬 캐시에 합침
+
+    레코드마다 updated_at(SERVER_TIMESTAMP로 저장)이 있어야 하며,
+    orderBy="updated_at"&startAt=커서 쿼리 한 번과 삭제 기록
+    (_tombstones/{path}) 쿼리 한 번으로 변경분을 받는다.
+    처음이거나 FULL_SYNC_INTERVAL이 지났거나, 삭제 기록 보관 기간보다 오래
+    동기화하지 않았거나, 서버가 쿼리를 거절하면(인덱스 없음) 전체를 받는다.
+    max_staleness초(기본 READ_CACHE_TTL) 안에 다른 세션이 동기화했으면
+    서버에 묻지 않고 로컬 캐시로 응답한다.
+    fb_get_if_changed와 같은 규칙으로 (data, version)을 반환하며
+    version이 known_version과 같으면 data=None (변경 없음).
+    """
+    if _mirror_read(path) is not None:
+        return fb_get_if_changed(path, known_version, default, max_staleness)
+    max_age = READ_CACHE_TTL if max_staleness is None else max_staleness
+    state = _get_sync_state(path)
+    if (state and time.time() - state["synced_at"] <= max_age
+            and _cache_exists(path) and not _write_queue.has_pending(path)):
+        note_source("read_cache")
+        version = _sync_version(path, state)
+        if version == known_version:
+            return None, version
+        data = _load_cache(path)
+        return (default if data is None else data), version
+    try:
+        data, version = _single_flight.do(("sync", rtdb_tree.join_path(path)), _sync, path)
+    except Exception as e:
+        note_source("fallback", e)
+        if known_version:
+            return None, known_version
+        data = _load_cache(path)
+        return (default if data is None else data), None
+    if version == known_version:
+        return None, version
+    return (default if data is None else data), version
+
+
+def _sync(path):
+    """변경분(또는 전체)을 받아 로컬 캐시에 반영 → (data, version) (실패 시 예외)"""
     if not is_firebase_configured():
-        existing = _load_cache(path, {})
-        if isinstance(existing, dict):
-            existing.update(data)
-            _save_cache(path, existing)
-        return True
+        raise ConnectionError("Firebase not configured")
+    state = _get_sync_state(path)
+    now = time.time()
+    if (state is None or not _cache_exists(path)
+            or now - state["full_at"] > FULL_SYNC_INTERVAL
+            or now - state["synced_at"] > TOMBSTONE_RETENTION):
+        return _full_sync(path, state)
 
+    start = max(state["cursor"] - SYNC_OVERLAP_MS, 0)
+    params = {"orderBy": json.dumps("updated_at"), "startAt": json.dumps(start)}
     try:
-        url = f"{FIREBASE_URL}/{path}.json"
-        resp = requests.patch(url, json=data, timeout=TIMEOUT)
-        resp.raise_for_status()
-        _save_cache(path, data)
-        return True
+        changed = _request("GET", path, params=params).json() or {}
+        params["orderBy"] = json.dumps("$value")
+        removed = _request("GET", rtdb_tree.join_path(TOMBSTONE_ROOT, path), params=params).json() or {}
+    except requests.HTTPError:
+        # .indexOn 규칙이 없어 쿼리가 거절됨
+        return _full_sync(path, state)
+    if not isinstance(changed, dict) or not isinstance(removed, dict):
+        return _full_sync(path, state)
+
+    reset = removed.pop(TOMBSTONE_RESET, None)
+    if isinstance(reset, (int, float)) and reset > state.get("reset", 0):
+        # 다른 기기가 컬렉션 전체를 덮어씀 - 지워진 키를 알 수 없으므로 전체 받기
+        state["reset"] = reset
+        return _full_sync(path, state)
+
+    updates = {}
+    cursor = _max_updated_at(changed, state["cursor"])
+    # 레코드마다 캐시를 따로 읽지 않고 컬렉션을 한 번만 읽어 비교
+    current = _load_cache(path)
+    for key, record in changed.items():
+        record_path = rtdb_tree.join_path(path, key)
+        if _write_queue.has_pending(record_path):
+            continue
+        if rtdb_tree.normalize(record) != rtdb_tree.normalize(rtdb_tree.child_at(current, key)):
+            # 겹쳐 받은 구간에서 이미 가진 레코드는 다시 쓰지 않음
+            updates[record_path] = record
+    for key, stamp in removed.items():
+        if not isinstance(stamp, (int, float)):
+            continue
+        cursor = max(cursor, stamp)
+        record_path = rtdb_tree.join_path(path, key)
+        if key in changed or _write_queue.has_pending(record_path):
+            continue
+        local = rtdb_tree.child_at(current, key)
+        if isinstance(local, dict) and isinstance(local.get("updated_at"), (int, float)) \
+                and local["updated_at"] > stamp:
+            continue    # 삭제 뒤에 다시 만들어진 레코드
+        if local is not None:
+            updates[record_path] = None
+    if updates:
+        note_source("delta")
+        _apply_local(updates)
+    else:
+        note_source("unchanged")
+
+    state.update(cursor=cursor, synced_at=now)
+    _set_sync_state(path, state)
+    return (_load_cache(path) if updates else current), _sync_version(path, state)
+
+
+def _full_sync(path, state):
+    """전체를 받아 커서를 새로 잡고, 보관 기간이 지난 삭제 기록을 정리"""
+    note_source("full_sync")
+    data, _ = _fetch(path)
+    now = time.time()
+    state = dict(state or {}, cursor=_max_updated_at(data), full_at=now, synced_at=now)
+    state.setdefault("reset", 0)
+    _prune_tombstones(path, now)
+    _set_sync_state(path, state)
+    return data, _sync_version(path, state)
+
+
+def _prune_tombstones(path, now):
+    """보관 기간이 지난 삭제 기록을 지움 (실패해도 다음 전체 동기화 때 다시 시도)"""
+    tomb_path = rtdb_tree.join_path(TOMBSTONE_ROOT, path)
+    params = {"orderBy": json.dumps("$value"),
+              "endAt": json.dumps(int((now - TOMBSTONE_RETENTION) * 1000))}
+    try:
+        expired = _request("GET", tomb_path, params=params).json() or {}
+        if isinstance(expired, dict) and expired:
+            _request("PATCH", tomb_path, json={key: None for key in expired})
     except Exception:
-        return False
+        pass
 
 
-def fb_delete(path):
-    """Firebase 데이터 삭제 (DELETE)"""
-    cache_file = _cache_path(path)
-    if os.path.exists(cache_file):
+def fb_sync_many(known_versions, defaults=None, deadline=None):
+    """여러 경로를 동시에 델타 동기화
+
+    known_versions: {path: version 또는 None}
+    반환값: {path: (data, version)} - 호출 측 버전과 같은 경로는 빠진다
+    """
+    defaults = defaults or {}
+    calls = {
+        path: (fb_sync, (path, version, defaults.get(path)))
+        for path, version in known_versions.items()
+    }
+
+    def fallback(path):
+        if known_versions[path]:
+            return None, known_versions[path]
+        return _load_cache(path, defaults.get(path)), None
+
+    results = _gather(calls, fallback, deadline)
+    return {
+        path: result for path, result in results.items()
+        if not (known_versions[path] and result[1] == known_versions[path])
+    }
+
+
+# ============================================================
+# 쓰기 지연(write-behind) 큐 + 아웃박스
+# ============================================================
+FLUSH_RETRY_MAX = 30        # 연결 실패 시 재전송 대기 최대 (초)
+OUTBOX_COMPACT_ACKS = 200   # 확인(ack) 기록이 이만큼 쌓이면 저널을 다시 씀
+
+
+def _outbox_path():
+    return os.path.join(CACHE_DIR, "outbox.jsonl")
+
+
+class _WriteQueue:
+    """로컬에 먼저 반영한 쓰기를 백그라운드 스레드가 순서대로 서버에 전송
+
+    - 같은 경로에 연속으로 쓰면 하나로 합쳐 마지막 결과만 보낸다
+    - 경로가 겹치는(상위/하위) 쓰기는 합치지 않고 순서대로 보낸다
+    - 연결 실패/5xx/429는 지수 백오프로 재전송, 서버 거절(4xx)은 버리고 failed
+      (먼저 반영해 둔 로컬 값은 서버 값으로 되돌림)
+
+    보내지 못한 쓰기는 data/outbox.jsonl 저널에 한 줄씩 추가 기록되므로
+    앱이 꺼져도 다음 실행 때 같은 순서로 다시 보낸다.
+        {"id": 키, "method": .., "path": .., "data": .., "ts": 생성 시각}
+        {"ack": 키}
+    id는 쓰기마다 고유한 멱등 키로, 합쳐진 쓰기는 같은 id로 다시 기록되고
+    저널을 읽을 때는 id별 마지막 기록이 이긴다. 전송 뒤 ack 전에 꺼져서
+    다시 보내더라도 PUT/PATCH/DELETE는 결과가 같다 (push도 PUT으로 보냄).
+    단 증가 자리표시자(server_increment)는 그 경우 한 번 더 더해진다.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._entries = []          # 전송 대기 [{"id", "method", "path", "data", "ts"}]
+        self._inflight = None
+        self._status = {}           # path -> "pending" | "failed" (synced는 지움)
+        self._listeners = []
+        self._thread = None
+        self._loaded = False
+        self._acks = 0              # 마지막 압축 이후 저널에 쌓인 ack 수
+        self._wake = threading.Event()
+
+    # ---------------- 저널 ----------------
+    def _ensure_loaded(self):
+        """처음 사용할 때 저널에서 미전송 쓰기를 복원 (락 안에서 호출)"""
+        if self._loaded:
+            return
+        self._loaded = True
+        pending = {}
         try:
-            os.remove(cache_file)
+            with open(_outbox_path(), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # 기록 도중 꺼져 잘린 줄
+                    if "ack" in record:
+                        pending.pop(record["ack"], None)
+                    elif record.get("id") in pending:
+                        pending[record["id"]].update(record)
+                    else:
+                        pending[record["id"]] = record
+        except FileNotFoundError:
+            return
         except Exception:
             pass
+        self._entries = list(pending.values())
+        for entry in self._entries:
+            self._status[entry["path"]] = "pending"
+        self._compact()
+        if self._entries:
+            self._start()
 
-    if not is_firebase_configured():
+    def _append(self, record):
+        try:
+            _ensure_cache_dir()
+            with open(_outbox_path(), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception:
+            pass
+
+    def _ack(self, entry):
+        self._append({"ack": entry["id"]})
+        self._acks += 1
+        if (not self._entries and not self._inflight) or self._acks >= OUTBOX_COMPACT_ACKS:
+            self._compact()
+
+    def _compact(self):
+        """확인된 기록을 버리고 미전송 쓰기만 남긴 저널로 교체"""
+        self._acks = 0
+        entries = ([self._inflight] if self._inflight else []) + self._entries
+        path = _outbox_path()
+        try:
+            if not entries:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            pass
+
+    # ---------------- 큐 ----------------
+    def enqueue(self, method, path, data):
+        path = rtdb_tree.join_path(path)
+        if method == "DELETE":
+            method, data = "PUT", None
+        with self._cond:
+            self._ensure_loaded()
+            entry = self._coalesce_or_append(method, path, data)
+            self._append(entry)
+            self._status[path] = "pending"
+            self._start()
+            self._cond.notify_all()
+        self._notify()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="fb-writer", daemon=True)
+            self._thread.start()
+
+    def _coalesce_or_append(self, method, path, data):
+        for entry in reversed(self._entries):
+            if not _paths_overlap(entry["path"], path):
+                continue
+            if entry["path"] == path:
+                if method == "PUT":
+                    entry["method"], entry["data"] = "PUT", data
+                elif entry["method"] == "PUT":
+                    tree = rtdb_tree.update_at(rtdb_tree.normalize(entry["data"]), "", data)
+                    entry["data"] = rtdb_tree.export(tree)
+                else:
+                    for key, value in data.items():
+                        _merge_update(entry["data"], key, value)
+                return entry
+            break
+        if method == "PATCH":
+            data = dict(data)
+        entry = {"id": uuid.uuid4().hex, "method": method, "path": path, "data": data,
+                 "ts": time.time()}
+        self._entries.append(entry)
+        return entry
+
+    def _run(self):
+        backoff = 1
+        while True:
+            with self._cond:
+                while not self._entries:
+                    self._cond.wait()
+                entry = self._inflight = self._entries.pop(0)
+
+            try:
+                _request(entry["method"], entry["path"], json=entry["data"])
+                result = "synced"
+            except Exception as e:
+                firebase_metrics.record_error("write_queue", entry["path"], e)
+                result = "failed" if _is_rejection(e) else None
+
+            with self._cond:
+                self._inflight = None
+                path = entry["path"]
+                if result is None:
+                    # 연결 실패/5xx/429: 맨 앞에 다시 넣고 잠시 후 재전송
+                    self._entries.insert(0, entry)
+                    self._status[path] = "failed"
+                else:
+                    self._ack(entry)
+                    if any(e["path"] == path for e in self._entries):
+                        self._status[path] = "pending"
+                    elif result == "synced":
+                        self._status.pop(path, None)
+                    else:
+                        self._status[path] = "failed"
+                self._cond.notify_all()
+            self._notify()
+
+            if result == "failed":
+                for path in _written_paths(entry):
+                    _reconcile(path)
+            if result is None:
+                # 재연결되면(wake) 기다리지 않고 바로 재전송
+                self._wake.wait(backoff * random.uniform(0.5, 1.0))
+                self._wake.clear()
+                backoff = min(backoff * 2, FLUSH_RETRY_MAX)
+            else:
+                backoff = 1
+
+    def wake(self):
+        """재전송 대기 중이면 바로 깨움"""
+        self._wake.set()
+
+    def replay(self):
+        """저널에 남은 쓰기 전송 시작 → 대기 중인 쓰기 수"""
+        with self._cond:
+            self._ensure_loaded()
+            return len(self._entries) + (1 if self._inflight else 0)
+
+    def has_pending(self, path):
+        """path와 겹치는 미전송 쓰기가 있는지 ("" 이면 아무 쓰기나)"""
+        with self._cond:
+            self._ensure_loaded()
+            return any(_paths_overlap(entry["path"], path) for entry in self._pending())
+
+    def _pending(self):
+        return ([self._inflight] if self._inflight else []) + self._entries
+
+    def overlay(self, path, value):
+        """서버에서 받은 path 값 위에 아직 보내지 못한 쓰기를 순서대로 덮어씀"""
+        with self._cond:
+            self._ensure_loaded()
+            entries = [entry for entry in self._pending() if _paths_overlap(entry["path"], path)]
+        if not entries:
+            return value
+        tree = rtdb_tree.normalize(value)
+        now_ms = int(time.time() * 1000)
+        for entry in entries:
+            updates = rtdb_tree.write_updates(entry["method"], entry["path"], entry["data"])
+            for write_path, data in updates.items():
+                rel = rtdb_tree.relative_path(path, write_path)
+                current = rtdb_tree.export(rtdb_tree.get_at(tree, rel)) if rel is not None else None
+                data = rtdb_tree.resolve_server_values(data, now_ms, current)
+                if rel is not None:
+                    tree = rtdb_tree.set_at(tree, rel, data)
+                else:
+                    rel = rtdb_tree.relative_path(write_path, path)
+                    if rel is not None:
+                        tree = rtdb_tree.get_at(rtdb_tree.normalize(data), rel)
+        return rtdb_tree.export(tree)
+
+    def stats(self):
+        with self._cond:
+            self._ensure_loaded()
+            pending = self._pending()
+            oldest = min((entry["ts"] for entry in pending), default=None)
+        try:
+            journal_bytes = os.path.getsize(_outbox_path())
+        except OSError:
+            journal_bytes = 0
+        return {
+            "depth": len(pending),
+            "oldest_age": None if oldest is None else max(0.0, time.time() - oldest),
+            "journal_bytes": journal_bytes,
+            "status": self.status(),
+        }
+
+    def status(self, path=None):
+        with self._cond:
+            self._ensure_loaded()
+            if path is not None:
+                return self._status.get(rtdb_tree.join_path(path), "synced")
+            states = set(self._status.values())
+        if "failed" in states:
+            return "failed"
+        if "pending" in states:
+            return "pending"
+        return "synced"
+
+    def flush(self, timeout=None):
+        """대기 중인 쓰기가 모두 전송될 때까지 대기 → 다 보냈으면 True"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._ensure_loaded()
+            while self._entries or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
         return True
 
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+        def remove():
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+        return remove
+
+    def _notify(self):
+        status = self.status()
+        for callback in list(self._listeners):
+            try:
+                callback(status)
+            except Exception:
+                pass
+
+
+def _written_paths(entry):
+    """쓰기가 실제로 건드린 경로들 - 다중 경로 PATCH면 키마다 (앱 쓰기는 모두 루트 PATCH)"""
+    if entry["method"] == "PATCH" and isinstance(entry["data"], dict):
+        return [rtdb_tree.join_path(entry["path"], key) for key in entry["data"]]
+    return [entry["path"]]
+
+
+def _reconcile(path):
+    """서버가 거절한 쓰기를 로컬에서 되돌림 - path의 서버 값을 다시 받아 덮어씀
+
+    루트 배치가 거절되어도 배치가 쓴 경로만 하나씩 다시 받는다 (루트 전체를 받지 않음).
+
+    다시 받지 못하면 그대로 둔다 (캐시의 ETag는 이미 지워져 다음 조회는 전체를 받음).
+    """
     try:
-        url = f"{FIREBASE_URL}/{path}.json"
-        resp = requests.delete(url, timeout=TIMEOUT)
-        resp.raise_for_status()
-        return True
+        value = _request("GET", path).json()
     except Exception:
-        return False
+        return
+    _apply_local({path: _write_queue.overlay(path, value)})
 
 
-def fb_push(path, data):
-    """Firebase에 새 항목 추가 (POST) - 고유 키 자동 생성"""
+def _paths_overlap(a, b):
+    return rtdb_tree.relative_path(a, b) is not None or rtdb_tree.relative_path(b, a) is not None
+
+
+_write_queue = _WriteQueue()
+fb_add_connection_listener(lambda online: online and _write_queue.wake())
+
+
+@metered("put", source="queued")
+def fb_put_async(path, data):
+    """로컬에 바로 반영하고 서버 전송은 백그라운드로 (PUT) - 즉시 반환"""
+    _apply_local({path: data})
+    if is_firebase_configured():
+        _write_queue.enqueue("PUT", path, data)
+
+
+@metered("patch", source="queued")
+def fb_patch_async(path, data):
+    """로컬에 바로 반영하고 서버 전송은 백그라운드로 (PATCH)"""
+    _apply_local(rtdb_tree.write_updates("PATCH", path, data))
+    if is_firebase_configured():
+        _write_queue.enqueue("PATCH", path, data)
+
+
+@metered("delete", source="queued")
+def fb_delete_async(path):
+    """로컬에서 바로 지우고 서버 전송은 백그라운드로 (DELETE)"""
+    _apply_local({path: None})
+    if is_firebase_configured():
+        _write_queue.enqueue("DELETE", path, None)
+
+
+def fb_sync_status(path=None):
+    """쓰기 동기화 상태: "pending" (전송 대기) / "synced" (완료) / "failed" (실패)
+
+    path를 주면 그 경로의 상태, 없으면 전체 상태 (failed > pending > synced).
+    """
+    return _write_queue.status(path)
+
+
+def fb_add_sync_listener(callback):
+    """동기화 상태가 바뀔 때 callback(전체 상태) 호출 → 해제 함수 반환"""
+    return _write_queue.add_listener(callback)
+
+
+def fb_flush(timeout=None):
+    """대기 중인 비동기 쓰기를 모두 보낼 때까지 대기"""
+    return _write_queue.flush(timeout)
+
+
+def fb_replay_outbox():
+    """지난 실행에서 보내지 못한 쓰기(아웃박스)의 재전송 시작 → 대기 중인 쓰기 수"""
     if not is_firebase_configured():
-        existing = _load_cache(path, [])
-        if isinstance(existing, list):
-            existing.append(data)
-            _save_cache(path, existing)
-        return True
+        return 0
+    return _write_queue.replay()
 
-    try:
-        url = f"{FIREBASE_URL}/{path}.json"
-        resp = requests.post(url, json=data, timeout=TIMEOUT)
-        resp.raise_for_status()
-        return True
-    except Exception:
-        return False
+
+def fb_outbox_stats():
+    """아웃박스 상태
+
+    {"depth": 대기 중인 쓰기 수, "oldest_age": 가장 오래된 쓰기의 경과 초 (없으면 None),
+     "journal_bytes": 저널 파일 크기, "status": fb_sync_status()}
+    """
+    return _write_queue.stats()
+
+
+# ============================================================
+# 실시간 스트리밍 (SSE) + 인메모리 미러
+# ============================================================
+STREAM_READ_TIMEOUT = 60    # RTDB는 약 30초마다 keep-alive를 보내므로 그 두 배
+STREAM_RETRY_MAX = 30       # 재연결 대기 최대 (초)
+
+_mirror = None              # 스트림으로 유지되는 프로세스 전역 트리 (rtdb_tree 형식)
+_mirror_lock = threading.Lock()
+_streams = {}               # path -> _StreamListener
+_streams_lock = threading.Lock()
+
+
+class _StreamListener(threading.Thread):
+    """한 경로의 SSE 스트림을 열고 put/patch 이벤트를 미러 트리에 반영"""
+
+    def __init__(self, path):
+        super().__init__(name=f"fb-stream-{path}", daemon=True)
+        self.path = path
+        self.callbacks = []
+        self.refs = 0
+        self.synced = False     # 최초 put 수신 후 연결이 살아 있는 동안 True
+        self.version = 0        # 이벤트를 반영할 때마다 증가 (ETag 대용)
+        self._stop_event = threading.Event()
+        self._response = None
+
+    def stop(self):
+        self._stop_event.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def run(self):
+        session = requests.Session()
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                self._listen(session)
+            except Exception as e:
+                firebase_metrics.record_error("stream", self.path, e)
+            if self.synced:
+                # 한 번이라도 동기화됐던 연결이 끊긴 경우는 바로 재연결
+                backoff = 1
+            self.synced = False
+            if self._stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, STREAM_RETRY_MAX)
+        session.close()
+
+    def _listen(self, session):
+        """연결 후 이벤트를 읽음 (끊기거나 keep-alive가 끊기면 예외/반환)
+
+        재연결 시 서버가 경로 전체를 담은 put을 먼저 보내므로
+        끊긴 동안의 변경도 그 시점에 미러로 따라잡는다.
+        """
+        url = f"{FIREBASE_URL}/{self.path}.json"
+        headers = {"Accept": "text/event-stream"}
+        with session.get(url, headers=headers, stream=True,
+                         timeout=(TIMEOUT, STREAM_READ_TIMEOUT)) as resp:
+            resp.raise_for_status()
+            _get_breaker().record_success()
+            self._response = resp
+            event = None
+            for raw in resp.iter_lines(chunk_size=1024):
+                if self._stop_event.is_set():
+                    return
+                line = raw.decode("utf-8")
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    self._handle(event, line[len("data:"):].strip())
+                    event = None
+
+    def _handle(self, event, payload):
+        if event in ("put", "patch"):
+            message = json.loads(payload)
+            _apply_stream_event(self, event, message.get("path", "/"), message.get("data"))
+        elif event in ("cancel", "auth_revoked"):
+            raise ConnectionError(f"stream {event}")
+        # keep-alive: 읽기 타임아웃만 연장하면 되므로 별도 처리 없음
+
+
+def _apply_stream_event(listener, event, rel_path, data):
+    """스트림 이벤트를 미러 트리와 로컬 캐시에 반영하고 구독자에게 알림"""
+    global _mirror
+    full_path = rtdb_tree.join_path(listener.path, rel_path)
+    with _mirror_lock:
+        if event == "put":
+            _mirror = rtdb_tree.set_at(_mirror, full_path, data)
+        else:
+            _mirror = rtdb_tree.update_at(_mirror, full_path, data)
+        if _write_queue.has_pending(full_path):
+            overlaid = _write_queue.overlay(full_path, rtdb_tree.read(_mirror, full_path))
+            _mirror = rtdb_tree.set_at(_mirror, full_path, overlaid)
+        if event == "put" and rtdb_tree.split_path(rel_path) == []:
+            listener.synced = True
+        listener.version += 1
+        written = rtdb_tree.read(_mirror, full_path)
+    _read_cache.invalidate(full_path)
+    _save_cache(full_path, written)
+
+    for callback in list(listener.callbacks):
+        try:
+            callback(listener.path)
+        except Exception:
+            pass
+
+
+def _covering_stream(path):
+    """path를 포함하는 동기화된 스트림 반환 (없으면 None)"""
+    for stream_path, listener in list(_streams.items()):
+        if listener.synced and rtdb_tree.relative_path(stream_path, path) is not None:
+            return listener
+    return None
+
+
+def _mirror_read(path):
+    """스트림 미러에서 조회 → (data, version) 또는 None (미러에 없음)"""
+    listener = _covering_stream(path)
+    if listener is None:
+        return None
+    with _mirror_lock:
+        return rtdb_tree.read(_mirror, path), f"stream:{listener.path}:{listener.version}"
+
+
+def _mirror_write(method, path, data):
+    """로컬 쓰기를 미러에 먼저 반영 (스트림이 같은 변경을 곧 다시 보내 줌)"""
+    global _mirror
+    listener = _covering_stream(path)
+    if listener is None:
+        return
+    with _mirror_lock:
+        if method == "PATCH":
+            _mirror = rtdb_tree.update_at(_mirror, path, data)
+        else:
+            _mirror = rtdb_tree.set_at(_mirror, path, data)
+        listener.version += 1
+
+
+def fb_subscribe(path, callback=None):
+    """path를 SSE 스트림으로 구독 (members, attendance, matches 등)
+
+    스트림이 동기화된 동안 path 아래의 fb_get은 메모리 미러에서 바로 응답하고,
+    다른 기기의 변경도 1초 안에 반영된다. 연결이 끊기면 지수 백오프로 재연결한다.
+    callback(path)는 이벤트가 반영될 때마다 스트림 스레드에서 호출된다.
+    반환값: 구독 해제 함수
+    """
+    if not is_firebase_configured():
+        return lambda: None
+
+    with _streams_lock:
+        listener = _streams.get(path)
+        if listener is None:
+            listener = _StreamListener(path)
+            _streams[path] = listener
+            listener.start()
+        listener.refs += 1
+        if callback is not None:
+            listener.callbacks.append(callback)
+
+    released = threading.Event()
+
+    def unsubscribe():
+        global _mirror
+        if released.is_set():
+            return
+        released.set()
+        with _streams_lock:
+            if callback in listener.callbacks:
+                listener.callbacks.remove(callback)
+            listener.refs -= 1
+            if listener.refs > 0:
+                return
+            _streams.pop(path, None)
+            listener.stop()
+        if _covering_stream(path) is None:
+            with _mirror_lock:
+                _mirror = rtdb_tree.set_at(_mirror, path, None)
+
+    return unsubscribe
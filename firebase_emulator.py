@@ -0,0 +1,393 @@
+"""
+Firebase Realtime Database REST 로컬 대역 서버 (테스트/벤치마크용)
+- GET / PUT / PATCH / POST / DELETE ({path}.json)
+- ?shallow=true, orderBy/startAt/endAt/equalTo/limitToFirst/limitToLast 쿼리
+  (rules를 주면 .indexOn 없는 orderBy는 실서버처럼 400으로 거절)
+- X-Firebase-ETag 요청 시 ETag 헤더, if-match 조건부 쓰기 (불일치 시 412)
+- ?print=silent (204 응답)
+- 서버 값 {".sv": "timestamp"}
+- SSE 스트림 (Accept: text/event-stream) + keep-alive
+- 지연/지터/실패율 주입, 쓰기 거절(규칙 거절 재현)
+
+사용 예:
+    emulator = FirebaseEmulator(data={"members": {"members": []}}).start()
+    firebase_config.FIREBASE_URL = emulator.url
+    ...
+    emulator.stop()
+
+앱 전체를 대역 서버로 실행:
+    python firebase_emulator.py --port 9000 --data seed.json --latency 0.05
+    FIREBASE_URL=http://127.0.0.1:9000 python seocho_tennis_club.py
+"""
+
+import argparse
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import rtdb_tree
+
+_QUERY_PARAMS = ("orderBy", "startAt", "endAt", "equalTo", "limitToFirst", "limitToLast")
+
+
+def _etag(value):
+    body = json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha1(body).hexdigest()
+
+
+class FirebaseEmulator:
+    """RTDB REST 부분 집합을 구현한 메모리 기반 서버
+
+    latency/jitter: 응답마다 latency + [0, jitter) 초 지연
+    failure_rate: 이 확률로 요청을 실패시킴 (failure_status 응답,
+                  failure_status=0이면 응답 없이 연결을 끊음)
+    rules: database.rules.json 내용 - 주면 orderBy 쿼리에 .indexOn을 요구
+    write_status: 주면 모든 쓰기(PUT/PATCH/POST/DELETE)를 이 상태 코드로 거절 (예: 401)
+    모두 실행 중에 속성으로 바꿀 수 있다.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, data=None, keep_alive_interval=30,
+                 latency=0.0, jitter=0.0, failure_rate=0.0, failure_status=503, rules=None,
+                 write_status=None):
+        self.tree = rtdb_tree.normalize(data)
+        self.keep_alive_interval = keep_alive_interval
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.rules = rules
+        self.write_status = write_status
+        self.requests = Counter()   # 메서드별 요청 수 (벤치마크용)
+        self.paths = Counter()      # (메서드, 경로)별 요청 수
+        self._stopped = False
+        self._lock = threading.Lock()
+        self._listeners = []    # [(path, queue.Queue)]
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name="fb-emulator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # 클라이언트가 붙잡고 있는 keep-alive 연결도 다음 요청에서 끊기도록 표시
+        self._stopped = True
+        self.drop_streams()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # ---------------- 데이터 ----------------
+    def read(self, path):
+        with self._lock:
+            return rtdb_tree.read(self.tree, path)
+
+    def write(self, method, path, data, if_match=None):
+        """PUT/PATCH/DELETE를 반영하고 스트림 구독자에게 이벤트 전송
+
+        if_match가 현재 값의 ETag와 다르면 쓰지 않고 (False, 현재 값) 반환.
+        {".sv": "timestamp"}는 현재 시각(ms)으로, {".sv": {"increment": n}}은 그 자리의 값 + n으로 바꿔 저장한다.
+        반환값: (성공 여부, 현재 값)
+        """
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            if if_match is not None:
+                current = rtdb_tree.read(self.tree, path)
+                if if_match != _etag(current):
+                    return False, current
+            if method == "PATCH":
+                data = {key: self._resolve(rtdb_tree.join_path(path, str(key)), value, now_ms)
+                        for key, value in (data or {}).items()}
+            else:
+                data = self._resolve(path, data, now_ms)
+            self.tree = rtdb_tree.apply_write(self.tree, method, path, data)
+            self._broadcast(method, path, data)
+        return True, data
+
+    def _resolve(self, path, value, now_ms):
+        """자리표시자를 풂 - 증가가 있을 때만 현재 값을 읽음 (락 안에서 호출)"""
+        current = rtdb_tree.read(self.tree, path) if rtdb_tree.has_increment(value) else None
+        return rtdb_tree.resolve_server_values(value, now_ms, current)
+
+    def push(self, path, data):
+        """POST - 새 푸시 키 아래에 저장하고 키 반환"""
+        key = rtdb_tree.push_id()
+        self.write("PUT", rtdb_tree.join_path(path, key), data)
+        return key
+
+    def check_index(self, path, order_by):
+        """rules가 있으면 orderBy 대상에 .indexOn이 있는지 확인"""
+        if self.rules is None or order_by in ("$key", "$value", "$priority"):
+            return True
+        node = self.rules.get("rules", self.rules)
+        for seg in rtdb_tree.split_path(path):
+            if not isinstance(node, dict):
+                return False
+            node = node.get(seg, next((v for k, v in node.items() if k.startswith("$")), None))
+        index_on = node.get(".indexOn", []) if isinstance(node, dict) else []
+        if isinstance(index_on, str):
+            index_on = [index_on]
+        return order_by in index_on
+
+    # ---------------- 장애 주입 ----------------
+    def _inject(self):
+        """지연을 넣고, 실패시킬 요청이면 True"""
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+    # ---------------- 스트림 ----------------
+    def _broadcast(self, method, path, data):
+        for listen_path, events in self._listeners:
+            rel = rtdb_tree.relative_path(listen_path, path)
+            if rel is not None:
+                event = "patch" if method == "PATCH" else "put"
+                events.put((event, {"path": rel, "data": data}))
+            elif rtdb_tree.relative_path(path, listen_path) is not None:
+                # 구독 경로의 상위가 바뀐 경우 구독 경로 전체를 다시 보냄
+                events.put(("put", {"path": "/", "data": rtdb_tree.read(self.tree, listen_path)}))
+
+    def _add_listener(self, path):
+        events = queue.Queue()
+        with self._lock:
+            events.put(("put", {"path": "/", "data": rtdb_tree.read(self.tree, path)}))
+            self._listeners.append((path, events))
+        return events
+
+    def _remove_listener(self, events):
+        with self._lock:
+            self._listeners = [item for item in self._listeners if item[1] is not events]
+
+    def drop_streams(self):
+        """열린 스트림 연결을 모두 끊음 (클라이언트 재연결 테스트용)"""
+        with self._lock:
+            for _, events in self._listeners:
+                events.put(None)
+
+
+def _make_handler(emulator):
+    class Handler(_Handler):
+        pass
+    Handler.emulator = emulator
+    return Handler
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    emulator = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _fb_path(self):
+        path = urlsplit(self.path).path
+        if not path.endswith(".json"):
+            return None
+        return path[:-len(".json")].strip("/")
+
+    def _params(self):
+        """쿼리 문자열 → {이름: 값} (RTDB처럼 값은 JSON으로 해석)"""
+        params = {}
+        for key, values in parse_qs(urlsplit(self.path).query).items():
+            try:
+                params[key] = json.loads(values[-1])
+            except ValueError:
+                params[key] = values[-1]
+        return params
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def _discard_body(self):
+        """처리하지 않고 응답할 요청의 본문을 읽어 버림 (keep-alive 연결의 다음 요청이 깨지지 않게)"""
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _send_json(self, value, status=200, etag=None):
+        if self._params().get("print") == "silent" and status < 300:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is None and self.headers.get("X-Firebase-ETag", "").lower() == "true":
+            etag = _etag(value)
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send_json({"error": message}, status)
+
+    def _begin(self, method):
+        """공통 전처리: 경로 확인 + 장애 주입 → 처리할 경로 또는 None(응답 완료)"""
+        if self.emulator._stopped:
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return None
+        self.emulator.requests[method] += 1
+        path = self._fb_path()
+        if path is None:
+            self._send_error(404, "Not Found")
+            return None
+        self.emulator.paths[(method, path)] += 1
+        if method != "GET" and self.emulator.write_status:
+            self._discard_body()
+            self._send_error(self.emulator.write_status, "Permission denied")
+            return None
+        if self.emulator._inject():
+            if not self.emulator.failure_status:
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return None
+            self._discard_body()
+            self._send_error(self.emulator.failure_status, "Injected failure")
+            return None
+        return path
+
+    def do_GET(self):
+        path = self._begin("GET")
+        if path is None:
+            return
+        if "text/event-stream" in self.headers.get("Accept", ""):
+            return self._stream(path)
+
+        params = self._params()
+        value = self.emulator.read(path)
+        if params.get("shallow") is True:
+            return self._send_json(rtdb_tree.shallow(value))
+        query = {key: params[key] for key in _QUERY_PARAMS if key in params}
+        if query:
+            if "orderBy" not in query:
+                return self._send_error(400, "orderBy must be defined when other query parameters are defined")
+            if not self.emulator.check_index(path, query["orderBy"]):
+                return self._send_error(400, f'Index not defined, add ".indexOn": "{query["orderBy"]}", '
+                                             f'for path "/{path}", to the rules')
+            return self._send_json(rtdb_tree.query(value, query))
+
+        etag = _etag(value)
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match and if_none_match == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(value)
+
+    def _write(self, method, path, data):
+        ok, current = self.emulator.write(method, path, data, self.headers.get("if-match"))
+        if not ok:
+            return self._send_json(current, 412, etag=_etag(current))
+        self._send_json(data)
+
+    def do_PUT(self):
+        path = self._begin("PUT")
+        if path is None:
+            return
+        self._write("PUT", path, self._read_body())
+
+    def do_PATCH(self):
+        path = self._begin("PATCH")
+        if path is None:
+            return
+        data = self._read_body()
+        if not isinstance(data, dict):
+            return self._send_error(400, "Invalid data; couldn't parse JSON object.")
+        self._write("PATCH", path, data)
+
+    def do_POST(self):
+        path = self._begin("POST")
+        if path is None:
+            return
+        data = self._read_body()
+        self._send_json({"name": self.emulator.push(path, data)})
+
+    def do_DELETE(self):
+        path = self._begin("DELETE")
+        if path is None:
+            return
+        self._write("DELETE", path, None)
+
+    def _stream(self, path):
+        events = self.emulator._add_listener(path)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=self.emulator.keep_alive_interval)
+                except queue.Empty:
+                    item = ("keep-alive", None)
+                if item is None:
+                    break
+                event, data = item
+                payload = json.dumps(data, ensure_ascii=False)
+                self._write_chunk(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.emulator._remove_listener(events)
+            self.close_connection = True
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Firebase RTDB REST 로컬 대역 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--data", help="초기 데이터 JSON 파일")
+    parser.add_argument("--rules", help="database.rules.json (주면 .indexOn 검사)")
+    parser.add_argument("--latency", type=float, default=0.0, help="응답 지연 (초)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="추가 무작위 지연 최대 (초)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="실패 응답 확률 (0~1)")
+    parser.add_argument("--failure-status", type=int, default=503,
+                        help="실패 시 응답 코드 (0이면 연결을 끊음)")
+    args = parser.parse_args(argv)
+
+    def load(file_path):
+        if not file_path:
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    emulator = FirebaseEmulator(args.host, args.port, data=load(args.data), rules=load(args.rules),
+                                latency=args.latency, jitter=args.jitter,
+                                failure_rate=args.failure_rate, failure_status=args.failure_status)
+    print(f"Firebase 대역 서버: {emulator.url}")
+    print(f"  FIREBASE_URL={emulator.url} python seocho_tennis_club.py")
+    try:
+        emulator._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
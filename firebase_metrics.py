@@ -0,0 +1,344 @@
+"""
+Firebase 계층 계측 모듈
+- fb_* 호출: 연산 / 경로 / 응답 출처(미러, 조회 캐시, 서버, 폴백 등) / 지연
+- HTTP 요청: 메서드 / 경로 / 상태 코드 / 지연 / 요청·응답 바이트
+- 오류: 발생 위치 / 경로 / 예외 클래스
+- 작업 단계 소요 시간: 시작 준비(warm_up) 등 fb_* 호출이 아닌 단계
+- 값은 고정 버킷 히스토그램에 누적하므로 호출당 비용이 작다
+- 화면(scope) 라벨로 어느 화면이 대역폭과 지연을 만드는지 구분
+- snapshot() / to_json() / to_prometheus(), 주기적 파일 저장
+
+사용 예:
+    with firebase_metrics.scope("home"):
+        fb_get("matches")
+    firebase_metrics.bytes_by("scope")      # {"home": 123456, ...}
+"""
+
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import cache_codec
+
+ENABLED = True
+
+# 지연 버킷 (초), 크기 버킷 (바이트) - 마지막은 +Inf
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_scope = contextvars.ContextVar("fb_metrics_scope", default="-")
+_call_state = threading.local()
+
+
+class Histogram:
+    """고정 버킷 누적 히스토그램"""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """버킷 경계 기준 근사 분위수 (마지막 버킷이면 가장 큰 경계)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[min(i, len(self.buckets) - 1)]
+        return self.buckets[-1]
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def path_label(path):
+    """경로를 라벨로 축약 ('matches/g123' → 'matches/*') - 레코드마다 시계열이 생기지 않게"""
+    segments = [seg for seg in (path or "").split("/") if seg]
+    if not segments:
+        return "/"
+    return segments[0] + ("/*" if len(segments) > 1 else "")
+
+
+@contextmanager
+def scope(name):
+    """이 블록 안에서 일어난 Firebase 호출에 화면 이름 라벨을 붙임"""
+    token = _scope.set(name)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def scoped(name):
+    """메서드 데코레이터 버전의 scope"""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            with scope(name):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorator
+
+
+def current_scope():
+    return _scope.get()
+
+
+class _Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.calls = {}     # (op, path, source, scope) -> Histogram(지연)
+            self.http = {}      # (method, path, status, scope) -> [지연, 요청 바이트, 응답 바이트]
+            self.errors = {}    # (where, path, error) -> 횟수
+
+    def record_call(self, op, path, source, latency, error=None):
+        key = (op, path_label(path), source, _scope.get())
+        with self._lock:
+            hist = self.calls.get(key)
+            if hist is None:
+                hist = self.calls[key] = Histogram(LATENCY_BUCKETS)
+            hist.observe(latency)
+            if error is not None:
+                self._count_error(op, path, error)
+
+    def record_http(self, method, path, status, latency, request_bytes, response_bytes, error=None):
+        key = (method, path_label(path), str(status), _scope.get())
+        with self._lock:
+            series = self.http.get(key)
+            if series is None:
+                series = self.http[key] = [Histogram(LATENCY_BUCKETS), Histogram(BYTES_BUCKETS),
+                                           Histogram(BYTES_BUCKETS)]
+            series[0].observe(latency)
+            series[1].observe(request_bytes)
+            series[2].observe(response_bytes)
+            if error is not None:
+                self._count_error("http", path, error)
+
+    def record_error(self, where, path, error):
+        with self._lock:
+            self._count_error(where, path, error)
+
+    def _count_error(self, where, path, error):
+        name = error if isinstance(error, str) else type(error).__name__
+        key = (where, path_label(path), name)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+
+_metrics = _Metrics()
+
+
+# ============================================================
+# 기록 (firebase_config에서 호출)
+# ============================================================
+def note_source(source, error=None):
+    """진행 중인 fb_* 호출의 응답 출처를 기록 (metered 안에서만 의미 있음)"""
+    _call_state.source = source
+    if error is not None:
+        _call_state.error = error
+
+
+def metered(op, source="server"):
+    """fb_* 함수 데코레이터: 지연/출처/오류를 기록
+
+    첫 번째 인자를 경로로 본다. 함수 안에서 note_source()로 출처를 바꿀 수 있다.
+    """
+    def decorator(func):
+        def wrapper(path, *args, **kwargs):
+            if not ENABLED:
+                return func(path, *args, **kwargs)
+            outer = (getattr(_call_state, "source", None), getattr(_call_state, "error", None))
+            _call_state.source, _call_state.error = source, None
+            start = time.perf_counter()
+            try:
+                return func(path, *args, **kwargs)
+            except Exception as e:
+                _call_state.source, _call_state.error = "error", e
+                raise
+            finally:
+                _metrics.record_call(op, path, _call_state.source, time.perf_counter() - start,
+                                     _call_state.error)
+                _call_state.source, _call_state.error = outer
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def record_http(method, path, status, latency, request_bytes=0, response_bytes=0, error=None):
+    if ENABLED:
+        _metrics.record_http(method, path, status, latency, request_bytes, response_bytes, error)
+
+
+def record_error(where, path, error):
+    if ENABLED:
+        _metrics.record_error(where, path, error)
+
+
+def record_timing(op, phase, latency):
+    """fb_* 호출이 아닌 작업 단계의 소요 시간 (예: warm_up의 dns/connect/prefetch)
+
+    fb_call_seconds에 op / path=단계 이름 / source="timing"으로 쌓인다.
+    """
+    if ENABLED:
+        _metrics.record_call(op, phase, "timing", latency)
+
+
+def reset():
+    _metrics.reset()
+
+
+# ============================================================
+# 조회 / 내보내기
+# ============================================================
+def snapshot():
+    """현재까지 누적된 값 → dict (JSON 직렬화 가능)"""
+    with _metrics._lock:
+        calls = [
+            dict(op=op, path=path, source=source, scope=scope_name, latency=hist.to_dict())
+            for (op, path, source, scope_name), hist in _metrics.calls.items()
+        ]
+        http = [
+            dict(method=method, path=path, status=status, scope=scope_name,
+                 latency=series[0].to_dict(), request_bytes=series[1].to_dict(),
+                 response_bytes=series[2].to_dict())
+            for (method, path, status, scope_name), series in _metrics.http.items()
+        ]
+        errors = [
+            dict(where=where, path=path, error=error, count=count)
+            for (where, path, error), count in _metrics.errors.items()
+        ]
+        started = _metrics.started
+    return {"started": started, "time": time.time(), "calls": calls, "http": http, "errors": errors}
+
+
+def bytes_by(*labels):
+    """HTTP 송수신 바이트 합계를 라벨별로 묶음 (많은 순)
+
+    labels: "method", "path", "status", "scope" 중 선택
+        bytes_by("scope")          → {"home": 120000, ...}
+        bytes_by("scope", "path")  → {("home", "matches"): ..., ...}
+    """
+    names = ("method", "path", "status", "scope")
+    totals = {}
+    with _metrics._lock:
+        for key, series in _metrics.http.items():
+            values = tuple(key[names.index(label)] for label in labels)
+            group = values[0] if len(values) == 1 else values
+            totals[group] = totals.get(group, 0) + series[1].sum + series[2].sum
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def to_json():
+    return json.dumps(snapshot(), ensure_ascii=False, indent=2)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+
+
+def _histogram_lines(name, hist, labels):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(hist.buckets, hist.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}')
+    lines.append(f'{name}_bucket{{{_labels(**labels, le="+Inf")}}} {hist.count}')
+    lines.append(f'{name}_sum{{{_labels(**labels)}}} {hist.sum}')
+    lines.append(f'{name}_count{{{_labels(**labels)}}} {hist.count}')
+    return lines
+
+
+def to_prometheus():
+    """Prometheus 텍스트 형식"""
+    with _metrics._lock:
+        calls = list(_metrics.calls.items())
+        http = list(_metrics.http.items())
+        errors = list(_metrics.errors.items())
+
+    lines = ["# HELP fb_call_seconds fb_* call latency by response source",
+             "# TYPE fb_call_seconds histogram"]
+    for (op, path, source, scope_name), hist in calls:
+        lines += _histogram_lines("fb_call_seconds", hist,
+                                  dict(op=op, path=path, source=source, scope=scope_name))
+
+    families = (("fb_http_seconds", "HTTP request latency", 0),
+                ("fb_http_request_bytes", "HTTP request body size", 1),
+                ("fb_http_response_bytes", "HTTP response body size", 2))
+    for name, help_text, index in families:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for (method, path, status, scope_name), series in http:
+            lines += _histogram_lines(name, series[index],
+                                      dict(method=method, path=path, status=status, scope=scope_name))
+
+    lines += ["# HELP fb_errors_total Errors by location and exception class",
+              "# TYPE fb_errors_total counter"]
+    for (where, path, error), count in errors:
+        lines.append(f'fb_errors_total{{{_labels(where=where, path=path, error=error)}}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(file_path, fmt="json"):
+    """스냅숏을 파일로 저장 (원자적 교체, fmt: json | prometheus)"""
+    text = to_prometheus() if fmt == "prometheus" else to_json()
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    cache_codec.write_atomic(file_path, text.encode("utf-8"))
+
+
+def start_snapshot_writer(file_path, interval=60, fmt=None):
+    """interval초마다 스냅숏을 파일로 저장하는 백그라운드 스레드 시작 → 중지 함수
+
+    fmt를 생략하면 확장자가 .prom이면 Prometheus, 아니면 JSON.
+    """
+    fmt = fmt or ("prometheus" if file_path.endswith(".prom") else "json")
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                write_snapshot(file_path, fmt)
+            except Exception:
+                pass
+
+    threading.Thread(target=run, name="fb-metrics", daemon=True).start()
+
+    def stop():
+        stop_event.set()
+        try:
+            write_snapshot(file_path, fmt)
+        except Exception:
+            pass
+    return stop
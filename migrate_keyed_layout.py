@@ -0,0 +1,132 @@
+"""
+Firebase 데이터를 키 기반 레이아웃으로 옮기는 1회성 도구
+
+    members/members/[배열]       →  members/{id}
+    attendance/attendance/[배열] →  attendance/{date}
+    matches/matches/[배열]       →  matches/{id}
+
+레코드마다 updated_at(서버 시각)을 붙여 델타 동기화(fb_sync)가 바로 쓸 수 있게 한다.
+
+--partition-matches를 주면 경기는 월 파티션 레이아웃으로 옮긴다.
+
+    matches/{id}                 →  matches/{YYYY-MM}/{id}
+                                    + _manifest/matches/{YYYY-MM} = {count, updated_at}
+
+세 컬렉션을 다중 경로 쓰기 한 번으로 교체하므로 중간에 실패해도
+일부만 바뀐 상태가 되지 않는다. 앱은 모든 레이아웃을 읽을 수 있어
+실행 전후로 계속 사용할 수 있다.
+로컬 캐시는 임시 폴더에 두므로 앱이 data/에 남긴 아웃박스를 읽거나 재전송하지 않는다.
+
+사용법:
+    python migrate_keyed_layout.py                      # 변환 후 저장
+    python migrate_keyed_layout.py --dry-run            # 변환 결과만 출력
+    python migrate_keyed_layout.py --partition-matches  # 경기를 월 파티션으로
+"""
+
+import argparse
+import sys
+import tempfile
+
+import rtdb_tree
+from club_repository import month_of
+from firebase_config import (
+    SERVER_TIMESTAMP, TOMBSTONE_RESET, TOMBSTONE_ROOT, fb_batch, fb_cache_dir, fb_get_if_changed,
+    is_firebase_configured,
+)
+from seocho_tennis_club import (
+    ATTENDANCE_FILE, MATCH_MANIFEST_PATH, MATCHES_FILE, MEMBERS_FILE, _FB_PATH_MAP, _MONTH_KEY,
+    _stamped, generate_id, record_key,
+)
+
+_ID_PREFIX = {MEMBERS_FILE: "m", MATCHES_FILE: "g"}
+
+
+def convert_collection(file_path, raw):
+    """배열 레이아웃 원본 → ({키: 레코드}, 경고 목록). 이미 키 기반이면 None"""
+    name = _FB_PATH_MAP[file_path]
+    if not (isinstance(raw, dict) and name in raw):
+        return None, []
+
+    keyed, warnings = {}, []
+    extra = {key: value for key, value in raw.items() if key != name}
+    for record in rtdb_tree.children(raw[name]) + rtdb_tree.children(extra):
+        if file_path in _ID_PREFIX and not record.get("id"):
+            record["id"] = generate_id(_ID_PREFIX[file_path])
+            warnings.append(f"{name}: id 없는 레코드에 {record['id']} 부여")
+        key = record_key(file_path, record)
+        if key in keyed:
+            warnings.append(f"{name}: 중복 키 {key} - 나중 레코드로 덮어씀")
+        keyed[key] = record
+    return keyed, warnings
+
+
+def partition_matches(keyed):
+    """{id: 경기} → ({월: {id: 경기}}, 매니페스트) - 경기마다 updated_at 서버 시각을 붙임"""
+    partitions = {}
+    for key, record in keyed.items():
+        partitions.setdefault(month_of(record["date"]), {})[key] = _stamped(record)
+    manifest = {month: {"count": len(records), "updated_at": SERVER_TIMESTAMP}
+                for month, records in partitions.items()}
+    return partitions, manifest
+
+
+def migrate(dry_run=False, partition=False):
+    if not is_firebase_configured():
+        print("Firebase URL이 설정되지 않았습니다.")
+        return 1
+    # 앱의 로컬 캐시/아웃박스와 섞이지 않게 임시 폴더를 씀 (앱이 남긴 쓰기를 재전송하지 않음)
+    with tempfile.TemporaryDirectory(prefix="migrate_keyed_layout_") as cache_dir, fb_cache_dir(cache_dir):
+        return _migrate(dry_run, partition)
+
+
+def _migrate(dry_run, partition):
+    batch = fb_batch()
+    for file_path in (MEMBERS_FILE, ATTENDANCE_FILE, MATCHES_FILE):
+        name = _FB_PATH_MAP[file_path]
+        raw, etag = fb_get_if_changed(name)
+        if etag is None:
+            # ETag가 없으면 서버가 아니라 로컬 캐시에서 읽은 값
+            print(f"{name}: 서버에서 읽지 못했습니다. 중단합니다.")
+            return 1
+        keyed, warnings = convert_collection(file_path, raw)
+        for warning in warnings:
+            print(f"  경고: {warning}")
+        if partition and file_path == MATCHES_FILE:
+            if isinstance(raw, dict) and raw and all(map(_MONTH_KEY.match, raw)):
+                print(f"{name}: 이미 월 파티션 레이아웃 - 건너뜀")
+                continue
+            partitions, manifest = partition_matches(keyed if keyed is not None else (raw or {}))
+            print(f"{name}: {sum(len(p) for p in partitions.values())}건을 {len(partitions)}개 달로 나눔")
+            batch.put(name, partitions)
+            batch.put(MATCH_MANIFEST_PATH, manifest)
+            # 예전 삭제 기록(_tombstones/matches/{id})은 버리고 달마다 리셋 표시로 시작
+            batch.put(f"{TOMBSTONE_ROOT}/{name}",
+                      {month: {TOMBSTONE_RESET: SERVER_TIMESTAMP} for month in partitions} or None)
+            continue
+        if keyed is None:
+            print(f"{name}: 이미 키 기반 레이아웃 - 건너뜀")
+            continue
+        print(f"{name}: {len(keyed)}건 변환")
+        # 델타 동기화 커서에 잡히도록 레코드마다 updated_at 서버 시각을 붙임
+        batch.put(name, {key: _stamped(record) for key, record in keyed.items()})
+
+    if not len(batch):
+        print("변환할 컬렉션이 없습니다.")
+        return 0
+    if dry_run:
+        print("--dry-run: 저장하지 않았습니다.")
+        return 0
+    # 아웃박스에 남으면 나중에 앱이 옛 변환 결과를 다시 보낼 수 있으므로 바로 보냄
+    if not batch.commit_direct():
+        print("저장 실패 - 보내지 못한 쓰기는 남기지 않았습니다. 연결을 확인하고 다시 실행하세요.")
+        return 1
+    print("완료")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Firebase 키 기반 레이아웃 마이그레이션")
+    parser.add_argument("--dry-run", action="store_true", help="변환 결과만 출력")
+    parser.add_argument("--partition-matches", action="store_true", help="경기를 월 파티션 레이아웃으로")
+    args = parser.parse_args()
+    sys.exit(migrate(dry_run=args.dry_run, partition=args.partition_matches))
@@ -0,0 +1,297 @@
+"""
+Realtime Database JSON 트리 조작 모듈
+- 경로(path) 단위 조회 / 덮어쓰기(set) / 부분 업데이트(update)
+- orderBy/startAt/endAt/equalTo/limit 쿼리의 로컬 적용
+- RTDB 규칙: null 값은 삭제, 비어 있는 부모 노드는 제거
+- 서버 값({".sv": "timestamp"}) 치환
+- 배열은 내부적으로 {"0": ..., "1": ...} 객체로 저장하고
+  내보낼 때 RTDB와 같은 규칙으로 다시 배열로 변환
+- 푸시 키(push ID) 생성
+"""
+
+import random
+import threading
+import time
+
+
+def split_path(path):
+    """'matches/2026-10/' -> ['matches', '2026-10']"""
+    return [seg for seg in (path or "").split("/") if seg]
+
+
+def join_path(*parts):
+    return "/".join(seg for part in parts for seg in split_path(part))
+
+
+def normalize(value):
+    """입력 JSON을 내부 트리 형태로 변환 (배열→객체, null/빈 객체 제거)"""
+    if isinstance(value, list):
+        value = {str(i): v for i, v in enumerate(value)}
+    if isinstance(value, dict):
+        result = {}
+        for key, child in value.items():
+            child = normalize(child)
+            if child is not None:
+                result[str(key)] = child
+        return result or None
+    return value
+
+
+def export(value):
+    """내부 트리를 RTDB 응답 형태로 변환
+
+    키가 모두 0 이상의 정수이고 0~최대 키 자리의 절반 넘게 채워져 있으면
+    배열로 돌려준다 (RTDB와 같은 규칙).
+    """
+    if not isinstance(value, dict):
+        return value
+    return array_or_object({key: export(child) for key, child in value.items()})
+
+
+def array_or_object(items):
+    """자식이 이미 응답 형태인 객체 한 단계에만 배열 규칙을 적용 (export의 한 단계)"""
+    if items and all(key.isdigit() and (key == "0" or not key.startswith("0")) for key in items):
+        indexes = [int(key) for key in items]
+        if 2 * len(indexes) > max(indexes) + 1:
+            result = [None] * (max(indexes) + 1)
+            for key, child in items.items():
+                result[int(key)] = child
+            return result
+    return items
+
+
+def child_at(value, path):
+    """RTDB 응답 형태(배열 포함)의 값에서 경로의 값을 그대로 꺼냄 (없으면 None, 사본 아님)"""
+    for seg in split_path(path):
+        if isinstance(value, dict):
+            value = value.get(seg)
+        elif (isinstance(value, list) and seg.isdigit() and (seg == "0" or not seg.startswith("0"))
+              and int(seg) < len(value)):
+            value = value[int(seg)]
+        else:
+            return None
+        if value is None:
+            return None
+    return value
+
+
+def get_at(tree, path):
+    """경로의 값을 내부 트리 형태 그대로 반환 (없으면 None)"""
+    node = tree
+    for seg in split_path(path):
+        if not isinstance(node, dict) or seg not in node:
+            return None
+        node = node[seg]
+    return node
+
+
+def read(tree, path):
+    """경로의 값을 RTDB 응답 형태의 사본으로 반환 (export가 새 객체를 만듦)"""
+    return export(get_at(tree, path))
+
+
+def set_at(tree, path, value):
+    """경로에 값을 덮어쓰고 새 루트를 반환 (PUT)
+
+    트리는 제자리에서 수정된다. value가 None이면 해당 노드를 삭제하고
+    빈 부모를 정리한다.
+    """
+    return _set_segments(tree, split_path(path), normalize(value))
+
+
+def _set_segments(node, segments, value):
+    if not segments:
+        return value
+    head, rest = segments[0], segments[1:]
+    if not isinstance(node, dict):
+        node = {}
+    child = _set_segments(node.get(head), rest, value)
+    if child is None:
+        node.pop(head, None)
+    else:
+        node[head] = child
+    return node or None
+
+
+def update_at(tree, path, changes):
+    """경로 아래 여러 자식을 한 번에 갱신하고 새 루트를 반환 (PATCH)
+
+    changes의 키는 'a/b' 같은 하위 경로일 수 있고, 값이 None이면 삭제.
+    """
+    for key, value in (changes or {}).items():
+        tree = set_at(tree, join_path(path, str(key)), value)
+    return tree
+
+
+def write_updates(method, path, data):
+    """REST 쓰기 한 건을 루트 기준 {경로: 값} 덮어쓰기 목록으로 펼침
+
+    PUT: {path: data}, DELETE: {path: None},
+    PATCH: data의 각 키(하위 경로 가능)마다 {path/키: 값}.
+    POST는 호출 측이 push_id()로 키를 만든 뒤 PUT으로 넘긴다.
+    """
+    if method == "PATCH":
+        return {join_path(path, str(key)): value for key, value in (data or {}).items()}
+    if method == "DELETE":
+        return {join_path(path): None}
+    return {join_path(path): data}
+
+
+def apply_write(tree, method, path, data):
+    """REST 쓰기 한 건을 트리에 반영하고 새 루트를 반환 (서버와 같은 결과)"""
+    for write_path, value in write_updates(method, path, data).items():
+        tree = set_at(tree, write_path, value)
+    return tree
+
+
+def increment_of(value):
+    """{".sv": {"increment": n}} 자리표시자면 n, 아니면 None"""
+    if isinstance(value, dict) and len(value) == 1 and isinstance(value.get(".sv"), dict):
+        delta = value[".sv"].get("increment")
+        if isinstance(delta, (int, float)) and not isinstance(delta, bool):
+            return delta
+    return None
+
+
+def has_increment(value):
+    """값 안에 증가 자리표시자가 있는지 (있으면 현재 값을 알아야 풀 수 있음)"""
+    if increment_of(value) is not None:
+        return True
+    if isinstance(value, dict):
+        return any(has_increment(child) for child in value.values())
+    return False
+
+
+def resolve_server_values(value, now_ms, current=None):
+    """서버 값 자리표시자를 푼 사본을 반환
+
+    {".sv": "timestamp"} → now_ms(밀리초)
+    {".sv": {"increment": n}} → 같은 자리의 현재 값(current 안의 값, 숫자가 아니면 0) + n
+    """
+    if isinstance(value, dict):
+        if value.get(".sv") == "timestamp" and len(value) == 1:
+            return now_ms
+        delta = increment_of(value)
+        if delta is not None:
+            number = isinstance(current, (int, float)) and not isinstance(current, bool)
+            return (current if number else 0) + delta
+        children = current if isinstance(current, dict) else {}
+        return {key: resolve_server_values(child, now_ms, children.get(key)) for key, child in value.items()}
+    if isinstance(value, list):
+        return [resolve_server_values(child, now_ms) for child in value]
+    return value
+
+
+def relative_path(base, path):
+    """path가 base 아래에 있으면 base 기준 상대 경로, 아니면 None"""
+    base_segs, path_segs = split_path(base), split_path(path)
+    if path_segs[:len(base_segs)] != base_segs:
+        return None
+    return "/" + "/".join(path_segs[len(base_segs):])
+
+
+# ============================================================
+# 푸시 키
+# ============================================================
+_PUSH_CHARS = "-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz"
+_push_lock = threading.Lock()
+_last_push_time = 0
+_last_push_random = []
+
+
+def push_id():
+    """Firebase 푸시 키와 같은 형식의 20자 키 (생성 순서대로 정렬됨)"""
+    global _last_push_time, _last_push_random
+    with _push_lock:
+        now = int(time.time() * 1000)
+        if now == _last_push_time:
+            # 같은 ms 안에서는 난수부를 1 증가시켜 순서를 보장
+            for i in range(11, -1, -1):
+                if _last_push_random[i] != 63:
+                    _last_push_random[i] += 1
+                    break
+                _last_push_random[i] = 0
+        else:
+            _last_push_time = now
+            _last_push_random = [random.randrange(64) for _ in range(12)]
+        time_chars = []
+        for _ in range(8):
+            time_chars.append(_PUSH_CHARS[now % 64])
+            now //= 64
+        return "".join(reversed(time_chars)) + "".join(_PUSH_CHARS[i] for i in _last_push_random)
+
+
+# ============================================================
+# 정렬 / 쿼리 (orderBy, startAt, endAt, equalTo, limitToFirst/Last)
+# ============================================================
+def _key_order(key):
+    """RTDB 키 정렬: 정수로 해석되는 키가 먼저(숫자순), 나머지는 문자열순"""
+    if key.lstrip("-").isdigit() and len(key) < 11:
+        return (0, int(key), "")
+    return (1, 0, key)
+
+
+def _value_order(value):
+    """RTDB 값 정렬: null < false < true < 숫자 < 문자열 < 객체"""
+    if value is None:
+        return (0, 0, "")
+    if isinstance(value, bool):
+        return (1, int(value), "")
+    if isinstance(value, (int, float)):
+        return (2, value, "")
+    if isinstance(value, str):
+        return (3, 0, value)
+    return (4, 0, "")
+
+
+def children(value):
+    """자식 값 목록을 RTDB 키 순서로 반환 (배열/객체 모두 지원, null 제외)"""
+    node = normalize(value)
+    if not isinstance(node, dict):
+        return []
+    return [export(node[key]) for key in sorted(node, key=_key_order)]
+
+
+def query(value, params):
+    """RTDB REST 쿼리 파라미터를 로컬 데이터에 적용
+
+    params: {"orderBy": "$key" | "$value" | 자식 경로,
+             "startAt", "endAt", "equalTo", "limitToFirst", "limitToLast"}
+    반환값: 조건에 맞는 자식만 담은 객체 (정렬 순서대로, 없으면 {})
+    """
+    node = normalize(value)
+    if not isinstance(node, dict):
+        return {}
+
+    order_by = params.get("orderBy", "$key")
+    if order_by == "$key":
+        def order(key, child):
+            return _key_order(key)
+
+        def bound(v):
+            return _key_order(str(v))
+    else:
+        def order(key, child):
+            return _value_order(child if order_by == "$value" else get_at(child, order_by))
+        bound = _value_order
+
+    items = sorted(node.items(), key=lambda kv: (order(*kv), _key_order(kv[0])))
+    if "equalTo" in params:
+        items = [kv for kv in items if order(*kv) == bound(params["equalTo"])]
+    if "startAt" in params:
+        items = [kv for kv in items if order(*kv) >= bound(params["startAt"])]
+    if "endAt" in params:
+        items = [kv for kv in items if order(*kv) <= bound(params["endAt"])]
+    if "limitToFirst" in params:
+        items = items[:int(params["limitToFirst"])]
+    if "limitToLast" in params:
+        items = items[-int(params["limitToLast"]):] if int(params["limitToLast"]) else []
+    return {key: export(child) for key, child in items}
+
+
+def shallow(value):
+    """?shallow=true 응답: 객체 자식은 true로, 그 외 값은 그대로"""
+    node = normalize(value)
+    if not isinstance(node, dict):
+        return node
+    return {key: True if isinstance(child, dict) else child for key, child in node.items()}
@@ -9,11 +9,22 @@ import flet as ft
 import json
 import os
 import random
+import re
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, List
 import uuid
 
-from firebase_config import fb_get, fb_put, fb_patch, is_firebase_configured
+import firebase_metrics
+import rtdb_tree
+from club_repository import ClubRepository, month_of
+from firebase_config import (
+    SERVER_TIMESTAMP, TOMBSTONE_RESET, TOMBSTONE_ROOT, fb_add_connection_listener,
+    fb_add_sync_listener, fb_batch, fb_count_many, fb_get, fb_get_if_changed, fb_get_many_if_changed,
+    fb_is_online, fb_outbox_stats, fb_replay_outbox, fb_subscribe, fb_sync, fb_sync_many,
+    fb_sync_status, fb_warm_up, server_increment,
+)
 
 # 데이터 파일 경로 (로컬 폴백용)
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
@@ -21,6 +32,13 @@ MEMBERS_FILE = os.path.join(DATA_DIR, "members.json")
 ATTENDANCE_FILE = os.path.join(DATA_DIR, "attendance.json")
 MATCHES_FILE = os.path.join(DATA_DIR, "matches.json")
 
+# 로컬 저장소 형식 (환경 변수 LOCAL_STORE)
+# - "json":   컬렉션마다 JSON 파일 (기본)
+# - "sqlite": SQLite 파일 하나 (sqlite_store.py) - 레코드 단위 저장, 인덱스 범위 조회
+LOCAL_STORE = os.environ.get("LOCAL_STORE", "json")
+SQLITE_FILE = os.path.join(DATA_DIR, "club.db")
+MATCHES_DIR = os.path.join(DATA_DIR, "matches")    # 월 파티션 레이아웃의 로컬 JSON (월마다 파일 하나)
+
 # 운영 설정
 MIN_ATTENDANCE = 8
 MAX_ATTENDANCE = 16
@@ -28,6 +46,9 @@ NUM_COURTS = 2
 COURT_NAMES = ["7번코트", "8번코트"]
 MATCH_DURATION_MIN = 30
 
+# 편집 저장 지연 (초) - 첫 변경 후 이 시간 안의 변경을 모아 한 번에 저장
+FLUSH_DELAY = 0.5
+
 # 요일별 타임 스케줄 (시작시간 리스트)
 SCHEDULE = {
     "목": {
@@ -87,11 +108,6 @@ class AppTheme:
     )
 
 
-def ensure_data_dir():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-
-
 # Firebase 경로 매핑
 _FB_PATH_MAP = {
     MEMBERS_FILE: "members",
@@ -99,31 +115,471 @@ _FB_PATH_MAP = {
     MATCHES_FILE: "matches",
 }
 
+# 레코드 키 필드 - 키 기반 레이아웃에서 {컬렉션}/{키} 경로로 저장
+_RECORD_KEY_FIELD = {
+    MEMBERS_FILE: "id",
+    ATTENDANCE_FILE: "date",
+    MATCHES_FILE: "id",
+}
+
+# 키 기반 레이아웃은 순서가 없으므로 읽을 때 기존 배열 순서에 가깝게 정렬
+_RECORD_ORDER = {
+    MEMBERS_FILE: lambda r: r.get("join_date", ""),
+    ATTENDANCE_FILE: lambda r: r.get("date", ""),
+    MATCHES_FILE: lambda r: (r.get("date", ""), r.get("time_slot", 0), r.get("court", "")),
+}
+
+# 컬렉션별 원격 레이아웃 (읽을 때 감지)
+# - "legacy":  members/members/[배열] 처럼 컬렉션 전체가 한 배열
+# - "keyed":   members/{id}, attendance/{date}, matches/{id}
+# - "monthly": matches/{YYYY-MM}/{id} (경기만) + 매니페스트 _manifest/matches/{YYYY-MM} = {count, updated_at}
+# 감지 전(빈 컬렉션 등)에는 키 기반으로 쓴다
+_layouts = {}
+
+MATCH_MANIFEST_PATH = "_manifest/matches"
+_MONTH_KEY = re.compile(r"^\d{4}-\d{2}$")
+_match_manifest = {}    # 마지막으로 받은 경기 매니페스트 {월: {"count", "updated_at"}}
+
+# 보관 처리(archive_history.py)로 옮긴 오래된 기록
+# - 스냅샷: _archive/{YYYY-MM} = {"encoding", "data", "matches", "attendance", "archived_at"}
+# - 요약:   _rollups/players/{YYYY-MM}/{회원 id} = {"matches", "wins", "losses", "draws", "points", ...}
+ARCHIVE_PATH = "_archive"
+PLAYER_ROLLUP_PATH = "_rollups/players"
+
+
+def _is_legacy(file_path: str) -> bool:
+    return _layouts.get(file_path) == "legacy"
+
+
+def is_match_partitioned() -> bool:
+    """경기가 월 파티션 레이아웃인지 (matches/{YYYY-MM}/{id})"""
+    return _layouts.get(MATCHES_FILE) == "monthly"
+
+
+def _match_path(record: dict) -> str:
+    return f"{_FB_PATH_MAP[MATCHES_FILE]}/{month_of(record['date'])}/{record['id']}"
+
+
+def _detect_match_layout():
+    """경기 레이아웃을 아직 모르면 매니페스트로 월 파티션인지 확인 (작은 조회 한 번)
+
+    매니페스트 없이 컬렉션 전체를 받으면 파티션 레이아웃에서는 모든 달을 받게 되므로
+    처음 한 번은 매니페스트부터 본다.
+    """
+    if MATCHES_FILE in _layouts:
+        return
+    manifest, _ = fb_get_if_changed(MATCH_MANIFEST_PATH)
+    if isinstance(manifest, dict) and manifest:
+        _layouts[MATCHES_FILE] = "monthly"
+        _match_manifest.clear()
+        _match_manifest.update(manifest)
+
+
+def _manifest_from_records(records: list) -> dict:
+    """경기 목록으로 만든 매니페스트 (서버 매니페스트를 읽지 못했을 때)"""
+    manifest = {}
+    for record in records:
+        entry = manifest.setdefault(month_of(record.get("date", "")), {"count": 0, "updated_at": 0})
+        entry["count"] += 1
+        stamp = record.get("updated_at")
+        if isinstance(stamp, (int, float)) and stamp > entry["updated_at"]:
+            entry["updated_at"] = stamp
+    return manifest
+
+
+def _collection_path(file_path: str) -> str:
+    """레코드들이 바로 아래에 있는 Firebase 경로"""
+    fb_path = _FB_PATH_MAP[file_path]
+    return f"{fb_path}/{fb_path}" if _is_legacy(file_path) else fb_path
+
+
+def record_key(file_path: str, record: dict) -> str:
+    return str(record[_RECORD_KEY_FIELD[file_path]])
+
+
+def from_remote(file_path: str, raw) -> Optional[dict]:
+    """Firebase 원본을 앱 형식({"members": [...]})으로 변환 (두 레이아웃 모두 지원)"""
+    if raw is None:
+        return None
+    name = _FB_PATH_MAP[file_path]
+    if isinstance(raw, dict) and name in raw:
+        # 배열 레이아웃 (전환 중 함께 써진 키 기반 레코드도 포함)
+        _layouts[file_path] = "legacy"
+        keyed = {key: value for key, value in raw.items() if key != name}
+        return {name: rtdb_tree.children(raw[name]) + rtdb_tree.children(keyed)}
+    if file_path == MATCHES_FILE and isinstance(raw, dict) and raw and all(map(_MONTH_KEY.match, raw)):
+        # 월 파티션 레이아웃을 통째로 받은 경우 - 달별 레코드를 펼침
+        _layouts[file_path] = "monthly"
+        records = [record for month in raw.values() for record in rtdb_tree.children(month)]
+    else:
+        _layouts[file_path] = "keyed"
+        records = rtdb_tree.children(raw)
+    records.sort(key=_RECORD_ORDER[file_path])
+    return {name: records}
+
+
+def to_keyed(file_path: str, data: dict) -> dict:
+    """앱 형식 → 키 기반 레이아웃 {키: 레코드} (레코드마다 updated_at 서버 시각 포함)"""
+    name = _FB_PATH_MAP[file_path]
+    return {record_key(file_path, record): _stamped(record) for record in data.get(name, [])}
+
+
+def _stamped(record: dict) -> dict:
+    """updated_at을 서버 시각으로 채운 사본 - 델타 동기화(fb_sync)의 기준"""
+    return dict(record, updated_at=SERVER_TIMESTAMP)
+
+
+def _tombstone_path(file_path: str, key: str) -> str:
+    """삭제 기록 경로 - 다른 기기가 델타 동기화로 삭제를 알 수 있게 남김"""
+    return f"{TOMBSTONE_ROOT}/{_FB_PATH_MAP[file_path]}/{key}"
+
+
+_sqlite = None   # None: 아직 열지 않음, False: 쓰지 않음
+_sqlite_lock = threading.Lock()
+
+
+def _sqlite_store():
+    """SQLite 로컬 저장소 (LOCAL_STORE=sqlite일 때만, 아니거나 열 수 없으면 None)
+
+    처음 열 때 비어 있으면 기존 JSON 파일을 가져온다 (JSON 파일은 그대로 둠).
+    """
+    global _sqlite
+    if _sqlite is None:
+        with _sqlite_lock:
+            if _sqlite is None:
+                _sqlite = _open_sqlite_store() if LOCAL_STORE == "sqlite" else False
+    return _sqlite or None
+
+
+def _open_sqlite_store():
+    try:
+        import sqlite_store
+        store = sqlite_store.SqliteStore(SQLITE_FILE)
+        if store.is_empty():
+            store.import_json({name: file_path for file_path, name in _FB_PATH_MAP.items()})
+        return store
+    except Exception as e:
+        # JSON 파일로 계속 동작 - 원인은 계측의 오류 목록(where="local_store")에 남김
+        firebase_metrics.record_error("local_store", "sqlite", e)
+        return False
+
+
+def _load_local_json(file_path: str, default: dict) -> dict:
+    """로컬 JSON 파일 로드 (없으면 기본값)"""
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return default
+
+
+def _load_local(file_path: str, default: dict) -> dict:
+    """로컬 저장소에서 컬렉션 로드 (SQLite 또는 JSON 파일)"""
+    store = _sqlite_store()
+    if store and file_path in _FB_PATH_MAP:
+        return store.load(_FB_PATH_MAP[file_path])
+    return _load_local_json(file_path, default)
+
 
 def load_json(file_path: str, default: dict) -> dict:
     """Firebase에서 로드, 실패 시 로컬 JSON 폴백"""
     fb_path = _FB_PATH_MAP.get(file_path)
     if fb_path:
-        data = fb_get(fb_path, default=None)
+        data = from_remote(file_path, fb_get(fb_path, default=None))
         if data is not None:
             return data
     # 로컬 폴백
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return default
+    return _load_local(file_path, default)
+
+
+def load_all_json(known_etags: dict = None) -> dict:
+    """회원/출석/경기 데이터를 동시에 로드 (항목별 로컬 JSON 폴백)
+
+    세 컬렉션을 병렬로 조회하므로 지연 시간은 가장 느린 한 건 수준이다.
+    키 기반 컬렉션은 지난번 이후 바뀐 레코드만 받고(fb_sync),
+    배열 레이아웃 컬렉션은 ETag 조건부 조회로 통째로 받는다.
+    경기가 월 파티션 레이아웃이면 경기 대신 매니페스트만 받는다 (달은 load_match_month로).
+    known_etags({file_path: 버전})를 주면 버전이 같은 컬렉션은 건너뛴다.
+    반환값: {file_path: (data, 버전)} - 바뀌지 않은 컬렉션은 포함되지 않음
+            월 파티션이면 경기 항목의 data는 매니페스트 {월: {"count", "updated_at"}}
+    """
+    known_etags = known_etags or {}
+    defaults = {
+        MEMBERS_FILE: {"members": []},
+        ATTENDANCE_FILE: {"attendance": []},
+        MATCHES_FILE: {"matches": []},
+    }
+    _detect_match_layout()
+    paths = {fp: (MATCH_MANIFEST_PATH if fp == MATCHES_FILE and is_match_partitioned() else _FB_PATH_MAP[fp])
+             for fp in defaults}
+    conditional = {paths[fp]: known_etags.get(fp) for fp in defaults
+                   if _is_legacy(fp) or paths[fp] == MATCH_MANIFEST_PATH}
+    keyed = {paths[fp]: known_etags.get(fp) for fp in defaults if paths[fp] not in conditional}
+    fetched = fb_sync_many(keyed) if keyed else {}
+    if conditional:
+        fetched.update(fb_get_many_if_changed(conditional))
+
+    results = {}
+    for file_path, default in defaults.items():
+        if paths[file_path] not in fetched:
+            continue
+        raw, etag = fetched[paths[file_path]]
+        if paths[file_path] == MATCH_MANIFEST_PATH:
+            _match_manifest.clear()
+            _match_manifest.update(raw if isinstance(raw, dict) else {})
+            results[file_path] = (dict(_match_manifest), etag)
+            continue
+        data = from_remote(file_path, raw)
+        if data is None:
+            # 서버/캐시 모두 비어 있으면 로컬 저장소 폴백
+            data = _load_local(file_path, default)
+        elif file_path == MATCHES_FILE and is_match_partitioned():
+            # 매니페스트를 읽지 못해 전체를 받은 경우 - 받은 경기로 매니페스트를 만들어 파티션으로 씀
+            _match_manifest.clear()
+            _match_manifest.update(_manifest_from_records(data["matches"]))
+            results[file_path] = (dict(_match_manifest), etag)
+            continue
+        else:
+            _sync_local(file_path, data)
+        results[file_path] = (data, etag)
+    return results
+
+
+def load_match_month(month: str, refresh: bool = False) -> list:
+    """경기 월 파티션 하나 (matches/{month}, 델타 동기화, 실패 시 로컬 저장소)
+
+    refresh면 최근에 동기화했더라도 서버에 변경분을 묻는다 (매니페스트 버전이 바뀐 달).
+    """
+    raw, version = fb_sync(f"{_FB_PATH_MAP[MATCHES_FILE]}/{month}", max_staleness=0 if refresh else None)
+    if raw is None and version is None:
+        return _load_local_month(month)
+    records = rtdb_tree.children(raw)
+    records.sort(key=_RECORD_ORDER[MATCHES_FILE])
+    store = _sqlite_store()
+    if store:
+        store.replace_between("matches", f"{month}-01", f"{month}-31", records)
+    return records
+
+
+def count_records(file_paths: list) -> dict:
+    """컬렉션별 레코드 수만 동시에 조회 (shallow 조회라 레코드 본문은 받지 않음)
+
+    반환값: {file_path: 개수 또는 None}
+    """
+    result = {}
+    if MATCHES_FILE in file_paths and is_match_partitioned():
+        # 월 파티션이면 매니페스트의 달별 개수 합
+        result[MATCHES_FILE] = sum(entry.get("count", 0) for entry in _match_manifest.values()
+                                   if isinstance(entry, dict))
+    fb_paths = {fp: _collection_path(fp) for fp in file_paths if fp not in result}
+    counts = fb_count_many(list(fb_paths.values())) if fb_paths else {}
+    result.update({fp: counts.get(fb_path) for fp, fb_path in fb_paths.items()})
+    return result
+
+
+def _save_local_json(file_path: str, data: dict):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)     # 월 파티션 파일은 data/matches/ 아래
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _save_local(file_path: str, data: dict, records: list = None, deleted: list = None):
+    """로컬 저장소에 변경 저장
+
+    SQLite면 바뀐 레코드(records) / 지운 레코드(deleted)만 쓰고, 둘 다 None이면 컬렉션 교체.
+    JSON 파일이면 언제나 data 전체를 다시 쓴다.
+    """
+    store = _sqlite_store()
+    if not (store and file_path in _FB_PATH_MAP):
+        if file_path == MATCHES_FILE and is_match_partitioned():
+            _save_local_months(data, records, deleted)
+        else:
+            _save_local_json(file_path, data)
+        return
+    name = _FB_PATH_MAP[file_path]
+    if records is None and deleted is None:
+        store.replace(name, data)
+        return
+    if deleted:
+        store.delete(name, [record_key(file_path, record) for record in deleted])
+    if records:
+        store.upsert(name, records)
+
+
+def _month_file(month: str) -> str:
+    return os.path.join(MATCHES_DIR, f"{month}.json")
+
+
+def _save_local_months(data: dict, records: list = None, deleted: list = None):
+    """월 파티션 경기를 달별 JSON 파일로 저장 (바뀐 레코드가 있는 달만, 둘 다 None이면 전부)
+
+    data에는 바뀐 달의 경기가 모두 들어 있어야 한다 (저장 대기 중인 달은 메모리에서 내보내지 않음).
+    """
+    by_month = {}
+    for record in data.get("matches", []):
+        by_month.setdefault(month_of(record.get("date", "")), []).append(record)
+    if records is None and deleted is None:
+        months = set(by_month)
+    else:
+        months = {month_of(record.get("date", "")) for record in (records or []) + (deleted or [])}
+    for month in months:
+        _save_local_json(_month_file(month), {"matches": by_month.get(month, [])})
+
+
+def _load_local_month(month: str) -> list:
+    """로컬 저장소의 경기 월 파티션 (SQLite, 달별 JSON, 예전 matches.json 순)"""
+    store = _sqlite_store()
+    if store:
+        return store.matches_between(f"{month}-01", f"{month}-31")
+    if os.path.exists(_month_file(month)):
+        return _load_local_json(_month_file(month), {"matches": []}).get("matches", [])
+    return [m for m in _load_local_json(MATCHES_FILE, {"matches": []}).get("matches", [])
+            if month_of(m.get("date", "")) == month]
+
+
+def _sync_local(file_path: str, data: dict):
+    """서버에서 받은 컬렉션을 SQLite 저장소에 반영 (JSON 파일은 로컬 변경 때만 씀)
+
+    바뀐 레코드만 쓰고 없어진 키만 지운다 (비어 있으면 전부 넣음).
+    """
+    store = _sqlite_store()
+    if store:
+        store.sync(_FB_PATH_MAP[file_path], data)
+
+
+def query_player_stats(start: str, end: str) -> Optional[dict]:
+    """기간 내 선수별 성적 (SQLite 범위 쿼리, SQLite를 쓰지 않으면 None)"""
+    store = _sqlite_store()
+    return store.player_stats(start, end) if store else None
+
+
+def query_attendance_counts(start: str, end: str) -> Optional[dict]:
+    """기간 내 회원별 출석 횟수 (SQLite 범위 쿼리, SQLite를 쓰지 않으면 None)"""
+    store = _sqlite_store()
+    return store.attendance_counts(start, end) if store else None
+
+
+def load_player_rollups(before: str = None) -> dict:
+    """보관된 달의 선수별 요약 합계 {회원 id: {"matches", "wins", ..., "attendance"}}
+
+    before(YYYY-MM)를 주면 그 달 이전 요약만 합친다.
+    전체 기간 통계는 이 합계에 메모리의 경기(score_matches)를 더하면 되고 스냅샷은 읽지 않는다.
+    """
+    totals = {}
+    for month, players in (fb_get(PLAYER_ROLLUP_PATH, default=None) or {}).items():
+        if (before and month >= before) or not isinstance(players, dict):
+            continue
+        for player_id, rollup in players.items():
+            total = totals.setdefault(player_id, {})
+            for field, value in rollup.items():
+                total[field] = total.get(field, 0) + value
+    return totals
 
 
 def save_json(file_path: str, data: dict):
     """Firebase에 저장 + 로컬 캐시도 저장"""
-    ensure_data_dir()
     # 로컬 저장
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    _save_local(file_path, data)
     # Firebase 저장
     fb_path = _FB_PATH_MAP.get(file_path)
     if fb_path:
-        fb_put(fb_path, data)
+        _overwrite_collection(fb_batch(), file_path, data).commit_async()
+
+
+def _overwrite_collection(batch, file_path: str, data: dict):
+    """컬렉션 전체 덮어쓰기를 batch에 추가
+
+    키 기반이면 지워진 키를 하나하나 알 수 없으므로 삭제 기록 대신
+    리셋 표시를 남겨 다른 기기가 다음 동기화 때 전체를 다시 받게 한다.
+    """
+    fb_path = _FB_PATH_MAP[file_path]
+    if _is_legacy(file_path):
+        return batch.put(fb_path, data)
+    if file_path == MATCHES_FILE and is_match_partitioned():
+        partitions = {}
+        for record in data.get("matches", []):
+            partitions.setdefault(month_of(record["date"]), {})[record["id"]] = _stamped(record)
+        batch.put(fb_path, partitions)
+        batch.put(MATCH_MANIFEST_PATH, {
+            month: {"count": len(records), "updated_at": SERVER_TIMESTAMP}
+            for month, records in partitions.items()
+        })
+        # 달마다 따로 델타 동기화하므로 리셋 표시도 달마다 (없어진 달 포함)
+        for month in set(partitions) | set(_match_manifest):
+            batch.put(f"{TOMBSTONE_ROOT}/{fb_path}/{month}/{TOMBSTONE_RESET}", SERVER_TIMESTAMP)
+        return batch
+    batch.put(fb_path, to_keyed(file_path, data))
+    return batch.put(_tombstone_path(file_path, TOMBSTONE_RESET), SERVER_TIMESTAMP)
+
+
+# Firebase 쓰기는 모두 로컬에 먼저 반영하고 전송은 백그라운드 쓰기 큐가 맡는다.
+# 화면은 네트워크를 기다리지 않고, 전송 상태는 fb_sync_status()로 확인한다.
+def save_json_batch(items: list):
+    """여러 컬렉션 변경을 Firebase 다중 경로 쓰기 한 번으로 저장 (전부 또는 전무)
+
+    items: [(file_path, data, records)] 또는 [(file_path, data, records, deleted[, inserted])]
+    - records가 None이면 컬렉션 전체를 덮어씀
+    - 레코드 목록이면 그 레코드만 전송하고 deleted 레코드는 삭제 (요청 크기가 변경량에 비례)
+    - inserted: records 중 새로 추가된 레코드 키 집합 (월 파티션 매니페스트의 경기 수 증감에 씀)
+    - 키 기반 레이아웃의 삭제는 삭제 기록과 함께 보내 둘 중 하나만 반영되는 일이 없다
+    로컬 저장소에는 SQLite면 바뀐 레코드만, JSON 파일이면 data 전체를 저장한다.
+    Firebase 쓰기를 먼저 큐에 넣으므로 로컬 저장이 실패해도 서버 전송은 그대로 진행된다.
+    """
+    batch = fb_batch()
+    for file_path, data, records, *rest in items:
+        deleted = rest[0] if rest else None
+        inserted = rest[1] if len(rest) > 1 else set()
+        fb_path = _FB_PATH_MAP.get(file_path)
+        if not fb_path:
+            continue
+        name = _FB_PATH_MAP[file_path]
+        if records is None:
+            _overwrite_collection(batch, file_path, data)
+        elif _is_legacy(file_path):
+            # 배열 레이아웃: 배열 인덱스 위치에 직접 기록 (삭제가 있으면 인덱스가 밀리므로 통째로)
+            positions = {id(record): i for i, record in enumerate(data[name])}
+            if deleted or any(id(r) not in positions for r in records):
+                batch.put(fb_path, data)
+            else:
+                batch.update(_collection_path(file_path), {str(positions[id(r)]): r for r in records})
+        elif file_path == MATCHES_FILE and is_match_partitioned():
+            deltas = {}
+            for record in records:
+                batch.put(_match_path(record), _stamped(record))
+                month = month_of(record["date"])
+                deltas[month] = deltas.get(month, 0) + (1 if record["id"] in inserted else 0)
+            for record in deleted or []:
+                batch.delete(_match_path(record))
+                batch.put(f"{TOMBSTONE_ROOT}/{_match_path(record)}", SERVER_TIMESTAMP)
+                month = month_of(record["date"])
+                deltas[month] = deltas.get(month, 0) - 1
+            _put_manifest_entries(batch, deltas)
+        else:
+            batch.update(fb_path, {record_key(file_path, r): _stamped(r) for r in records})
+            for record in deleted or []:
+                key = record_key(file_path, record)
+                batch.delete(f"{fb_path}/{key}")
+                batch.put(_tombstone_path(file_path, key), SERVER_TIMESTAMP)
+    batch.commit_async()
+    for file_path, data, records, *rest in items:
+        try:
+            _save_local(file_path, data, records, rest[0] if rest else None)
+        except Exception as e:
+            # 로컬 사본은 다음 서버 동기화 때 다시 맞춰짐 - 원인은 계측의 오류 목록에 남김
+            firebase_metrics.record_error("local_store", _FB_PATH_MAP.get(file_path, file_path), e)
+
+
+def _put_manifest_entries(batch, deltas: dict):
+    """바뀐 달의 매니페스트 항목(경기 수, 버전)을 batch에 추가
+
+    deltas: {월: 늘어난 경기 수 (줄었으면 음수, 수정만 있으면 0)}
+    경기 수는 서버에서 증감하므로 여러 기기가 같은 달에 동시에 저장해도 서로 덮어쓰지 않는다.
+    경기가 모두 지워진 달은 개수 0인 항목으로 남는다 (그 달을 조회하면 빈 목록을 받음).
+    """
+    for month, delta in deltas.items():
+        path = f"{MATCH_MANIFEST_PATH}/{month}"
+        if delta:
+            batch.put(f"{path}/count", server_increment(delta))
+        batch.put(f"{path}/updated_at", SERVER_TIMESTAMP)
 
 
 def generate_id(prefix: str) -> str:
@@ -145,6 +601,52 @@ def get_month_range(date: datetime) -> tuple:
     return start, end
 
 
+def score_matches(matches: list) -> dict:
+    """경기 목록 → 선수별 성적 (승 2 + 게임 차, 무 1, 패 -게임 차)"""
+    scores = {}
+    for match in matches:
+        team1 = match["team1"]
+        team2 = match["team2"]
+        score1 = match["score1"]
+        score2 = match["score2"]
+        winner = match.get("winner", "")
+        is_draw = winner == "draw" or score1 == score2
+        is_team1_winner = winner == "team1"
+        is_team2_winner = winner == "team2"
+        game_diff = abs(score1 - score2)
+
+        for player_id in team1:
+            if player_id not in scores:
+                scores[player_id] = {"wins": 0, "losses": 0, "draws": 0, "points": 0, "games_won": 0, "games_lost": 0}
+            scores[player_id]["games_won"] += score1
+            scores[player_id]["games_lost"] += score2
+            if is_draw:
+                scores[player_id]["draws"] += 1
+                scores[player_id]["points"] += 1  # 무승부는 1점
+            elif is_team1_winner:
+                scores[player_id]["wins"] += 1
+                scores[player_id]["points"] += 2 + game_diff
+            else:
+                scores[player_id]["losses"] += 1
+                scores[player_id]["points"] -= game_diff
+
+        for player_id in team2:
+            if player_id not in scores:
+                scores[player_id] = {"wins": 0, "losses": 0, "draws": 0, "points": 0, "games_won": 0, "games_lost": 0}
+            scores[player_id]["games_won"] += score2
+            scores[player_id]["games_lost"] += score1
+            if is_draw:
+                scores[player_id]["draws"] += 1
+                scores[player_id]["points"] += 1  # 무승부는 1점
+            elif is_team2_winner:
+                scores[player_id]["wins"] += 1
+                scores[player_id]["points"] += 2 + game_diff
+            else:
+                scores[player_id]["losses"] += 1
+                scores[player_id]["points"] -= game_diff
+    return scores
+
+
 def generate_random_matches(player_ids: List[str], schedule=None, num_courts: int = NUM_COURTS) -> List[dict]:
     """2코트 동시 진행 매칭 생성 (시간대별, 코트 공정 배분)"""
     if len(player_ids) < 4:
@@ -551,9 +1053,27 @@ class TennisClubApp:
         }
 
         # 데이터 로드
-        self.members = load_json(MEMBERS_FILE, {"members": []})
-        self.attendance = load_json(ATTENDANCE_FILE, {"attendance": []})
-        self.matches = load_json(MATCHES_FILE, {"matches": []})
+        self.repo = ClubRepository()  # 회원/출석/경기 + 조회 인덱스 + 변경 기록
+        self._flush_timer = None
+        self._flush_lock = threading.Lock()
+        self._etags = {}  # 컬렉션별로 마지막에 받은 서버 버전 (ETag 또는 동기화 커서)
+        fb_replay_outbox()  # 지난 실행에서 보내지 못한 쓰기부터 재전송
+        self.reload_data()
+
+        # 실시간 구독: 다른 기기의 변경을 스트림으로 받아 메모리 미러에 반영
+        # (경기가 월 파티션이면 전체 이력 대신 매니페스트를 구독 - 바뀐 달만 다시 받음)
+        self._unsubscribers = [
+            fb_subscribe(_FB_PATH_MAP[file_path], self._on_remote_change)
+            for file_path in (MEMBERS_FILE, ATTENDANCE_FILE, MATCHES_FILE)
+            if not (file_path == MATCHES_FILE and is_match_partitioned())
+        ]
+        if is_match_partitioned():
+            self._unsubscribers.append(fb_subscribe(MATCH_MANIFEST_PATH, self._on_remote_change))
+        self.sync_badge = None
+        self.connection_badge = None
+        self._remove_sync_listener = fb_add_sync_listener(self._on_sync_status)
+        self._remove_connection_listener = fb_add_connection_listener(self._on_connection_change)
+        self.page.on_disconnect = self.on_disconnect
 
         self.selected_date = datetime.now().strftime("%Y-%m-%d")
         self.auto_match_schedule = []
@@ -570,6 +1090,91 @@ class TennisClubApp:
 
         self.show_login_screen()
 
+    def on_disconnect(self, e):
+        """브라우저 세션 종료 시 남은 변경 저장 + 스트림 구독 / 동기화 상태 알림 해제"""
+        self.flush_changes()
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+        self._remove_sync_listener()
+        self._remove_connection_listener()
+
+    def _on_connection_change(self, online):
+        """연결 상태 배지를 갱신하고, 복구되면 오프라인 동안 바뀐 데이터를 다시 읽음 (차단기 스레드)"""
+        if self.connection_badge is not None:
+            try:
+                self._apply_connection_state(online)
+                self.connection_badge.update()
+            except Exception:
+                pass
+        if online:
+            self.reload_data()
+
+    def create_connection_badge(self):
+        """Firebase 연결 상태 표시 (회로 차단기 상태 기준, 바뀌면 _on_connection_change가 갱신)"""
+        self.connection_badge = ft.Container(
+            content=ft.Row([ft.Icon(size=16), ft.Text(size=12)], spacing=4),
+            padding=ft.padding.symmetric(horizontal=12, vertical=4),
+            border_radius=12,
+        )
+        self._apply_connection_state(fb_is_online())
+        return self.connection_badge
+
+    def _apply_connection_state(self, online):
+        icon, text, color = ((ft.Icons.CLOUD_DONE, "Firebase 연결됨", AppTheme.SUCCESS) if online
+                             else (ft.Icons.CLOUD_OFF, "오프라인 모드", AppTheme.WARNING))
+        badge_icon, badge_text = self.connection_badge.content.controls
+        badge_icon.name, badge_icon.color = icon, color
+        badge_text.value, badge_text.color = text, color
+        self.connection_badge.bgcolor = ft.Colors.with_opacity(0.1, color)
+
+    def create_sync_badge(self):
+        """Firebase 쓰기 동기화 상태 아이콘 (전송 대기/완료/실패)"""
+        self.sync_badge = ft.Icon(size=14)
+        self._apply_sync_status(fb_sync_status())
+        return self.sync_badge
+
+    def _apply_sync_status(self, status):
+        icon, color, tooltip = {
+            "pending": (ft.Icons.CLOUD_UPLOAD, AppTheme.WARNING, "저장 중"),
+            "failed": (ft.Icons.CLOUD_OFF, AppTheme.ERROR, "저장 실패 - 재시도 중"),
+        }.get(status, (ft.Icons.CLOUD_DONE, AppTheme.TEXT_ON_PRIMARY, "저장 완료"))
+        self.sync_badge.name = icon
+        self.sync_badge.color = color
+        self.sync_badge.tooltip = tooltip
+
+    def create_outbox_text(self):
+        """서버로 아직 보내지 못한 변경 건수 (없으면 숨김)"""
+        stats = fb_outbox_stats()
+        if not stats["depth"]:
+            return ft.Container(visible=False)
+        minutes = int(stats["oldest_age"] // 60)
+        age = f"{minutes}분 전부터" if minutes else "방금"
+        return ft.Text(f"전송 대기 {stats['depth']}건 ({age}) - 연결되면 자동으로 저장됩니다",
+                       size=12, color=AppTheme.WARNING)
+
+    def _on_sync_status(self, status):
+        """쓰기 큐 상태가 바뀌면 배지 갱신 (쓰기 큐 스레드에서 호출될 수 있음)"""
+        if self.sync_badge is None:
+            return
+        try:
+            self._apply_sync_status(status)
+            self.sync_badge.update()
+        except Exception:
+            pass
+
+    @firebase_metrics.scoped("stream")
+    def _on_remote_change(self, path):
+        """스트림으로 변경이 들어오면 데이터를 갱신하고 경기 목록을 다시 그림 (스트림 스레드)"""
+        if not self.reload_data():
+            return
+        if self.current_view == 1 and self.selected_tab == 2 and hasattr(self, "match_results_list"):
+            try:
+                self.update_match_results_list()
+                self.page.update()
+            except Exception:
+                pass
+
     def on_view_pop(self, e):
         """Android 뒤로가기 버튼 처리"""
         if self.current_view > 0:
@@ -590,7 +1195,7 @@ class TennisClubApp:
 
     def show_login_screen(self):
         """로그인 화면 - 이름 선택 또는 입력"""
-        member_names = [m["name"] for m in self.members.get("members", [])]
+        member_names = [m["name"] for m in self.repo.member_list()]
 
         typed_name = {"value": ""}
 
@@ -607,27 +1212,8 @@ class TennisClubApp:
             on_submit=lambda e: login_with_name(typed_name["value"]),
         )
 
-        # Firebase 연결 상태 표시
-        if is_firebase_configured():
-            connection_badge = ft.Container(
-                content=ft.Row([
-                    ft.Icon(ft.Icons.CLOUD_DONE, size=16, color=AppTheme.SUCCESS),
-                    ft.Text("Firebase 연결됨", size=12, color=AppTheme.SUCCESS),
-                ], spacing=4),
-                padding=ft.padding.symmetric(horizontal=12, vertical=4),
-                border_radius=12,
-                bgcolor=ft.Colors.with_opacity(0.1, AppTheme.SUCCESS),
-            )
-        else:
-            connection_badge = ft.Container(
-                content=ft.Row([
-                    ft.Icon(ft.Icons.CLOUD_OFF, size=16, color=AppTheme.WARNING),
-                    ft.Text("오프라인 모드", size=12, color=AppTheme.WARNING),
-                ], spacing=4),
-                padding=ft.padding.symmetric(horizontal=12, vertical=4),
-                border_radius=12,
-                bgcolor=ft.Colors.with_opacity(0.1, AppTheme.WARNING),
-            )
+        # Firebase 연결 상태 표시 (회로 차단기 상태가 바뀌면 갱신)
+        connection_badge = self.create_connection_badge()
 
         def login_with_name(name):
             if name and name.strip():
@@ -720,11 +1306,46 @@ class TennisClubApp:
         self.page.add(content)
         self.page.update()
 
-    def reload_data(self):
-        """Firebase에서 최신 데이터 다시 로드"""
-        self.members = load_json(MEMBERS_FILE, {"members": []})
-        self.attendance = load_json(ATTENDANCE_FILE, {"attendance": []})
-        self.matches = load_json(MATCHES_FILE, {"matches": []})
+    @firebase_metrics.scoped("reload")
+    def reload_data(self) -> bool:
+        """Firebase에서 바뀐 데이터만 다시 로드 (변경 여부 반환)"""
+        changed = load_all_json(self._etags)
+        for file_path, (data, etag) in changed.items():
+            self._etags[file_path] = etag
+            if file_path == MATCHES_FILE and is_match_partitioned():
+                # 월 파티션: 매니페스트만 받고 달은 화면이 조회할 때 불러옴
+                self.repo.partition_matches(load_match_month, data)
+            else:
+                self.repo.replace(_FB_PATH_MAP[file_path], data)
+        return bool(changed)
+
+    def schedule_flush(self):
+        """변경 저장 예약 - FLUSH_DELAY 안에 생긴 변경은 같은 저장에 묶임"""
+        with self._flush_lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush_changes)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush_changes(self):
+        """마지막 저장 이후 바뀐 레코드만 로컬 저장소와 Firebase에 저장 (다중 경로 쓰기 한 번)"""
+        with self._flush_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        changes = self.repo.take_changes()
+        if not changes:
+            return
+        files = {name: file_path for file_path, name in _FB_PATH_MAP.items()}
+        try:
+            save_json_batch([
+                (files[name], getattr(self.repo, name), upserts, deletes, inserted)
+                for name, (upserts, deletes, inserted) in changes.items()
+            ])
+        except Exception:
+            # 큐에 넣지 못했으면 꺼낸 변경을 되돌려 다음 저장 때 다시 보냄
+            self.repo.restore_changes(changes)
+            raise
 
     def setup_ui(self):
         self.tab_content = ft.Container(expand=True, bgcolor=AppTheme.BG_PRIMARY)
@@ -794,9 +1415,24 @@ class TennisClubApp:
         tabs[index]()
 
     # ==================== 홈 탭 ====================
+    def get_collection_counts(self) -> dict:
+        """홈/설정 통계용 레코드 수 (shallow 개수 조회, 실패 시 메모리 데이터 기준)"""
+        collections = {
+            "members": (MEMBERS_FILE, self.repo.members),
+            "attendance": (ATTENDANCE_FILE, self.repo.attendance),
+            "matches": (MATCHES_FILE, self.repo.matches),
+        }
+        fetched = count_records([file_path for file_path, _ in collections.values()])
+        counts = {}
+        for key, (file_path, data) in collections.items():
+            count = fetched.get(file_path)
+            counts[key] = count if count is not None else len(data.get(key, []))
+        return counts
+
+    @firebase_metrics.scoped("home")
     def show_home_tab(self):
         self.current_view = 0  # 홈 화면
-        self.reload_data()  # 최신 데이터 동기화
+        counts = self.get_collection_counts()
         today = datetime.now()
         day_name = ["월", "화", "수", "목", "금", "토", "일"][today.weekday()]
 
@@ -822,8 +1458,8 @@ class TennisClubApp:
             schedule_icon = ft.Icons.SCHEDULE
             schedule_color = AppTheme.SECONDARY
 
-        total_members = len(self.members.get("members", []))
-        total_matches = len(self.matches.get("matches", []))
+        total_members = counts["members"]
+        total_matches = counts["matches"]
 
         # 메뉴 버튼 생성 (홈 제외: 회원=0, 출석=1, 경기=2, 순위=3, 설정=4)
         def create_menu_button(icon, label, index):
@@ -871,7 +1507,10 @@ class TennisClubApp:
                         ], spacing=0, expand=True),
                         ft.Container(
                             content=ft.Column([
-                                ft.Icon(ft.Icons.PERSON, size=16, color=AppTheme.TEXT_ON_PRIMARY),
+                                ft.Row([
+                                    ft.Icon(ft.Icons.PERSON, size=16, color=AppTheme.TEXT_ON_PRIMARY),
+                                    self.create_sync_badge(),
+                                ], spacing=2, tight=True),
                                 ft.Text(self.current_user or "게스트", size=11, color=AppTheme.TEXT_ON_PRIMARY),
                             ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, spacing=2),
                             bgcolor=ft.Colors.with_opacity(0.2, ft.Colors.WHITE),
@@ -971,13 +1610,17 @@ class TennisClubApp:
         self.tab_content.content = content
         self.page.update()
 
+        # 최신 데이터 동기화는 화면을 그린 뒤 백그라운드에서
+        self.page.run_thread(self.reload_data)
+
     # ==================== 회원 탭 ====================
+    @firebase_metrics.scoped("members")
     def show_members_tab(self):
         self.members_list = ft.ListView(expand=True, spacing=0, padding=ft.padding.symmetric(horizontal=20))
         self.update_members_list()
 
         content = ft.Column([
-            create_header_card("회원 관리", f"총 {len(self.members.get('members', []))}명", ft.Icons.PEOPLE, lambda e: self.go_back_to_home()),
+            create_header_card("회원 관리", f"총 {len(self.repo.member_list())}명", ft.Icons.PEOPLE, lambda e: self.go_back_to_home()),
             ft.Container(
                 content=create_primary_button("회원 등록", ft.Icons.PERSON_ADD, self.show_add_member_dialog),
                 padding=ft.padding.symmetric(horizontal=20, vertical=16),
@@ -990,7 +1633,7 @@ class TennisClubApp:
 
     def update_members_list(self):
         self.members_list.controls.clear()
-        for member in self.members.get("members", []):
+        for member in self.repo.member_list():
             self.members_list.controls.append(
                 create_member_card(
                     member["name"],
@@ -1023,8 +1666,8 @@ class TennisClubApp:
                     "phone": phone_field.value or "",
                     "join_date": datetime.now().strftime("%Y-%m-%d")
                 }
-                self.members["members"].append(new_member)
-                save_json(MEMBERS_FILE, self.members)
+                self.repo.add_member(new_member)
+                self.schedule_flush()
                 self.page.close(dialog)
                 self.show_members_tab()
 
@@ -1047,7 +1690,8 @@ class TennisClubApp:
             if name_field.value:
                 member["name"] = name_field.value
                 member["phone"] = phone_field.value or ""
-                save_json(MEMBERS_FILE, self.members)
+                self.repo.mark_updated("members", member)
+                self.schedule_flush()
                 self.page.close(dialog)
                 self.show_members_tab()
 
@@ -1064,8 +1708,8 @@ class TennisClubApp:
 
     def delete_member(self, member: dict):
         def confirm_delete(e):
-            self.members["members"] = [m for m in self.members["members"] if m["id"] != member["id"]]
-            save_json(MEMBERS_FILE, self.members)
+            self.repo.remove_member(member["id"])
+            self.schedule_flush()
             self.page.close(dialog)
             self.show_members_tab()
 
@@ -1081,6 +1725,7 @@ class TennisClubApp:
         self.page.open(dialog)
 
     # ==================== 출석 탭 ====================
+    @firebase_metrics.scoped("attendance")
     def show_attendance_tab(self):
         self.attendance_date = datetime.now().strftime("%Y-%m-%d")
         self.attendance_checks = {}
@@ -1165,14 +1810,10 @@ class TennisClubApp:
 
     def load_attendance_for_date(self):
         self.attendance_checks = {}
-        existing = None
-        for att in self.attendance.get("attendance", []):
-            if att["date"] == self.attendance_date:
-                existing = att
-                break
+        existing = self.find_attendance(self.attendance_date)
 
         self.attendance_list.controls.clear()
-        for member in self.members.get("members", []):
+        for member in self.repo.member_list():
             is_checked = existing and member["id"] in existing.get("member_ids", [])
             self.attendance_checks[member["id"]] = is_checked
 
@@ -1239,14 +1880,19 @@ class TennisClubApp:
 
         # 회원별 출석 횟수 계산
         member_attendance = {}
-        for member in self.members.get("members", []):
+        for member in self.repo.member_list():
             member_attendance[member["id"]] = {"name": member["name"], "count": 0}
 
-        for att in self.attendance.get("attendance", []):
-            if att["date"].startswith(current_month):
+        self.flush_changes()    # 저장 대기 중인 출석 변경을 SQLite에 먼저 반영
+        counts = query_attendance_counts(f"{current_month}-01", f"{current_month}-31")
+        if counts is None:
+            counts = {}
+            for att in self.repo.attendance_between(f"{current_month}-01", f"{current_month}-31"):
                 for mid in att.get("member_ids", []):
-                    if mid in member_attendance:
-                        member_attendance[mid]["count"] += 1
+                    counts[mid] = counts.get(mid, 0) + 1
+        for mid, count in counts.items():
+            if mid in member_attendance:
+                member_attendance[mid]["count"] = count
 
         # 출석률 순으로 정렬
         stats = sorted(member_attendance.values(), key=lambda x: x["count"], reverse=True)
@@ -1315,24 +1961,13 @@ class TennisClubApp:
             self.page.update()
             return
 
-        found = False
-        for att in self.attendance.get("attendance", []):
-            if att["date"] == self.attendance_date:
-                att["member_ids"] = checked_ids
-                found = True
-                break
-
-        if not found:
-            self.attendance["attendance"].append({
-                "date": self.attendance_date,
-                "member_ids": checked_ids
-            })
-
-        save_json(ATTENDANCE_FILE, self.attendance)
+        self.repo.set_attendance(self.attendance_date, checked_ids)
+        self.schedule_flush()
         self.page.open(ft.SnackBar(content=ft.Text(f"출석이 저장되었습니다. ({len(checked_ids)}명)"), bgcolor=AppTheme.SUCCESS))
         self.page.update()
 
     # ==================== 경기 탭 ====================
+    @firebase_metrics.scoped("matches")
     def show_match_tab(self):
         self.match_date = datetime.now().strftime("%Y-%m-%d")
 
@@ -1405,8 +2040,8 @@ class TennisClubApp:
 
     def _refresh_match_tab(self):
         """경기 탭 데이터 새로고침"""
-        self.reload_data()
-        self.update_match_results_list()
+        if self.reload_data():
+            self.update_match_results_list()
         self.page.open(ft.SnackBar(content=ft.Text("데이터를 새로고침했습니다."), bgcolor=AppTheme.SUCCESS))
         self.page.update()
 
@@ -1417,11 +2052,16 @@ class TennisClubApp:
             self.update_match_results_list()
             self.page.update()
 
+    def find_attendance(self, date: str) -> Optional[dict]:
+        """해당 날짜의 출석 기록 (날짜 인덱스)"""
+        return self.repo.attendance_on(date)
+
     def get_attendance_for_date(self, date: str) -> List[str]:
-        for att in self.attendance.get("attendance", []):
-            if att["date"] == date:
-                return att.get("member_ids", [])
-        return []
+        return self.repo.attendee_ids(date)
+
+    def get_matches_between(self, start: str, end: str = None) -> list:
+        """기간(YYYY-MM-DD, 양 끝 포함) 내 경기 목록 (날짜 인덱스 이분 탐색)"""
+        return self.repo.matches_between(start, end)
 
     def _build_match_list_controls(self, match_list):
         """자동 매칭 결과를 ListView에 추가"""
@@ -1627,7 +2267,7 @@ class TennisClubApp:
         self.page.update()
 
     def save_all_auto_matches(self, e):
-        saved_count = 0
+        new_matches = []
 
         for item in self.score_inputs:
             try:
@@ -1655,13 +2295,15 @@ class TennisClubApp:
                         "start_time": match.get("start_time", ""),
                         "recorded_by": self.current_user or "",
                     }
-                    self.matches["matches"].append(new_match)
-                    saved_count += 1
+                    new_matches.append(new_match)
             except (ValueError, TypeError):
                 continue
 
+        saved_count = len(new_matches)
         if saved_count > 0:
-            save_json(MATCHES_FILE, self.matches)
+            # 추가된 경기만 한 번의 배치로 전송 (전체 이력 재업로드 없음)
+            self.repo.add_matches(new_matches)
+            self.schedule_flush()
             self.page.open(ft.SnackBar(content=ft.Text(f"{saved_count}개 경기가 저장되었습니다."), bgcolor=AppTheme.SUCCESS))
         else:
             self.page.open(ft.SnackBar(content=ft.Text("저장할 경기가 없습니다."), bgcolor=AppTheme.WARNING))
@@ -1670,7 +2312,7 @@ class TennisClubApp:
 
     def update_match_results_list(self):
         self.match_results_list.controls.clear()
-        day_matches = [m for m in self.matches.get("matches", []) if m["date"] == self.match_date]
+        day_matches = self.get_matches_between(self.match_date)
 
         if not day_matches:
             self.match_results_list.controls.append(
@@ -1702,26 +2344,17 @@ class TennisClubApp:
                 )
 
     def get_member_names(self, member_ids: list) -> str:
-        names = []
-        for mid in member_ids:
-            for member in self.members.get("members", []):
-                if member["id"] == mid:
-                    names.append(member["name"])
-                    break
-        return " & ".join(names) if names else "알 수 없음"
+        return self.repo.member_names(member_ids)
 
     def get_member_name(self, member_id: str) -> str:
-        for member in self.members.get("members", []):
-            if member["id"] == member_id:
-                return member["name"]
-        return "알 수 없음"
+        return self.repo.member_name(member_id)
 
     def show_add_match_dialog(self, e):
         attendees = self.get_attendance_for_date(self.match_date)
         if attendees:
-            members_list = [m for m in self.members.get("members", []) if m["id"] in attendees]
+            members_list = self.repo.members_by_ids(attendees)
         else:
-            members_list = self.members.get("members", [])
+            members_list = self.repo.member_list()
 
         if len(members_list) < 4:
             self.page.open(ft.SnackBar(content=ft.Text("최소 4명의 회원이 필요합니다."), bgcolor=AppTheme.ERROR))
@@ -1770,8 +2403,8 @@ class TennisClubApp:
                 "winner": winner,
                 "recorded_by": self.current_user or "",
             }
-            self.matches["matches"].append(new_match)
-            save_json(MATCHES_FILE, self.matches)
+            self.repo.add_match(new_match)
+            self.schedule_flush()
 
             self.page.close(dialog)
             self.show_match_tab()
@@ -1801,8 +2434,8 @@ class TennisClubApp:
 
     def delete_match(self, match: dict):
         def confirm_delete(e):
-            self.matches["matches"] = [m for m in self.matches["matches"] if m["id"] != match["id"]]
-            save_json(MATCHES_FILE, self.matches)
+            self.repo.remove_match(match["id"])
+            self.schedule_flush()
             self.page.close(dialog)
             self.show_match_tab()
 
@@ -1818,6 +2451,7 @@ class TennisClubApp:
         self.page.open(dialog)
 
     # ==================== 순위 탭 ====================
+    @firebase_metrics.scoped("ranking")
     def show_ranking_tab(self):
         self.ranking_type = "weekly"
         self.ranking_list = ft.ListView(expand=True, spacing=0, padding=ft.padding.symmetric(horizontal=20))
@@ -1852,50 +2486,16 @@ class TennisClubApp:
         self.page.update()
 
     def calculate_rankings(self, start_date: datetime, end_date: datetime) -> list:
-        scores = {}
-
-        for match in self.matches.get("matches", []):
-            match_date = datetime.strptime(match["date"], "%Y-%m-%d")
-            if start_date <= match_date <= end_date:
-                team1 = match["team1"]
-                team2 = match["team2"]
-                score1 = match["score1"]
-                score2 = match["score2"]
-                winner = match.get("winner", "")
-                is_draw = winner == "draw" or score1 == score2
-                is_team1_winner = winner == "team1"
-                is_team2_winner = winner == "team2"
-                game_diff = abs(score1 - score2)
-
-                for player_id in team1:
-                    if player_id not in scores:
-                        scores[player_id] = {"wins": 0, "losses": 0, "draws": 0, "points": 0, "games_won": 0, "games_lost": 0}
-                    scores[player_id]["games_won"] += score1
-                    scores[player_id]["games_lost"] += score2
-                    if is_draw:
-                        scores[player_id]["draws"] += 1
-                        scores[player_id]["points"] += 1  # 무승부는 1점
-                    elif is_team1_winner:
-                        scores[player_id]["wins"] += 1
-                        scores[player_id]["points"] += 2 + game_diff
-                    else:
-                        scores[player_id]["losses"] += 1
-                        scores[player_id]["points"] -= game_diff
-
-                for player_id in team2:
-                    if player_id not in scores:
-                        scores[player_id] = {"wins": 0, "losses": 0, "draws": 0, "points": 0, "games_won": 0, "games_lost": 0}
-                    scores[player_id]["games_won"] += score2
-                    scores[player_id]["games_lost"] += score1
-                    if is_draw:
-                        scores[player_id]["draws"] += 1
-                        scores[player_id]["points"] += 1  # 무승부는 1점
-                    elif is_team2_winner:
-                        scores[player_id]["wins"] += 1
-                        scores[player_id]["points"] += 2 + game_diff
-                    else:
-                        scores[player_id]["losses"] += 1
-                        scores[player_id]["points"] -= game_diff
+        start, end = start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        # SQLite 저장소를 쓰면 선수별 집계까지 범위 쿼리 한 번으로
+        # (저장 대기 중인 변경을 먼저 쓰고, 월 파티션이면 아직 받지 않은 달이 SQLite에
+        #  없거나 오래되었을 수 있으므로 달을 불러오는 메모리 경로로 계산)
+        scores = None
+        if not self.repo.partitioned:
+            self.flush_changes()
+            scores = query_player_stats(start, end)
+        if scores is None:
+            scores = score_matches(self.get_matches_between(start, end))
 
         rankings = []
         for player_id, data in scores.items():
@@ -1965,7 +2565,9 @@ class TennisClubApp:
                 )
 
     # ==================== 설정 탭 ====================
+    @firebase_metrics.scoped("settings")
     def show_settings_tab(self):
+        counts = self.get_collection_counts()
         content = ft.Column([
             create_header_card("설정", "앱 설정 및 데이터 관리", ft.Icons.SETTINGS, lambda e: self.go_back_to_home()),
 
@@ -1997,12 +2599,13 @@ class TennisClubApp:
                             ], spacing=10),
                             ft.Container(height=8),
                             ft.Row([
-                                create_stat_box(str(len(self.members.get('members', []))), "회원"),
+                                create_stat_box(str(counts["members"]), "회원"),
                                 ft.Container(width=8),
-                                create_stat_box(str(len(self.attendance.get('attendance', []))), "출석일"),
+                                create_stat_box(str(counts["attendance"]), "출석일"),
                                 ft.Container(width=8),
-                                create_stat_box(str(len(self.matches.get('matches', []))), "경기"),
+                                create_stat_box(str(counts["matches"]), "경기"),
                             ]),
+                            self.create_outbox_text(),
                         ], spacing=8),
                         padding=20,
                     ),
@@ -2040,9 +2643,9 @@ class TennisClubApp:
         export_data = {
             "club_name": "서초 채널",
             "export_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "members": self.members,
-            "attendance": self.attendance,
-            "matches": self.matches,
+            "members": self.repo.members,
+            "attendance": self.repo.attendance,
+            "matches": {"matches": self.repo.all_matches()},
         }
 
         export_file = os.path.join(DATA_DIR, f"seocho_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
@@ -2059,15 +2662,15 @@ class TennisClubApp:
                     with open(file_path, 'r', encoding='utf-8') as f:
                         import_data = json.load(f)
 
-                    if "members" in import_data:
-                        self.members = import_data["members"]
-                        save_json(MEMBERS_FILE, self.members)
-                    if "attendance" in import_data:
-                        self.attendance = import_data["attendance"]
-                        save_json(ATTENDANCE_FILE, self.attendance)
-                    if "matches" in import_data:
-                        self.matches = import_data["matches"]
-                        save_json(MATCHES_FILE, self.matches)
+                    self.flush_changes()  # 덮어쓰기 전에 남은 편집부터 (순서대로 전송됨)
+                    collections = [(file_path, name) for file_path, name in
+                                   ((MEMBERS_FILE, "members"), (ATTENDANCE_FILE, "attendance"),
+                                    (MATCHES_FILE, "matches"))
+                                   if name in import_data]
+                    # 저장 먼저 (월 파티션이면 메모리에는 최근 달만 남으므로)
+                    save_json_batch([(file_path, import_data[name], None) for file_path, name in collections])
+                    for _, name in collections:
+                        self.repo.replace(name, import_data[name])
 
                     self.page.open(ft.SnackBar(content=ft.Text("데이터를 불러왔습니다!"), bgcolor=AppTheme.SUCCESS))
                     self.show_settings_tab()
@@ -2082,12 +2685,15 @@ class TennisClubApp:
 
     def confirm_delete_all_data(self, e):
         def delete_all(e):
-            self.members = {"members": []}
-            self.attendance = {"attendance": []}
-            self.matches = {"matches": []}
-            save_json(MEMBERS_FILE, self.members)
-            save_json(ATTENDANCE_FILE, self.attendance)
-            save_json(MATCHES_FILE, self.matches)
+            self.flush_changes()
+            self.repo = ClubRepository()
+            if is_match_partitioned():
+                self.repo.partition_matches(load_match_month, {})
+            save_json_batch([
+                (MEMBERS_FILE, self.repo.members, None),
+                (ATTENDANCE_FILE, self.repo.attendance, None),
+                (MATCHES_FILE, self.repo.matches, None),
+            ])
             self.page.close(dialog)
             self.page.open(ft.SnackBar(content=ft.Text("모든 데이터가 삭제되었습니다."), bgcolor=AppTheme.SUCCESS))
             self.show_settings_tab()
@@ -2104,12 +2710,49 @@ class TennisClubApp:
         self.page.open(dialog)
 
 
+# ==================== 시작 준비 (warm-up) ====================
+# 단계별 소요 시간 (초) - dns / connect / prefetch / total
+WARM_UP_TIMINGS = {}
+
+
+@firebase_metrics.scoped("warm_up")
+def warm_up():
+    """첫 세션이 접속하기 전에 Firebase 연결을 맺고 세 컬렉션을 미리 받아 둠
+
+    유휴 상태에서 깨어난 프로세스의 첫 사용자가 DNS/TLS 연결과
+    컬렉션 다운로드를 기다리지 않도록 __main__에서 백그라운드로 실행한다.
+    받은 데이터는 프로세스 공유 로컬 캐시에 들어가므로 첫 세션은 그대로 재사용한다.
+    """
+    start = time.perf_counter()
+    try:
+        WARM_UP_TIMINGS.update(fb_warm_up())
+        phase = time.perf_counter()
+        fb_replay_outbox()
+        load_all_json()
+        if is_match_partitioned():
+            # 첫 화면(오늘 경기, 이번 달 순위)이 쓰는 이번 달 파티션만 미리 받음
+            load_match_month(datetime.now().strftime("%Y-%m"))
+        WARM_UP_TIMINGS["prefetch"] = time.perf_counter() - phase
+    except Exception as e:
+        firebase_metrics.record_error("warm_up", "", e)
+    WARM_UP_TIMINGS["total"] = time.perf_counter() - start
+    for name, seconds in WARM_UP_TIMINGS.items():
+        firebase_metrics.record_timing("warm_up", name, seconds)
+    return WARM_UP_TIMINGS
+
+
 def main(page: ft.Page):
     TennisClubApp(page)
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8550))
+    # FIREBASE_METRICS_FILE을 주면 Firebase 계측 스냅숏을 주기적으로 저장 (.prom이면 Prometheus 형식)
+    if os.environ.get("FIREBASE_METRICS_FILE"):
+        firebase_metrics.start_snapshot_writer(os.environ["FIREBASE_METRICS_FILE"],
+                                               interval=int(os.environ.get("FIREBASE_METRICS_INTERVAL", 60)))
+    # Flet 서버가 뜨는 동안 Firebase 연결/데이터를 미리 준비 (첫 접속 지연 감소)
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
     ft.app(
         target=main,
         view=None,  # 웹 서버 모드 (브라우저 자동 열기 안 함)
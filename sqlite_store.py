@@ -0,0 +1,329 @@
+"""
+SQLite 로컬 저장소 (선택 사항)
+- 회원/출석/경기를 JSON 파일 대신 SQLite 한 파일(data/club.db)에 저장
+- WAL 모드: 쓰는 중에도 읽기가 막히지 않고, 레코드 하나 저장이 파일 전체 재작성이 아님
+- 레코드 본문은 JSON 그대로(data 열) 두고, 조회에 쓰는 필드만 열/보조 테이블로 뽑아 인덱스
+  · members(id)  · attendance(date) + attendance_members(member_id, date)
+  · matches(date) + match_players(player_id)
+- 기간 조회(순위, 출석 통계)는 파라미터 바인딩 범위 쿼리
+- 처음 열 때 기존 JSON 파일을 가져오는 마이그레이션 (import_json)
+
+컬렉션 이름은 "members" / "attendance" / "matches", 데이터는 앱 형식({"members": [...]}).
+읽을 때의 레코드 순서는 처음 저장된 순서(pos)를 따른다.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+SCHEMA_VERSION = 1
+
+# 컬렉션별 키 필드
+KEY_FIELDS = {"members": "id", "attendance": "date", "matches": "id"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    id    TEXT PRIMARY KEY,
+    pos   INTEGER NOT NULL,
+    name  TEXT,
+    data  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attendance (
+    date  TEXT PRIMARY KEY,
+    pos   INTEGER NOT NULL,
+    data  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attendance_members (
+    date       TEXT NOT NULL,
+    member_id  TEXT NOT NULL,
+    PRIMARY KEY (date, member_id)
+);
+CREATE INDEX IF NOT EXISTS attendance_members_member ON attendance_members (member_id, date);
+CREATE TABLE IF NOT EXISTS matches (
+    id    TEXT PRIMARY KEY,
+    pos   INTEGER NOT NULL,
+    date  TEXT,
+    data  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_date ON matches (date);
+CREATE TABLE IF NOT EXISTS match_players (
+    match_id    TEXT NOT NULL,
+    player_id   TEXT NOT NULL,
+    team        INTEGER NOT NULL,
+    result      INTEGER NOT NULL,   -- 1 승, 0 무, -1 패
+    games_won   INTEGER NOT NULL,
+    games_lost  INTEGER NOT NULL,
+    PRIMARY KEY (match_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS match_players_player ON match_players (player_id);
+"""
+
+
+class SqliteStore:
+    """SQLite 파일 하나에 세 컬렉션 저장 (스레드 안전)"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        # 스트림/쓰기 큐 스레드에서도 쓰므로 연결 하나를 잠금으로 공유
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")   # WAL에서는 전원이 나가도 DB가 깨지지 않음
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------------- 읽기 ----------------
+    def is_empty(self):
+        with self._lock:
+            return not any(
+                self._conn.execute(f"SELECT 1 FROM {name} LIMIT 1").fetchone()
+                for name in KEY_FIELDS
+            )
+
+    def load(self, name):
+        """컬렉션 전체 → 앱 형식 dict"""
+        self._check(name)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data FROM {name} ORDER BY pos").fetchall()
+        return {name: [json.loads(data) for (data,) in rows]}
+
+    def count(self, name):
+        self._check(name)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+
+    def matches_between(self, start, end=None, player_id=None):
+        """start~end(양 끝 포함) 경기 목록 (날짜순), player_id를 주면 그 선수가 뛴 경기만"""
+        end = end or start
+        if player_id is None:
+            sql = "SELECT data FROM matches WHERE date BETWEEN ? AND ? ORDER BY date, pos"
+            params = (start, end)
+        else:
+            sql = ("SELECT m.data FROM match_players p JOIN matches m ON m.id = p.match_id "
+                   "WHERE p.player_id = ? AND m.date BETWEEN ? AND ? ORDER BY m.date, m.pos")
+            params = (player_id, start, end)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def attendance_between(self, start, end):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM attendance WHERE date BETWEEN ? AND ? ORDER BY date",
+                (start, end)).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def attendance_counts(self, start, end):
+        """기간 내 회원별 출석 횟수 {member_id: 횟수}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT member_id, COUNT(*) FROM attendance_members "
+                "WHERE date BETWEEN ? AND ? GROUP BY member_id",
+                (start, end)).fetchall()
+        return dict(rows)
+
+    def player_stats(self, start, end):
+        """기간 내 선수별 성적 {player_id: {wins, losses, draws, points, games_won, games_lost}}
+
+        점수 규칙은 앱 순위와 같다: 승 2 + 게임 차, 무 1, 패 -게임 차.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT p.player_id,
+                       SUM(p.result = 1), SUM(p.result = -1), SUM(p.result = 0),
+                       SUM(CASE p.result
+                               WHEN 1 THEN 2 + ABS(p.games_won - p.games_lost)
+                               WHEN 0 THEN 1
+                               ELSE -ABS(p.games_won - p.games_lost)
+                           END),
+                       SUM(p.games_won), SUM(p.games_lost)
+                FROM match_players p JOIN matches m ON m.id = p.match_id
+                WHERE m.date BETWEEN ? AND ?
+                GROUP BY p.player_id
+                """,
+                (start, end)).fetchall()
+        fields = ("wins", "losses", "draws", "points", "games_won", "games_lost")
+        return {pid: dict(zip(fields, values)) for pid, *values in rows}
+
+    # ---------------- 쓰기 ----------------
+    def replace(self, name, data):
+        """컬렉션 전체를 data로 교체 (트랜잭션 하나)"""
+        self._check(name)
+        records = data.get(name, [])
+        with self._transaction() as cur:
+            cur.execute(f"DELETE FROM {name}")
+            self._clear_children(cur, name, None)
+            self._insert(cur, name, records, start_pos=0)
+
+    def replace_between(self, name, start, end, records):
+        """date가 start~end인 레코드들을 records로 교체 (출석/경기, 월 파티션 동기화용)"""
+        if name not in ("attendance", "matches"):
+            raise KeyError(name)
+        key_field = KEY_FIELDS[name]
+        with self._transaction() as cur:
+            stale = [key for (key,) in cur.execute(
+                f"SELECT {key_field} FROM {name} WHERE date BETWEEN ? AND ?", (start, end))]
+            cur.execute(f"DELETE FROM {name} WHERE date BETWEEN ? AND ?", (start, end))
+            self._clear_children(cur, name, stale)
+            next_pos = cur.execute(f"SELECT COALESCE(MAX(pos) + 1, 0) FROM {name}").fetchone()[0]
+            self._insert(cur, name, records, start_pos=next_pos)
+
+    def sync(self, name, data):
+        """컬렉션을 data와 같게 맞추되 바뀐 레코드만 씀 (서버 동기화용) → (쓴 수, 지운 수)
+
+        비어 있으면 replace처럼 전부 넣고, 아니면 저장된 본문과 다른 레코드만 upsert,
+        data에 없는 키만 삭제한다. 레코드 몇 개가 바뀐 동기화가 테이블 전체를 다시 쓰지 않는다.
+        """
+        self._check(name)
+        key_field = KEY_FIELDS[name]
+        records = data.get(name, [])
+        with self._transaction() as cur:
+            stored = dict(cur.execute(f"SELECT {key_field}, data FROM {name}"))
+            if not stored:
+                self._insert(cur, name, records, start_pos=0)
+                return len(records), 0
+            keys = {str(record.get(key_field, "")) for record in records}
+            stale = [key for key in stored if key not in keys]
+            changed = [record for record in records
+                       if stored.get(str(record.get(key_field, ""))) != json.dumps(record, ensure_ascii=False)]
+            if stale:
+                cur.executemany(f"DELETE FROM {name} WHERE {key_field} = ?", [(key,) for key in stale])
+                self._clear_children(cur, name, stale)
+            if changed:
+                next_pos = cur.execute(f"SELECT COALESCE(MAX(pos) + 1, 0) FROM {name}").fetchone()[0]
+                self._insert(cur, name, changed, start_pos=next_pos)
+        return len(changed), len(stale)
+
+    def upsert(self, name, records):
+        """레코드 추가/수정 (이미 있는 키는 순서를 유지한 채 내용만 교체)"""
+        self._check(name)
+        with self._transaction() as cur:
+            next_pos = cur.execute(f"SELECT COALESCE(MAX(pos) + 1, 0) FROM {name}").fetchone()[0]
+            self._insert(cur, name, records, start_pos=next_pos)
+
+    def delete(self, name, keys):
+        self._check(name)
+        key_field = KEY_FIELDS[name]
+        keys = [str(key) for key in keys]
+        with self._transaction() as cur:
+            cur.executemany(f"DELETE FROM {name} WHERE {key_field} = ?", [(key,) for key in keys])
+            self._clear_children(cur, name, keys)
+
+    def import_json(self, files):
+        """기존 JSON 파일 가져오기 {컬렉션 이름: 파일 경로} → 가져온 레코드 수
+
+        없는 파일이나 읽을 수 없는 파일은 건너뛴다. 파일은 지우지 않는다.
+        """
+        imported = {}
+        for name, file_path in files.items():
+            self._check(name)
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if isinstance(data, dict) and isinstance(data.get(name), list):
+                self.replace(name, data)
+                imported[name] = len(data[name])
+        return imported
+
+    # ---------------- 내부 ----------------
+    @staticmethod
+    def _check(name):
+        if name not in KEY_FIELDS:
+            raise KeyError(name)
+
+    def _transaction(self):
+        return _Transaction(self._conn, self._lock)
+
+    def _insert(self, cur, name, records, start_pos):
+        key_field = KEY_FIELDS[name]
+        rows, keys = [], []
+        for offset, record in enumerate(records):
+            key = str(record.get(key_field, "")) or f"#{start_pos + offset}"
+            keys.append(key)
+            data = json.dumps(record, ensure_ascii=False)
+            if name == "members":
+                rows.append((key, start_pos + offset, record.get("name"), data))
+            elif name == "attendance":
+                rows.append((key, start_pos + offset, data))
+            else:
+                rows.append((key, start_pos + offset, record.get("date"), data))
+
+        columns = {"members": "id, pos, name, data",
+                   "attendance": "date, pos, data",
+                   "matches": "id, pos, date, data"}[name]
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns.split(", ")[2:])
+        placeholders = ", ".join("?" * len(columns.split(", ")))
+        cur.executemany(
+            f"INSERT INTO {name} ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT({key_field}) DO UPDATE SET {updates}",
+            rows)
+
+        self._clear_children(cur, name, keys)
+        if name == "attendance":
+            cur.executemany(
+                "INSERT OR IGNORE INTO attendance_members (date, member_id) VALUES (?, ?)",
+                [(key, str(mid)) for key, record in zip(keys, records)
+                 for mid in record.get("member_ids", [])])
+        elif name == "matches":
+            cur.executemany(
+                "INSERT OR IGNORE INTO match_players "
+                "(match_id, player_id, team, result, games_won, games_lost) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, str(pid), team, *_team_result(record, team))
+                 for key, record in zip(keys, records)
+                 for team in (1, 2) for pid in record.get(f"team{team}", [])])
+
+    @staticmethod
+    def _clear_children(cur, name, keys):
+        """보조 테이블에서 keys(None이면 전체) 행 삭제"""
+        table, column = {"attendance": ("attendance_members", "date"),
+                         "matches": ("match_players", "match_id")}.get(name, (None, None))
+        if table is None:
+            return
+        if keys is None:
+            cur.execute(f"DELETE FROM {table}")
+        else:
+            cur.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(key,) for key in keys])
+
+
+def _team_result(match, team):
+    """경기에서 team(1/2)의 (결과, 딴 게임, 잃은 게임) - 무승부 판정은 앱 순위 계산과 같음"""
+    own, other = (match.get("score1", 0), match.get("score2", 0))[::1 if team == 1 else -1]
+    winner = match.get("winner", "")
+    if winner == "draw" or own == other:
+        return 0, own, other
+    return (1 if winner == f"team{team}" else -1), own, other
+
+
+class _Transaction:
+    """with 블록 하나를 트랜잭션 하나로 (예외가 나면 되돌림)"""
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        return self._conn.cursor()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self._lock.release()
+        return False
@@ -0,0 +1,69 @@
+"""
+테스트 공통 준비
+- fb: firebase_config의 전역 상태(캐시 폴더, 세션, 차단기, 쓰기 큐, 동기화 상태)를
+  테스트마다 새로 만들고 캐시는 임시 폴더에 둔다 (data/를 건드리지 않음)
+- emulator: 대역 서버를 띄우고 FIREBASE_URL을 그쪽으로 돌림
+- go_offline / go_online: 서버를 멈추거나 같은 포트로 다시 띄움
+"""
+
+import time
+
+import pytest
+
+import firebase_config as fc
+from firebase_emulator import FirebaseEmulator
+
+
+@pytest.fixture
+def fb(tmp_path, monkeypatch):
+    """임시 캐시 폴더와 새 전역 상태를 쓰는 firebase_config 모듈"""
+    monkeypatch.setattr(fc, "CACHE_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(fc, "FIREBASE_URL", "")
+    monkeypatch.setattr(fc, "_stores", {})
+    monkeypatch.setattr(fc, "_breakers", {})
+    monkeypatch.setattr(fc, "_read_cache", fc._ReadCache())
+    monkeypatch.setattr(fc, "_count_cache", {})
+    monkeypatch.setattr(fc, "_sync_state", None)
+    monkeypatch.setattr(fc, "_generations", {})
+    monkeypatch.setattr(fc, "_write_queue", fc._WriteQueue())
+    fc.close_session()
+    yield fc
+    # 이전 테스트의 쓰기 스레드가 다음 테스트의 서버로 재전송하지 않도록 비움
+    queue = fc._write_queue
+    with queue._cond:
+        queue._entries.clear()
+    fc.close_session()
+
+
+@pytest.fixture
+def emulator(fb, monkeypatch):
+    """빈 대역 서버 - emulator.write("PUT", "", data)로 내용을 채움"""
+    em = FirebaseEmulator().start()
+    monkeypatch.setattr(fb, "FIREBASE_URL", em.url)
+    yield em
+    em.stop()
+
+
+def go_offline(em):
+    """서버를 멈추고 공유 세션의 keep-alive 연결도 닫음 → 이후 요청은 연결 실패"""
+    em.stop()
+    fc.close_session()
+
+
+def go_online(em, data=None):
+    """멈춘 서버와 같은 포트에 새 서버를 띄움 (data를 주면 그 내용으로)"""
+    host, port = em._server.server_address[:2]
+    for _ in range(50):
+        try:
+            return FirebaseEmulator(host=host, port=port, data=data).start()
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"port {port} busy")
+
+
+def wait_until(condition, timeout=5.0):
+    """condition()이 참이 될 때까지 대기 → 마지막 결과"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
@@ -0,0 +1,69 @@
+import os
+import threading
+
+import pytest
+
+import seocho_tennis_club as app
+from club_repository import ClubRepository
+
+_MATCH = {"id": "g1", "date": "2026-10-03", "team1": ["a", "b"], "team2": ["c", "d"],
+          "score1": 6, "score2": 3, "winner": "team1"}
+
+
+@pytest.fixture
+def partitioned(fb, emulator, tmp_path, monkeypatch):
+    """월 파티션 경기 + JSON 로컬 저장소 (달별 파일은 임시 폴더에)"""
+    monkeypatch.setattr(app, "_layouts", {app.MATCHES_FILE: "monthly"})
+    monkeypatch.setattr(app, "_match_manifest", {})
+    monkeypatch.setattr(app, "_sqlite", False)
+    monkeypatch.setattr(app, "MATCHES_DIR", str(tmp_path / "local" / "matches"))
+    return app
+
+
+def test_partitioned_save_creates_month_folder(partitioned, fb, emulator):
+    app.save_json_batch([(app.MATCHES_FILE, {"matches": [_MATCH]}, [_MATCH])])
+    assert app._load_local_month("2026-10") == [_MATCH]
+    assert fb.fb_flush(5)
+    assert emulator.read("matches/2026-10/g1")["id"] == "g1"
+
+
+def test_manifest_counts_are_incremented_on_server(partitioned, fb, emulator):
+    old = dict(_MATCH, id="g0")
+    emulator.write("PUT", "", {"matches": {"2026-10": {"g0": old}},
+                               "_manifest": {"matches": {"2026-10": {"count": 1, "updated_at": 1}}}})
+    # 다른 기기가 같은 달에 경기를 추가함
+    emulator.write("PATCH", "", {"_manifest/matches/2026-10/count": fb.server_increment(1)})
+
+    app.save_json_batch([(app.MATCHES_FILE, {"matches": [old, _MATCH]}, [_MATCH], [], {"g1"})])
+    assert fb.fb_flush(5)
+    assert emulator.read(f"{app.MATCH_MANIFEST_PATH}/2026-10/count") == 3
+
+    app.save_json_batch([(app.MATCHES_FILE, {"matches": [_MATCH]}, [], [old], set())])
+    assert fb.fb_flush(5)
+    entry = emulator.read(f"{app.MATCH_MANIFEST_PATH}/2026-10")
+    assert entry["count"] == 2 and entry["updated_at"] > 1
+
+
+def test_local_save_failure_still_sends(partitioned, fb, emulator, monkeypatch):
+    def failing(file_path, data):
+        raise OSError("disk full")
+    monkeypatch.setattr(app, "_save_local_json", failing)
+    app.save_json_batch([(app.MATCHES_FILE, {"matches": [_MATCH]}, [_MATCH])])
+    assert fb.fb_flush(5)
+    assert emulator.read("matches/2026-10/g1")["id"] == "g1"
+
+
+def test_failed_flush_keeps_changes(monkeypatch):
+    club = app.TennisClubApp.__new__(app.TennisClubApp)
+    club.repo = ClubRepository()
+    club._flush_lock = threading.Lock()
+    club._flush_timer = None
+    club.repo.add_match(dict(_MATCH))
+
+    def failing(items):
+        raise RuntimeError("queue unavailable")
+    monkeypatch.setattr(app, "save_json_batch", failing)
+    with pytest.raises(RuntimeError):
+        club.flush_changes()
+    upserts, deletes, inserted = club.repo.take_changes()["matches"]
+    assert [m["id"] for m in upserts] == ["g1"] and deletes == [] and inserted == {"g1"}
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+import cache_codec
+
+
+def test_round_trip_with_and_without_compression():
+    value = {"matches": [{"id": f"g{i}", "score": [6, i % 7]} for i in range(500)], "k": "한글"}
+    plain = cache_codec.dumps(value)
+    packed = cache_codec.dumps(value, compress_level=6, compress_min_bytes=1)
+    assert len(packed) < len(plain)
+    assert cache_codec.loads(plain) == value
+    assert cache_codec.loads(packed) == value
+
+
+@pytest.mark.parametrize("damage", [
+    lambda blob: blob[:10],                                 # 헤더 잘림
+    lambda blob: b"XXXX" + blob[4:],                        # 매직 다름
+    lambda blob: blob[:-1],                                 # 본문 잘림
+    lambda blob: blob[:-1] + bytes([blob[-1] ^ 0xFF]),      # 본문 손상 (CRC 불일치)
+])
+def test_damaged_blob_raises_format_error(damage):
+    blob = cache_codec.dumps({"a": list(range(100))}, compress_level=6, compress_min_bytes=1)
+    with pytest.raises(cache_codec.CacheFormatError):
+        cache_codec.loads(damage(blob))
+
+
+def test_write_file_replaces_atomically(tmp_path):
+    path = str(tmp_path / "value.bin")
+    cache_codec.write_file(path, {"v": 1})
+    cache_codec.write_file(path, {"v": 2})
+    assert cache_codec.read_file(path) == {"v": 2}
+    assert os.listdir(tmp_path) == ["value.bin"]    # 임시 파일이 남지 않음
@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+import cache_store
+from cache_store import CacheStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CacheStore(str(tmp_path / "cache"), split_min_bytes=200, shard_count=4)
+
+
+def _files(store, path):
+    return sorted(os.listdir(store._dir(path)))
+
+
+def _collection(n):
+    return {f"g{i}": {"id": f"g{i}", "score": [6, i % 7]} for i in range(n)}
+
+
+def test_small_value_is_one_leaf(store):
+    store.write("members", {"m1": {"name": "A"}, "m2": {"name": "B"}})
+    assert _files(store, "members") == [cache_store.VALUE_FILE]
+    assert store.read("members/m2/name") == "B"
+    store.write("members/m3", {"name": "C"})
+    assert _files(store, "members") == [cache_store.VALUE_FILE]
+    assert set(store.read("members")) == {"m1", "m2", "m3"}
+
+
+def test_large_collection_is_sharded_and_child_write_rewrites_one_shard(store):
+    matches = _collection(50)
+    store.write("matches", matches)
+    files = _files(store, "matches")
+    assert cache_store.SHARDS_FILE in files
+    assert len([name for name in files if name.startswith("shard-")]) == 4
+    assert store.read("matches") == matches
+
+    shard_dir = store._dir("matches")
+    before = {name: os.stat(os.path.join(shard_dir, name)).st_mtime_ns
+              for name in files if name.startswith("shard-")}
+    store.write("matches/g3/score/1", 0)
+    store.write("matches/g4", None)
+    after = {name: os.stat(os.path.join(shard_dir, name)).st_mtime_ns
+             for name in os.listdir(shard_dir) if name.startswith("shard-")}
+    assert set(after) == set(before)    # 같은 세대의 파일만 고침
+    assert sum(before[name] != after[name] for name in before) <= 2
+    result = store.read("matches")
+    assert result["g3"]["score"] == [6, 0]
+    assert "g4" not in result and len(result) == 49
+
+
+def test_large_leaf_with_few_children_splits_into_child_nodes(store):
+    store.write("b", {"m1": _collection(50), "m2": {"z": 1}})
+    store.write("b/m2/z", 2)
+    files = _files(store, "b")
+    assert cache_store.COMPLETE_FILE in files and "m1" in files and "m2" in files
+    assert store.read("b/m2") == {"z": 2}
+    assert store.read("b/m1") == _collection(50)
+    # 완전한 내부 노드에 없는 자식은 null로 알고 있음
+    assert store.contains("b/m3") and store.read("b/m3") is None
+    assert not store.contains("zzz")
+    # 조립한 값
+    assert store.read("b")["m2"] == {"z": 2}
+
+
+def test_replacing_a_node_drops_old_representation(store):
+    store.write("a", _collection(50))
+    store.write("a", {"x": 1})
+    assert _files(store, "a") == [cache_store.VALUE_FILE]
+    assert store.read("a") == {"x": 1}
+
+
+def test_arrays_keep_response_form(store):
+    store.write("arr", ["x", "y"])
+    assert store.read("arr") == ["x", "y"]
+    assert store.read("arr/1") == "y"
+    store.write("big", [{"n": i} for i in range(50)])
+    assert store.read("big") == [{"n": i} for i in range(50)]
+
+
+def test_child_write_clears_parent_etag(store):
+    store.write("b", {"m1": {"z": 1}})
+    store.set_etag("b", "E1")
+    assert store.get_etag("b") == "E1"
+    store.write("b/m1/z", 2)
+    assert store.get_etag("b") is None
+
+
+def test_corrupted_leaf_reads_as_unknown(store):
+    store.write("members", {"m1": {"name": "A"}})
+    with open(os.path.join(store._dir("members"), cache_store.VALUE_FILE), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)[0]
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last ^ 0xFF]))
+    assert store.lookup("members") == (False, None)
+
+
+def test_old_format_cache_is_cleared(tmp_path):
+    root = str(tmp_path / "cache")
+    store = CacheStore(root)
+    store.write("members", {"m1": {"name": "A"}})
+    with open(os.path.join(root, cache_store.FORMAT_FILE), "w") as f:
+        f.write("1")
+    reopened = CacheStore(root)
+    assert reopened.top_level() == []
+    assert not reopened.contains("members")
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+
+import seocho_tennis_club as app
+from tests.conftest import go_offline, go_online, wait_until
+
+
+def test_breaker_opens_after_threshold_and_fails_fast(fb, emulator, monkeypatch):
+    emulator.write("PUT", "", {"members": {"m1": {"name": "A"}}})
+    assert fb.fb_get("members") == {"m1": {"name": "A"}}
+    go_offline(emulator)
+
+    states = []
+    monkeypatch.setattr(fb, "_connection_listeners", list(fb._connection_listeners))
+    fb.fb_add_connection_listener(states.append)
+    for _ in range(fb.BREAKER_THRESHOLD):
+        # 연결 실패는 재시도 없이 바로 로컬 캐시로 폴백
+        assert fb.fb_get("members", max_staleness=0) == {"m1": {"name": "A"}}
+    assert not fb.fb_is_online()
+    assert fb.fb_connection_state() in ("open", "half_open")
+    assert states == [False]
+
+    start = time.perf_counter()
+    with pytest.raises(fb.CircuitOpenError):
+        fb._request("GET", "members")
+    assert time.perf_counter() - start < 0.05
+
+
+def test_breaker_closes_when_probe_succeeds(fb, emulator, monkeypatch):
+    monkeypatch.setattr(fb, "BREAKER_PROBE_MIN", 0.05)
+    go_offline(emulator)
+    for _ in range(fb.BREAKER_THRESHOLD):
+        fb.fb_get("members", max_staleness=0)
+    assert not fb.fb_is_online()
+
+    online = go_online(emulator, {"members": {"m1": {"name": "A"}}})
+    try:
+        assert wait_until(fb.fb_is_online)
+        assert fb.fb_get("members", max_staleness=0) == {"m1": {"name": "A"}}
+    finally:
+        online.stop()
+
+
+def test_server_errors_count_as_failures(fb, emulator, monkeypatch):
+    monkeypatch.setattr(fb, "RETRY_BACKOFF", 0)
+    fb.close_session()
+    emulator.failure_rate = 1.0
+    for _ in range(fb.BREAKER_THRESHOLD):
+        assert fb.fb_get("members", default={}, max_staleness=0) == {}
+    assert not fb.fb_is_online()
+
+
+def test_hanging_server_costs_one_timeout_per_call(fb, emulator, monkeypatch):
+    monkeypatch.setattr(fb, "TIMEOUT", 0.2)
+    emulator.latency = 1.0
+    start = time.perf_counter()
+    for _ in range(fb.BREAKER_THRESHOLD):
+        assert fb.fb_get("members", default={}, max_staleness=0) == {}
+    # 읽기 재시도 없이 호출마다 TIMEOUT 한 번 → 차단
+    assert time.perf_counter() - start < fb.BREAKER_THRESHOLD * fb.TIMEOUT * 2
+    assert not fb.fb_is_online()
+
+
+def test_login_badge_follows_breaker_state(fb, emulator, monkeypatch):
+    club = app.TennisClubApp.__new__(app.TennisClubApp)
+    club.connection_badge = None
+    reloads = []
+    monkeypatch.setattr(club, "reload_data", lambda: reloads.append(True), raising=False)
+    badge = club.create_connection_badge()
+    assert badge.content.controls[1].value == "Firebase 연결됨"
+
+    monkeypatch.setattr(fb, "_connection_listeners", list(fb._connection_listeners))
+    fb.fb_add_connection_listener(club._on_connection_change)
+    go_offline(emulator)
+    for _ in range(fb.BREAKER_THRESHOLD):
+        fb.fb_get("members", max_staleness=0)
+    assert badge.content.controls[1].value == "오프라인 모드"
+    assert reloads == []
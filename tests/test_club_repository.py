@@ -0,0 +1,126 @@
+import pytest
+
+import club_repository
+from club_repository import ClubRepository
+
+
+def _match(match_id, date, team1=("a", "b"), team2=("c", "d")):
+    return {"id": match_id, "date": date, "team1": list(team1), "team2": list(team2),
+            "score1": 6, "score2": 3, "winner": "team1"}
+
+
+@pytest.fixture
+def repo():
+    repo = ClubRepository()
+    repo.replace("members", {"members": [{"id": "a", "name": "가"}, {"id": "b", "name": "나"}]})
+    repo.replace("matches", {"matches": [
+        _match("g1", "2026-10-01"),
+        _match("g2", "2026-10-15", team2=("e", "f")),
+        _match("g3", "2026-11-02"),
+    ]})
+    return repo
+
+
+def test_indexes(repo):
+    assert repo.member_name("b") == "나"
+    assert repo.member_name("zz") == club_repository.UNKNOWN_NAME
+    assert repo.member_names(["a", "b"]) == "가 & 나"
+    assert [m["id"] for m in repo.matches_between("2026-10-01", "2026-10-31")] == ["g1", "g2"]
+    assert [m["id"] for m in repo.matches_on("2026-11-02")] == ["g3"]
+    assert {m["id"] for m in repo.matches_for_player("c")} == {"g1", "g3"}
+
+
+def test_indexes_follow_add_and_remove(repo):
+    repo.add_match(_match("g4", "2026-10-20", team1=("x", "y")))
+    assert repo.match("g4") is not None
+    assert [m["id"] for m in repo.matches_for_player("x")] == ["g4"]
+    assert repo.remove_match("g1")["id"] == "g1"
+    assert repo.match("g1") is None
+    assert [m["id"] for m in repo.matches_between("2026-10-01", "2026-10-31")] == ["g2", "g4"]
+    assert "g1" not in {m["id"] for m in repo.matches_for_player("a")}
+
+
+def test_change_log_collapses_per_key(repo):
+    repo.add_match(_match("g4", "2026-10-20"))
+    repo.remove_match("g4")         # 저장 전에 추가했다 지우면 보낼 것 없음
+    repo.remove_match("g2")
+    repo.set_attendance("2026-10-01", ["a", "b"])
+    changes = repo.take_changes()
+    assert set(changes) == {"matches", "attendance"}
+    upserts, deletes, inserted = changes["matches"]
+    assert upserts == [] and [m["id"] for m in deletes] == ["g2"] and inserted == set()
+    assert changes["attendance"][2] == {"2026-10-01"}
+    assert not repo.has_changes()
+
+
+def test_restore_changes_keeps_newer_edits(repo):
+    repo.remove_match("g1")
+    repo.remove_match("g2")
+    repo.add_match(_match("g4", "2026-10-20"))
+    changes = repo.take_changes()
+    repo.add_match(_match("g2", "2026-10-16"))     # 저장 실패 전에 다시 바뀐 키
+    repo.remove_match("g4")
+    repo.restore_changes(changes)
+    upserts, deletes, inserted = repo.take_changes()["matches"]
+    assert [m["date"] for m in upserts] == ["2026-10-16"] and inserted == set()
+    assert [m["id"] for m in deletes] == ["g1"]     # 보내지 못한 g4는 추가도 삭제도 없음
+
+
+def test_replace_keeps_unsaved_changes(repo):
+    repo.add_match(_match("g4", "2026-10-20"))
+    repo.replace("matches", {"matches": [_match("g1", "2026-10-01")]})
+    assert {m["id"] for m in repo.all_matches()} == {"g1", "g4"}
+
+
+class _Loader:
+    def __init__(self, months):
+        self.months = months
+        self.calls = []
+
+    def __call__(self, month, refresh):
+        self.calls.append((month, refresh))
+        return [dict(m) for m in self.months.get(month, [])]
+
+
+def _partitioned(months):
+    loader = _Loader(months)
+    repo = ClubRepository()
+    manifest = {month: {"count": len(records), "updated_at": 1} for month, records in months.items()}
+    repo.partition_matches(loader, manifest)
+    return repo, loader
+
+
+def test_partitions_load_on_demand():
+    repo, loader = _partitioned({"2026-09": [_match("g1", "2026-09-05")],
+                                 "2026-10": [_match("g2", "2026-10-05")]})
+    assert repo.partitioned and repo.loaded_months() == [] and loader.calls == []
+    assert [m["id"] for m in repo.month_matches("2026-10")] == ["g2"]
+    assert loader.calls == [("2026-10", False)]
+    repo.month_matches("2026-10")
+    assert len(loader.calls) == 1    # 이미 불러온 달은 다시 부르지 않음
+    # 매니페스트에 없는 달은 서버에 경기가 없으므로 부르지 않음
+    assert repo.month_matches("2025-01") == [] and len(loader.calls) == 1
+    # 내보내기는 불러오지 않은 달을 읽기만 함
+    assert [m["id"] for m in repo.all_matches()] == ["g1", "g2"]
+    assert "2026-09" not in repo.loaded_months()
+
+
+def test_manifest_change_reloads_loaded_month():
+    repo, loader = _partitioned({"2026-10": [_match("g2", "2026-10-05")]})
+    repo.month_matches("2026-10")
+    loader.months["2026-10"].append(_match("g5", "2026-10-07"))
+    repo.partition_matches(loader, {"2026-10": {"count": 2, "updated_at": 2}})
+    assert loader.calls[-1] == ("2026-10", True)
+    assert {m["id"] for m in repo.month_matches("2026-10")} == {"g2", "g5"}
+
+
+def test_eviction_keeps_months_with_unsaved_changes():
+    months = {f"2026-{i:02d}": [_match(f"g{i}", f"2026-{i:02d}-01")] for i in range(1, 10)}
+    repo, _ = _partitioned(months)
+    repo.add_match(_match("new", "2026-01-20"))
+    for i in range(2, 10):
+        repo.month_matches(f"2026-{i:02d}")
+    loaded = repo.loaded_months()
+    assert len(loaded) == club_repository.MAX_LOADED_MONTHS
+    assert "2026-01" in loaded and "2026-02" not in loaded
+    assert repo.match("new") is not None
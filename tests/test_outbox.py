@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+import firebase_config
+from tests.conftest import go_offline, go_online, wait_until
+
+_start_writer = firebase_config._WriteQueue._start
+
+
+def _journal(fb):
+    path = os.path.join(fb.CACHE_DIR, "outbox.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def held(fb, monkeypatch):
+    """전송 스레드를 띄우지 않는 쓰기 큐 (저널에 쌓이기만 함)"""
+    monkeypatch.setattr(fb._WriteQueue, "_start", lambda self: None)
+    return fb
+
+
+def test_journal_is_replayed_after_restart(held, emulator, monkeypatch):
+    held.fb_put_async("members/m1", {"name": "A"})
+    held.fb_patch_async("members/m1", {"phone": "1"})
+    held.fb_put_async("matches/g1", {"id": "g1"})
+    assert len(_journal(held)) == 3     # 합쳐진 쓰기는 같은 id로 한 줄 더
+
+    # 앱 재시작: 새 큐가 저널에서 복원해 보냄
+    monkeypatch.setattr(held._WriteQueue, "_start", _start_writer)
+    monkeypatch.setattr(held, "_write_queue", held._WriteQueue())
+    assert held.fb_replay_outbox() == 2
+    assert held.fb_flush(5)
+    assert emulator.read("members/m1") == {"name": "A", "phone": "1"}
+    assert emulator.read("matches/g1") == {"id": "g1"}
+    assert held.fb_outbox_stats()["depth"] == 0
+    assert wait_until(lambda: not os.path.exists(os.path.join(held.CACHE_DIR, "outbox.jsonl")))
+    assert held.fb_sync_status() == "synced"
+
+
+def test_offline_commit_is_queued_and_sent_on_reconnect(fb, emulator):
+    emulator.write("PUT", "", {"members": {"m1": {"name": "A"}}})
+    assert fb.fb_get("members") == {"m1": {"name": "A"}}
+    go_offline(emulator)
+
+    batch = fb.fb_batch()
+    batch.put("members/m2", {"name": "B"})
+    assert batch.commit() is False
+    assert fb.fb_outbox_stats()["depth"] == 1
+    assert fb.fb_sync_status() in ("pending", "failed")
+    # 로컬에는 바로 반영
+    assert fb.fb_get("members", max_staleness=0) == {"m1": {"name": "A"}, "m2": {"name": "B"}}
+
+    online = go_online(emulator, {"members": {"m1": {"name": "A"}}})
+    try:
+        fb._write_queue.wake()
+        assert fb.fb_flush(10)
+        assert online.read("members") == {"m1": {"name": "A"}, "m2": {"name": "B"}}
+        assert fb.fb_outbox_stats()["depth"] == 0
+    finally:
+        online.stop()
+
+
+def test_offline_commit_direct_leaves_nothing_behind(fb, emulator):
+    go_offline(emulator)
+    batch = fb.fb_batch()
+    batch.put("members/m2", {"name": "B"})
+    assert batch.commit_direct() is False
+    assert fb.fb_outbox_stats()["depth"] == 0
+    assert _journal(fb) == []
+    assert fb._load_cache("members") is None
+
+
+def test_rejected_batch_reconciles_only_written_paths(fb, emulator):
+    emulator.write("PUT", "", {"matches": {"g1": {"v": 1}}, "members": {"m1": {"name": "A"}},
+                               "_archive": {"2024-01": "big"}})
+    assert fb.fb_get("matches") == {"g1": {"v": 1}}
+    emulator.write_status = 401
+
+    batch = fb.fb_batch()
+    batch.put("matches/g1", {"v": 2})
+    batch.put("members/m9", {"name": "Z"})
+    batch.commit_async()
+    assert fb.fb_flush(5)
+
+    # 되돌리기는 ack 뒤에 일어나므로 다시 받는 요청이 나갈 때까지 대기
+    def gets():
+        return {path for method, path in emulator.paths if method == "GET"}
+    assert wait_until(lambda: {"matches/g1", "members/m9"} <= gets())
+    assert wait_until(lambda: fb._load_cache("matches") == {"g1": {"v": 1}})
+    assert fb._load_cache("members") is None
+    assert fb.fb_sync_status() == "failed"
+    assert "" not in gets() and "_archive" not in gets()
+
+
+def test_server_errors_are_retried_not_dropped(fb, emulator, monkeypatch):
+    monkeypatch.setattr(fb, "RETRY_BACKOFF", 0)
+    monkeypatch.setattr(fb, "BREAKER_PROBE_MIN", 0.05)
+    fb.close_session()
+    emulator.write("PUT", "", {"members": {"m1": {"name": "A"}}})
+    assert fb.fb_get("members") == {"m1": {"name": "A"}}
+    emulator.failure_rate = 1.0     # 503
+
+    assert fb.fb_put("members/m2", {"name": "B"}) is False
+    batch = fb.fb_batch()
+    batch.put("members/m3", {"name": "C"})
+    batch.commit_async()
+    assert not fb.fb_flush(1)
+    assert fb.fb_outbox_stats()["depth"] == 2
+    # 되돌리지 않고 로컬 값을 유지
+    assert set(fb._load_cache("members")) == {"m1", "m2", "m3"}
+
+    emulator.failure_rate = 0.0
+    assert fb.fb_flush(10)
+    assert set(emulator.read("members")) == {"m1", "m2", "m3"}
+    assert fb.fb_sync_status() == "synced"
@@ -0,0 +1,61 @@
+import rtdb_tree
+
+
+def test_normalize_drops_nulls_and_empty_parents():
+    assert rtdb_tree.normalize({"a": None, "b": {"c": None}, "d": [1, None]}) == {"d": {"0": 1}}
+    assert rtdb_tree.normalize({}) is None
+
+
+def test_export_array_rule():
+    # 절반 넘게 채워진 정수 키는 배열, 아니면 객체
+    assert rtdb_tree.export({"0": "a", "2": "c"}) == ["a", None, "c"]
+    assert rtdb_tree.export({"0": "a", "5": "f"}) == {"0": "a", "5": "f"}
+    assert rtdb_tree.export({"01": "a"}) == {"01": "a"}
+    assert rtdb_tree.export(rtdb_tree.normalize({"x": ["p", "q"]})) == {"x": ["p", "q"]}
+
+
+def test_child_at_reads_arrays_without_copying():
+    value = {"list": [{"id": 1}, {"id": 2}]}
+    assert rtdb_tree.child_at(value, "list/1/id") == 2
+    assert rtdb_tree.child_at(value, "list/01") is None
+    assert rtdb_tree.child_at(value, "list/5") is None
+    assert rtdb_tree.child_at(value, "list/0") is value["list"][0]
+
+
+def test_set_and_update_follow_rtdb_rules():
+    tree = rtdb_tree.normalize({"a": {"b": 1}})
+    tree = rtdb_tree.set_at(tree, "a/b", None)
+    assert tree is None     # 빈 부모까지 지워짐
+    tree = rtdb_tree.update_at(None, "m", {"x/y": 1, "z": 2})
+    assert rtdb_tree.read(tree, "") == {"m": {"x": {"y": 1}, "z": 2}}
+    tree = rtdb_tree.apply_write(tree, "PATCH", "m", {"z": None})
+    assert rtdb_tree.read(tree, "m") == {"x": {"y": 1}}
+
+
+def test_write_updates_expands_patch():
+    assert rtdb_tree.write_updates("PATCH", "a", {"b/c": 1, "d": 2}) == {"a/b/c": 1, "a/d": 2}
+    assert rtdb_tree.write_updates("DELETE", "a", None) == {"a": None}
+
+
+def test_query_orders_filters_and_limits():
+    data = {"g1": {"date": "2026-10-03"}, "g2": {"date": "2026-10-01"}, "g3": {"date": "2026-11-01"}}
+    result = rtdb_tree.query(data, {"orderBy": "date", "startAt": "2026-10-01", "endAt": "2026-10-31"})
+    assert list(result) == ["g2", "g1"]
+    assert list(rtdb_tree.query(data, {"orderBy": "date", "limitToLast": 1})) == ["g3"]
+    assert list(rtdb_tree.query({"10": 1, "9": 2, "a": 3}, {"orderBy": "$key"})) == ["9", "10", "a"]
+    assert rtdb_tree.query(data, {"orderBy": "date", "equalTo": "2027-01-01"}) == {}
+
+
+def test_resolve_server_values_and_shallow():
+    value = rtdb_tree.resolve_server_values({"t": {".sv": "timestamp"}, "n": 1}, 123)
+    assert value == {"t": 123, "n": 1}
+    inc = {".sv": {"increment": 2}}
+    assert rtdb_tree.resolve_server_values({"a": inc, "b": inc}, 0, {"a": 3}) == {"a": 5, "b": 2}
+    assert rtdb_tree.shallow({"a": {"b": 1}, "c": 2}) == {"a": True, "c": 2}
+
+
+def test_push_ids_sort_in_creation_order():
+    ids = [rtdb_tree.push_id() for _ in range(200)]
+    assert len(set(ids)) == 200
+    assert ids == sorted(ids)
+    assert all(len(key) == 20 for key in ids)
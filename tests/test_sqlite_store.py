@@ -0,0 +1,28 @@
+import pytest
+
+from sqlite_store import SqliteStore
+
+
+def _match(match_id, date, score1=6, score2=3):
+    return {"id": match_id, "date": date, "team1": ["a", "b"], "team2": ["c", "d"],
+            "score1": score1, "score2": score2, "winner": "team1" if score1 > score2 else "team2"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(str(tmp_path / "club.db"))
+    yield store
+    store.close()
+
+
+def test_sync_writes_only_changed_records(store):
+    first = [_match("g1", "2026-10-01"), _match("g2", "2026-10-02"), _match("g3", "2026-10-03")]
+    assert store.sync("matches", {"matches": first}) == (3, 0)
+    assert store.sync("matches", {"matches": first}) == (0, 0)
+
+    second = [_match("g1", "2026-10-01"), _match("g2", "2026-10-02", 1, 6), _match("g4", "2026-10-04")]
+    assert store.sync("matches", {"matches": second}) == (2, 1)
+    assert [m["id"] for m in store.load("matches")["matches"]] == ["g1", "g2", "g4"]
+    stats = store.player_stats("2026-10-01", "2026-10-31")
+    assert stats["a"]["wins"] == 2 and stats["a"]["losses"] == 1
+    assert [m["id"] for m in store.matches_between("2026-10-03", "2026-10-03")] == []
@@ -0,0 +1,82 @@
+import pytest
+
+import rtdb_tree
+from tests.conftest import go_offline
+
+_MATCHES = {
+    "g1": {"id": "g1", "date": "2026-10-01", "updated_at": 1000},
+    "g2": {"id": "g2", "date": "2026-10-02", "updated_at": 2000},
+}
+
+
+@pytest.fixture
+def fetches(fb, monkeypatch):
+    """전체 받기(_fetch) 호출 경로 기록"""
+    calls = []
+    fetch = fb._fetch
+
+    def recording(path):
+        calls.append(path)
+        return fetch(path)
+    monkeypatch.setattr(fb, "_fetch", recording)
+    return calls
+
+
+def test_etag_revalidation(fb, emulator):
+    emulator.write("PUT", "members", {"m1": {"name": "A"}})
+    data, etag = fb.fb_get_if_changed("members")
+    assert data == {"m1": {"name": "A"}} and etag
+    assert fb._load_etag("members") == etag
+
+    # 바뀌지 않았으면 304로 확인하고 본문 없이 변경 없음
+    assert fb.fb_get_if_changed("members", etag, max_staleness=0) == (None, etag)
+    emulator.write("PUT", "members/m2", {"name": "B"})
+    data, new_etag = fb.fb_get_if_changed("members", etag, max_staleness=0)
+    assert new_etag != etag and set(data) == {"m1", "m2"}
+
+
+def test_offline_read_falls_back_to_cache(fb, emulator):
+    emulator.write("PUT", "members", {"m1": {"name": "A"}})
+    data, etag = fb.fb_get_if_changed("members")
+    go_offline(emulator)
+    assert fb.fb_get_if_changed("members", max_staleness=0) == (data, None)
+    assert fb.fb_get_if_changed("members", etag, max_staleness=0) == (None, etag)
+
+
+def test_delta_sync_applies_changes_and_tombstones(fb, emulator, fetches):
+    emulator.write("PUT", "matches", _MATCHES)
+    data, version = fb.fb_sync("matches", max_staleness=0)
+    assert data == _MATCHES and fetches == ["matches"]
+    assert fb.fb_sync("matches", version, max_staleness=0) == (None, version)
+
+    emulator.write("PUT", "matches/g3", {"id": "g3", "date": "2026-10-03",
+                                         "updated_at": fb.SERVER_TIMESTAMP})
+    emulator.write("PUT", "matches/g1", None)
+    emulator.write("PUT", f"{fb.TOMBSTONE_ROOT}/matches/g1", fb.SERVER_TIMESTAMP)
+    data, new_version = fb.fb_sync("matches", version, max_staleness=0)
+    assert new_version != version
+    assert set(data) == {"g2", "g3"}
+    assert fb._load_cache("matches") == data
+    assert fetches == ["matches"]       # 변경분만 받음
+
+
+def test_reset_marker_forces_full_sync(fb, emulator, fetches):
+    emulator.write("PUT", "matches", _MATCHES)
+    fb.fb_sync("matches", max_staleness=0)
+
+    # 다른 기기가 컬렉션을 통째로 덮어씀 (지운 키의 삭제 기록 없음)
+    emulator.write("PUT", "matches", {"g9": {"id": "g9", "date": "2026-10-09", "updated_at": 500}})
+    emulator.write("PUT", f"{fb.TOMBSTONE_ROOT}/matches/{fb.TOMBSTONE_RESET}", fb.SERVER_TIMESTAMP)
+    data, _ = fb.fb_sync("matches", max_staleness=0)
+    assert list(data) == ["g9"]
+    assert fetches == ["matches", "matches"]
+
+
+def test_local_write_is_not_overwritten_by_delta(fb, emulator, monkeypatch):
+    monkeypatch.setattr(fb._WriteQueue, "_start", lambda self: None)
+    emulator.write("PUT", "matches", _MATCHES)
+    fb.fb_sync("matches", max_staleness=0)
+    fb.fb_put_async("matches/g2", dict(_MATCHES["g2"], score=[6, 4]))
+    emulator.write("PUT", "matches/g2/updated_at", fb.SERVER_TIMESTAMP)
+    data, _ = fb.fb_sync("matches", max_staleness=0)
+    assert rtdb_tree.child_at(data, "g2/score") == [6, 4]
@@ -0,0 +1,116 @@
+"""1회성 도구 - 실패해도 아웃박스에 쓰기를 남기지 않아야 함"""
+
+import json
+import os
+
+import pytest
+
+import archive_history
+import migrate_keyed_layout
+from tests.conftest import go_offline
+
+_OLD = {"id": "g0", "date": "2024-11-03", "team1": ["a", "b"], "team2": ["c", "d"],
+        "score1": 6, "score2": 3, "winner": "team1"}
+_NEW = {"id": "g1", "date": "2026-10-03", "team1": ["a", "c"], "team2": ["b", "d"],
+        "score1": 2, "score2": 6, "winner": "team2"}
+
+
+@pytest.fixture
+def offline_on_commit(fb, emulator, monkeypatch):
+    """읽기는 끝내고 저장하는 순간 연결이 끊기게 함"""
+    commit_direct = fb.WriteBatch.commit_direct
+
+    def failing(batch):
+        go_offline(emulator)
+        return commit_direct(batch)
+    monkeypatch.setattr(fb.WriteBatch, "commit_direct", failing)
+
+
+def _array_layout():
+    return {"members": {"members": [{"id": "a", "name": "A"}]},
+            "attendance": {"attendance": [{"date": "2024-11-03", "member_ids": ["a"]}]},
+            "matches": {"matches": [_OLD, _NEW]}}
+
+
+def test_migrate_converts_to_keyed_layout(fb, emulator):
+    emulator.write("PUT", "", _array_layout())
+    assert migrate_keyed_layout.migrate() == 0
+    member = emulator.read("members/a")
+    assert member["name"] == "A" and isinstance(member["updated_at"], int)
+    assert set(emulator.read("matches")) == {"g0", "g1"}
+    assert all(isinstance(m["updated_at"], int) for m in emulator.read("matches").values())
+    assert emulator.read("attendance/2024-11-03")["member_ids"] == ["a"]
+    assert fb.fb_outbox_stats()["depth"] == 0
+
+
+def test_migrate_failure_leaves_no_outbox_entry(fb, emulator, offline_on_commit):
+    emulator.write("PUT", "", _array_layout())
+    assert migrate_keyed_layout.migrate() == 1
+    assert fb.fb_outbox_stats()["depth"] == 0
+
+
+def test_archive_moves_old_month(fb, emulator):
+    emulator.write("PUT", "", {"matches": {"g0": _OLD, "g1": _NEW},
+                               "attendance": {"2024-11-03": {"date": "2024-11-03", "member_ids": ["a"]}}})
+    assert archive_history.archive("2025-01") == 0
+
+    assert set(emulator.read("matches")) == {"g1"}
+    assert emulator.read("attendance") is None
+    assert emulator.read(f"{fb.TOMBSTONE_ROOT}/matches/g0")
+    snapshot = archive_history.decode_snapshot(emulator.read("_archive/2024-11"))
+    assert snapshot["matches"] == [_OLD]
+    rollups = emulator.read("_rollups/players/2024-11")
+    assert rollups["a"]["wins"] == 1 and rollups["a"]["attendance"] == 1
+    assert rollups["c"]["losses"] == 1
+    assert fb.fb_outbox_stats()["depth"] == 0
+
+
+def test_archive_partitioned_keeps_matches_added_meanwhile(fb, emulator, monkeypatch):
+    late = dict(_OLD, id="g9")
+    emulator.write("PUT", "", {"matches": {"2024-11": {"g0": _OLD}, "2026-10": {"g1": _NEW}},
+                               "_manifest": {"matches": {"2024-11": {"count": 1, "updated_at": 1},
+                                                         "2026-10": {"count": 1, "updated_at": 1}}}})
+    commit_direct = fb.WriteBatch.commit_direct
+
+    def commit_after_late_write(batch):
+        # 보관 도구가 읽은 뒤 다른 기기가 같은 달에 경기를 추가함
+        emulator.write("PATCH", "", {"matches/2024-11/g9": late,
+                                     "_manifest/matches/2024-11/count": fb.server_increment(1)})
+        return commit_direct(batch)
+    monkeypatch.setattr(fb.WriteBatch, "commit_direct", commit_after_late_write)
+    assert archive_history.archive("2025-01") == 0
+
+    assert emulator.read("matches/2024-11") == {"g9": late}
+    assert emulator.read("_manifest/matches/2024-11/count") == 1
+    assert emulator.read(f"{fb.TOMBSTONE_ROOT}/matches/2024-11/g0")
+    assert archive_history.decode_snapshot(emulator.read("_archive/2024-11"))["matches"] == [_OLD]
+
+
+def test_archive_failure_leaves_no_outbox_entry(fb, emulator, offline_on_commit):
+    emulator.write("PUT", "", {"matches": {"g0": _OLD, "g1": _NEW}})
+    assert archive_history.archive("2025-01") == 1
+    assert fb.fb_outbox_stats()["depth"] == 0
+    assert fb.fb_sync_status() == "synced"
+
+
+
+@pytest.mark.parametrize("tool", ["migrate", "archive"])
+def test_tools_do_not_replay_app_outbox(fb, emulator, tool):
+    if tool == "migrate":
+        emulator.write("PUT", "", _array_layout())
+        run = migrate_keyed_layout.migrate
+    else:
+        emulator.write("PUT", "", {"matches": {"g0": _OLD, "g1": _NEW}})
+        run = lambda: archive_history.archive("2025-01")   # noqa: E731
+    # 앱이 보내지 못하고 남긴 쓰기
+    os.makedirs(fb.CACHE_DIR)
+    journal = os.path.join(fb.CACHE_DIR, "outbox.jsonl")
+    entry = {"id": "app-1", "method": "PUT", "path": "members/x", "data": {"name": "X"}, "ts": 0}
+    with open(journal, "w", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+    assert run() == 0
+    assert ("PUT", "members/x") not in emulator.paths
+    with open(journal, encoding="utf-8") as f:
+        assert [json.loads(line) for line in f] == [entry]     # 앱이 다음 실행 때 보냄
+    assert fb.CACHE_DIR == os.path.dirname(journal)
@@ -0,0 +1,51 @@
+import pytest
+
+from tests.conftest import wait_until
+
+
+@pytest.fixture
+def held(fb, monkeypatch):
+    """전송 스레드를 띄우지 않는 쓰기 큐 (쌓이는 모양만 확인)"""
+    monkeypatch.setattr(fb._WriteQueue, "_start", lambda self: None)
+    return fb
+
+
+def test_same_path_writes_are_coalesced(held, emulator):
+    held.fb_put_async("members/m1", {"name": "A"})
+    held.fb_patch_async("members/m1", {"phone": "1"})
+    held.fb_put_async("members/m2", {"name": "B"})
+    held.fb_patch_async("members/m2", {"name": "C"})
+    held.fb_delete_async("members/m2")
+    entries = held._write_queue._entries
+    assert [(e["method"], e["path"]) for e in entries] == [("PUT", "members/m1"), ("PUT", "members/m2")]
+    assert entries[0]["data"] == {"name": "A", "phone": "1"}
+    assert entries[1]["data"] is None
+    assert held.fb_sync_status("members/m1") == "pending"
+
+
+def test_coalesced_increments_add_up(held, emulator):
+    for _ in range(2):
+        held.fb_batch().put("_manifest/matches/2026-10/count", held.server_increment(1)).commit_async()
+    entries = held._write_queue._entries
+    assert len(entries) == 1
+    assert entries[0]["data"] == {"_manifest/matches/2026-10/count": held.server_increment(2)}
+    assert held._load_cache("_manifest/matches/2026-10/count") == 2
+
+
+def test_overlapping_paths_keep_order(held, emulator):
+    held.fb_put_async("members/m1", {"name": "A"})
+    held.fb_put_async("members", {"m9": {"name": "Z"}})
+    held.fb_patch_async("members/m1", {"name": "B"})
+    paths = [e["path"] for e in held._write_queue._entries]
+    assert paths == ["members/m1", "members", "members/m1"]
+
+
+def test_async_writes_apply_locally_and_reach_server(fb, emulator):
+    statuses = []
+    fb.fb_add_sync_listener(statuses.append)
+    fb.fb_put_async("members/m1", {"name": "A"})
+    assert fb._load_cache("members/m1") == {"name": "A"}
+    assert fb.fb_flush(5)
+    assert emulator.read("members/m1") == {"name": "A"}
+    assert wait_until(lambda: fb.fb_sync_status() == "synced")
+    assert statuses[0] == "pending"